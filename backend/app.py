@@ -1,7 +1,8 @@
 #backend/app.py
 import os
 import sys
-from flask import Flask, jsonify, send_from_directory
+import posixpath
+from flask import Flask, abort, jsonify, send_from_directory
 from flask_cors import CORS
 
 # Add the current directory to the Python path
@@ -37,6 +38,7 @@ def create_app(config_name='default'):
     from routes.storage import storage_bp
     from routes.message import message_bp
     from routes.dashboard import dashboard_bp
+    from routes.jobs import jobs_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/user')
@@ -51,18 +53,37 @@ def create_app(config_name='default'):
     app.register_blueprint(storage_bp, url_prefix='/api/storage')
     app.register_blueprint(message_bp, url_prefix='/api/message')
     app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+    app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
     
-    # Serve uploaded files
+    # Serve uploaded files. Range requests get 206 partial content so video
+    # players can seek; blobs never change, so they are cached for good
     @app.route('/static/uploads/<path:filename>')
     def uploaded_file(filename):
-        uploads_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
-        return send_from_directory(uploads_dir, filename)
+        from services.blobstore import BLOB_PATH
+        from services.uploads import CHUNKS_DIR
+        # Normalized first, so ./chunks/... or x/../chunks/... cannot reach partial uploads
+        filename = posixpath.normpath(filename)
+        if filename.startswith((f'{CHUNKS_DIR}/', 'blobs/tmp/', '../')) or filename in (CHUNKS_DIR, 'blobs/tmp', '..'):
+            abort(404)
+        blob = BLOB_PATH.fullmatch(filename)
+        if blob is None:
+            return send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                       max_age=app.config['UPLOAD_CACHE_MAX_AGE'])
+        response = send_from_directory(app.config['UPLOAD_FOLDER'], filename,
+                                       etag=blob.group(1), max_age=365 * 24 * 3600)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
     
     # Initialize database and create admin user
     with app.app_context():
         db.create_all()
         print("Database tables created successfully!")
         
+        # Full-text search index for market posts
+        from services.search import setup_search
+        setup_search(app)
+        
         # Import models here to avoid circular imports
         from models.admin import Admin
         from models.user import User
@@ -83,6 +104,30 @@ def create_app(config_name='default'):
         else:
             print("Admin user already exists")
     
+    # Materialized market stats, maintained on flush and reconciled periodically
+    from services.market_stats import init_market_stats
+    init_market_stats(app)
+    
+    # Buffered view counters, flushed in batches
+    from services.counters import init_counters
+    init_counters(app)
+    
+    # Keep every region's weather warm in the background (WEATHER_PREFETCH_ENABLED)
+    from services.weather_prefetch import start_weather_prefetcher
+    start_weather_prefetcher(app)
+    
+    # Background jobs in this process too (JOBS_WORKER_ENABLED); run_worker.py runs them standalone
+    from services.jobs import start_job_worker
+    start_job_worker(app)
+    
+    # Coalesced single-message read receipts, flushed in batches
+    from services.inbox import init_read_receipts
+    init_read_receipts(app)
+    
+    # Message push hub for /api/message/stream (REALTIME_BROKER)
+    from services.realtime import init_realtime
+    init_realtime(app)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -96,7 +141,10 @@ def create_app(config_name='default'):
     return app
 
 app = create_app()
-CORS(app)
+# Browsers may read the resumable-upload and partial-content headers
+CORS(app, expose_headers=['Location', 'Upload-Offset', 'Upload-Length', 'Upload-Expires',
+                          'Tus-Resumable', 'Tus-Version', 'Tus-Extension', 'Tus-Max-Size',
+                          'Accept-Ranges', 'Content-Range', 'ETag'])
 
 if __name__ == '__main__':
     app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
@@ -12,8 +12,43 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY') or 'your-tomorrow-io-api-key-here'  # Tomorrow.io API key
+    WEATHER_TIMEOUT = float(os.environ.get('WEATHER_TIMEOUT', 5))  # seconds per Tomorrow.io call
+    WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL', 600))  # seconds a reading is fresh
+    WEATHER_STALE_TTL = int(os.environ.get('WEATHER_STALE_TTL', 3600))  # seconds it may be served stale
+    WEATHER_BREAKER_THRESHOLD = int(os.environ.get('WEATHER_BREAKER_THRESHOLD', 3))  # failures before pausing calls
+    WEATHER_BREAKER_RESET = int(os.environ.get('WEATHER_BREAKER_RESET', 60))  # seconds before retrying
+    WEATHER_PREFETCH_ENABLED = os.environ.get('WEATHER_PREFETCH_ENABLED', 'false').lower() in ['true', 'on', '1']
+    WEATHER_PREFETCH_INTERVAL = int(os.environ.get('WEATHER_PREFETCH_INTERVAL', 3600))  # seconds between passes
+    WEATHER_PREFETCH_WORKERS = int(os.environ.get('WEATHER_PREFETCH_WORKERS', 4))  # concurrent upstream calls
+    WEATHER_RATE_PER_MINUTE = int(os.environ.get('WEATHER_RATE_PER_MINUTE', 20))  # Tomorrow.io calls per minute
+    WEATHER_PREFETCH_FORECAST = os.environ.get('WEATHER_PREFETCH_FORECAST', 'false').lower() in ['true', 'on', '1']  # also store hourly forecasts
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # optional shared cache (needs the redis package)
+    COUNTER_FLUSH_INTERVAL = int(os.environ.get('COUNTER_FLUSH_INTERVAL', 5))  # seconds between view count flushes
+    MARKET_STATS_RECONCILE_INTERVAL = int(os.environ.get('MARKET_STATS_RECONCILE_INTERVAL', 3600))  # seconds; 0 disables
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 60))  # seconds a user's dashboard counters are cached
+    USER_SUMMARY_CACHE_TTL = int(os.environ.get('USER_SUMMARY_CACHE_TTL', 60))  # seconds a user's public fields are cached across requests; 0 disables
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() in ['true', 'on', '1']  # cache public catalog GETs
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))  # seconds a public catalog response is cached
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))  # rows fetched and written per chunk by streaming exports
+    SAVINGS_INTEREST_RATE = os.environ.get('SAVINGS_INTEREST_RATE', '0')  # percent per year accrued on members' savings
+    JOBS_WORKER_ENABLED = os.environ.get('JOBS_WORKER_ENABLED', 'false').lower() in ['true', 'on', '1']  # run a job worker thread in the web process
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))  # seconds an idle worker waits between polls
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # default tries before a job is marked failed
+    JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 30))  # seconds before the first retry; doubles each time
+    JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', 600))  # seconds before a running job's worker is presumed dead
+    JOB_HEARTBEAT_INTERVAL = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 60))  # seconds between lock refreshes of a running job
+    REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'local')  # local (one worker process) or database (polled across workers)
+    REALTIME_POLL_INTERVAL = float(os.environ.get('REALTIME_POLL_INTERVAL', 1))  # seconds between database broker polls
+    REALTIME_KEEPALIVE = int(os.environ.get('REALTIME_KEEPALIVE', 15))  # seconds between SSE keepalive comments
+    REALTIME_STREAM_TIMEOUT = int(os.environ.get('REALTIME_STREAM_TIMEOUT', 300))  # seconds before a stream closes and the client reconnects
+    READ_RECEIPT_FLUSH_INTERVAL = float(os.environ.get('READ_RECEIPT_FLUSH_INTERVAL', 2))  # seconds single-message read receipts are coalesced before writing
     UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
+    IMAGE_KEEP_ORIGINALS = os.environ.get('IMAGE_KEEP_ORIGINALS', 'false').lower() in ['true', 'on', '1']  # market post images keep their original (with EXIF) after variants exist
+    BLOB_GC_GRACE = int(os.environ.get('BLOB_GC_GRACE', 3600))  # seconds an unreferenced upload is kept before garbage collection
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size for video uploads
+    UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))  # bytes per resumable upload; each PATCH is still capped by MAX_CONTENT_LENGTH
+    UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 86400))  # seconds an idle resumable upload is kept
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 3600))  # browser cache lifetime for non content-addressed uploads
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
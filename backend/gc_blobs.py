@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Garbage-collect the upload blob store
+
+Run once (e.g. from cron):       python gc_blobs.py
+Only repair reference counts:    python gc_blobs.py --reconcile-only
+Shorter grace period:            python gc_blobs.py --grace 600
+
+Resumable uploads idle past UPLOAD_SESSION_TTL are expired first. Blobs
+nothing has referenced for BLOB_GC_GRACE seconds are then deleted, together
+with files left behind by uploads whose request was rolled back.
+"""
+import sys
+import os
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from services import blobstore, uploads
+
+def main():
+    parser = argparse.ArgumentParser(description='Garbage-collect unreferenced uploads')
+    parser.add_argument('--grace', type=int, help='seconds an unreferenced blob is kept (default BLOB_GC_GRACE)')
+    parser.add_argument('--reconcile-only', action='store_true', help='repair reference counts and stop')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.reconcile_only:
+            print(f"✅ Repaired {blobstore.reconcile_ref_counts()} reference counts")
+            return 0
+        expired = uploads.expire_sessions()
+        results = blobstore.collect_garbage(args.grace)
+    print(f"✅ Expired {expired} resumable uploads")
+    print(f"✅ Deleted {results['blobs_deleted']} blobs ({results['bytes_freed']:,} bytes), "
+          f"swept {results['files_swept']} orphaned files, repaired {results['drifted']} counts")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the image variant columns and queue variants
+for the images uploaded before the pipeline existed. Profile pictures stored
+under the unserved uploads/profiles folder are moved to static/uploads/profiles
+first. Run a worker (python run_worker.py --burst) afterwards to render them.
+"""
+import sys
+import os
+import shutil
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.market import MarketPostImage
+from models.profile import UserProfile
+from services import jobs
+from sqlalchemy import inspect, text
+
+NEW_COLUMNS = [
+    ('market_post_images', 'variants', 'TEXT'),
+    ('market_post_images', 'processing_status', "VARCHAR(20) DEFAULT 'pending'"),
+    ('user_profiles', 'profile_picture_variants', 'TEXT'),
+]
+LEGACY_PROFILE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'profiles')
+
+def migrate_add_image_variants():
+    """Add the columns, move legacy profile pictures and queue the backfill"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                inspector = inspect(conn)
+                for table, column, ddl in NEW_COLUMNS:
+                    if column in {c['name'] for c in inspector.get_columns(table)}:
+                        print(f"ℹ️  {table}.{column} already exists - skipping")
+                        continue
+                    print(f"🔄 Adding {table}.{column}...")
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                conn.commit()
+
+            pending = MarketPostImage.query.filter(
+                MarketPostImage.variants.is_(None),
+                db.or_(MarketPostImage.processing_status.is_(None), MarketPostImage.processing_status == 'pending'),
+                ~MarketPostImage.image_url.startswith('http')
+            ).all()
+            for image in pending:
+                image.processing_status = 'pending'
+                jobs.enqueue('images.market_post_image', {'image_id': image.id})
+
+            profiles = UserProfile.query.filter(
+                UserProfile.profile_picture.isnot(None),
+                UserProfile.profile_picture_variants.is_(None)
+            ).all()
+            upload_folder = os.path.join(app.config['UPLOAD_FOLDER'], 'profiles')
+            queued_profiles = 0
+            for profile in profiles:
+                if profile.profile_picture.startswith('/uploads/profiles/'):
+                    filename = profile.profile_picture.rsplit('/', 1)[-1]
+                    legacy = os.path.join(LEGACY_PROFILE_FOLDER, filename)
+                    if not os.path.exists(legacy):
+                        continue
+                    os.makedirs(upload_folder, exist_ok=True)
+                    shutil.move(legacy, os.path.join(upload_folder, filename))
+                    profile.profile_picture = f'/static/uploads/profiles/{filename}'
+                if profile.profile_picture.startswith('/static/uploads/'):
+                    jobs.enqueue('images.profile_picture',
+                                 {'profile_id': profile.id, 'picture': profile.profile_picture})
+                    queued_profiles += 1
+
+            db.session.commit()
+            print(f"✅ Queued variants for {len(pending)} market images and {queued_profiles} profile pictures")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_add_image_variants()
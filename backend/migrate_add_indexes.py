@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the composite indexes declared on the
+market, message, order and loan application models to an existing database
+"""
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.market import MarketPost, MarketPostImage, MarketInterest
+from models.message import Message
+from models.order import Order, OrderItem
+from models.sacco import LoanApplication
+from sqlalchemy import inspect
+
+INDEXED_MODELS = [MarketPost, MarketPostImage, MarketInterest, Message, Order, OrderItem, LoanApplication]
+
+def migrate_add_indexes():
+    """Create any declared index that is missing from the database"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                inspector = inspect(conn)
+
+                for model in INDEXED_MODELS:
+                    table = model.__table__
+                    existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+                    for index in sorted(table.indexes, key=lambda i: i.name):
+                        if index.name in existing:
+                            print(f"ℹ️  {index.name} already exists - skipping")
+                            continue
+
+                        print(f"🔄 Creating {index.name} on {table.name}...")
+                        index.create(bind=conn)
+
+                # Refresh planner statistics so the new indexes are considered
+                if db.engine.dialect.name == 'sqlite':
+                    conn.exec_driver_sql("ANALYZE")
+
+                conn.commit()
+                print("✅ Index migration complete")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_add_indexes()
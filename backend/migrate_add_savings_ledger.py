@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Database migration script to create the savings ledger and record an opening
+balance for every member whose savings predate it, so statements and balance
+snapshots agree with SaccoMember.savings
+"""
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.sacco import SaccoMember, SavingsTransaction
+
+def migrate_add_savings_ledger():
+    """Create savings_transactions and backfill opening balances"""
+    with app.app_context():
+        try:
+            print("🔄 Creating savings_transactions if missing...")
+            SavingsTransaction.__table__.create(bind=db.engine, checkfirst=True)
+
+            members = SaccoMember.query.filter(
+                SaccoMember.savings > 0,
+                ~SaccoMember.savings_transactions.any()
+            ).all()
+
+            for member in members:
+                db.session.add(SavingsTransaction(
+                    member_id=member.id,
+                    sacco_id=member.sacco_id,
+                    transaction_type='opening_balance',
+                    amount=member.savings,
+                    balance_after=member.savings,
+                    description='Balance before the savings ledger'
+                ))
+
+            db.session.commit()
+            print(f"✅ Recorded opening balances for {len(members)} members")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_add_savings_ledger()
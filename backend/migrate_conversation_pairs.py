@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Database migration script to key conversations by their canonical participant
+pair. Duplicate conversations between the same two users are merged into the
+oldest one (their messages are moved over), every pair is stored lowest user
+id first, and the unique index uq_conversations_pair is created. The inbox
+entries are rebuilt afterwards.
+"""
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.message import Conversation, InboxEntry, Message
+from services.inbox import reconcile_inbox
+from sqlalchemy import text
+
+def migrate_conversation_pairs():
+    """Merge duplicates, canonicalize pairs and add the unique index"""
+    with app.app_context():
+        try:
+            survivors = {}
+            merged = 0
+            for conversation in Conversation.query.order_by(Conversation.created_at, Conversation.id).all():
+                pair = Conversation.pair(conversation.user1_id, conversation.user2_id)
+                if pair not in survivors:
+                    survivors[pair] = conversation.id
+                    continue
+                print(f"🔄 Merging conversation {conversation.id} into {survivors[pair]}...")
+                Message.query.filter_by(conversation_id=conversation.id).update(
+                    {'conversation_id': survivors[pair]}, synchronize_session=False
+                )
+                InboxEntry.query.filter_by(conversation_id=conversation.id).delete(synchronize_session=False)
+                db.session.execute(db.delete(Conversation).where(Conversation.id == conversation.id))
+                merged += 1
+
+            # Both sides of the SET read the old row, so this swaps the pair
+            swapped = db.session.execute(text(
+                "UPDATE conversations SET user1_id = user2_id, user2_id = user1_id WHERE user1_id > user2_id"
+            )).rowcount
+            db.session.commit()
+
+            db.session.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_conversations_pair ON conversations (user1_id, user2_id)"
+            ))
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_conversations_user2_id ON conversations (user2_id)"
+            ))
+            db.session.commit()
+
+            drifted = reconcile_inbox()
+            print(f"✅ Merged {merged} duplicate conversations, reordered {swapped} pairs, "
+                  f"rebuilt inbox ({drifted} entries changed)")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_conversation_pairs()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add conversations.message_count and build the
+inbox read model (inbox_entries) from the existing messages. Safe to re-run:
+the entries are rebuilt from the messages table every time.
+"""
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.message import InboxEntry
+from services.inbox import reconcile_inbox
+from sqlalchemy import inspect, text
+
+def migrate_inbox():
+    """Add the column, create the table and backfill the entries"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                columns = {c['name'] for c in inspect(conn).get_columns('conversations')}
+                if 'message_count' in columns:
+                    print("ℹ️  conversations.message_count already exists - skipping")
+                else:
+                    print("🔄 Adding conversations.message_count...")
+                    conn.execute(text("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations (updated_at, id)"
+                ))
+                conn.commit()
+
+            InboxEntry.__table__.create(bind=db.engine, checkfirst=True)
+
+            print("🔄 Building inbox entries from messages...")
+            drifted = reconcile_inbox()
+            print(f"✅ Inbox built: {InboxEntry.query.count()} entries ({drifted} changed)")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_inbox()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Database migration script to move existing uploads into the content-addressed
+blob store. Market post images, their variants, skill videos and profile
+pictures are copied into UPLOAD_FOLDER/blobs (duplicates stored once), their
+columns are rewritten to the blob paths, and the old flat files are removed
+once the new paths are committed.
+"""
+import sys
+import os
+import json
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from extensions import db
+from models.blob import Blob
+from models.market import MarketPostImage
+from models.profile import UserProfile
+from models.skill import SkillVideo
+from services import blobstore
+
+STATIC_PREFIX = '/static/uploads/'
+
+def migrate_to_blob_store():
+    """Copy flat uploads into the blob store and point the rows at them"""
+    with app.app_context():
+        upload_folder = app.config['UPLOAD_FOLDER']
+        moved = {}
+
+        def store(relative):
+            """Blob path for a flat upload path, or None when it is not a local file"""
+            if not relative or relative.startswith('http') or blobstore.digests(relative):
+                return None
+            if relative not in moved:
+                source = os.path.join(upload_folder, relative)
+                if not os.path.isfile(source):
+                    return None
+                with open(source, 'rb') as stream:
+                    moved[relative] = blobstore.put(stream, os.path.splitext(relative)[1])
+            return moved[relative]
+
+        def store_variants(variants_json):
+            if not variants_json:
+                return variants_json
+            variants = json.loads(variants_json)
+            for entry in variants.values():
+                for key in ('webp', 'jpeg'):
+                    entry[key] = store(entry.get(key)) or entry.get(key)
+            return json.dumps(variants)
+
+        def store_url(url):
+            if url and url.startswith(STATIC_PREFIX):
+                path = store(url[len(STATIC_PREFIX):])
+                if path:
+                    return f'{STATIC_PREFIX}{path}'
+            return url
+
+        try:
+            Blob.__table__.create(bind=db.engine, checkfirst=True)
+
+            print("🔄 Moving market post images...")
+            for image in MarketPostImage.query.all():
+                image.image_url = store(image.image_url) or image.image_url
+                image.variants = store_variants(image.variants)
+
+            print("🔄 Moving skill videos...")
+            for video in SkillVideo.query.all():
+                video.video_url = store_url(video.video_url)
+                video.thumbnail_url = store_url(video.thumbnail_url)
+
+            print("🔄 Moving profile pictures...")
+            for profile in UserProfile.query.all():
+                profile.profile_picture = store_url(profile.profile_picture)
+                profile.profile_picture_variants = store_variants(profile.profile_picture_variants)
+
+            db.session.commit()
+            drifted = blobstore.reconcile_ref_counts()
+
+            for relative in moved:
+                try:
+                    os.remove(os.path.join(upload_folder, relative))
+                except OSError:
+                    pass
+
+            print(f"✅ Moved {len(moved)} files into {Blob.query.count()} blobs ({drifted} counts repaired)")
+
+        except Exception as e:
+            print(f"❌ Error during migration: {str(e)}")
+            db.session.rollback()
+
+if __name__ == "__main__":
+    migrate_to_blob_store()
@@ -54,6 +54,40 @@ class WeatherData(db.Model):
             'weather_condition': self.weather_condition
         }
 
+class WeatherObservation(db.Model):
+    """Hourly weather time series per region: realtime readings and stored forecasts"""
+    __tablename__ = 'weather_observations'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    region_id = db.Column(db.Integer, db.ForeignKey('regions.id'), nullable=False)
+    observed_at = db.Column(db.DateTime, nullable=False)  # start of the hour, UTC
+    kind = db.Column(db.String(10), nullable=False, default='observed')  # observed or forecast
+    temperature = db.Column(db.Float)  # in Celsius
+    humidity = db.Column(db.Float)  # percentage
+    rainfall = db.Column(db.Float)  # in mm/h
+    wind_speed = db.Column(db.Float)
+    weather_condition = db.Column(db.String(50))
+    fetched_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    
+    # One row per region, hour and kind; re-ingesting a forecast overwrites it
+    __table_args__ = (
+        db.UniqueConstraint('region_id', 'observed_at', 'kind', name='uq_weather_observations_region_hour_kind'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'region_id': self.region_id,
+            'observed_at': self.observed_at.isoformat(),
+            'kind': self.kind,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'rainfall': self.rainfall,
+            'wind_speed': self.wind_speed,
+            'weather_condition': self.weather_condition,
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None
+        }
+
 class CropRecommendation(db.Model):
     __tablename__ = 'crop_recommendations'
     
@@ -0,0 +1,33 @@
+# backend/models/blob.py
+from extensions import db
+import datetime
+
+class Blob(db.Model):
+    """One stored upload, keyed by the SHA-256 of its bytes; see services/blobstore.py"""
+    __tablename__ = 'blobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    extension = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # rows whose upload columns point here
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    touched_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)  # last stored; GC grace starts here
+
+    __table_args__ = (
+        db.Index('idx_blobs_ref_count_touched_at', 'ref_count', 'touched_at'),
+    )
+
+    @property
+    def path(self):
+        """Location under UPLOAD_FOLDER: blobs/ab/cd/<sha256>.<ext>"""
+        return f'blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}.{self.extension}'
+
+    def to_dict(self):
+        return {
+            'sha256': self.sha256,
+            'path': self.path,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -0,0 +1,57 @@
+# backend/models/job.py
+from extensions import db
+import datetime
+import json
+
+class Job(db.Model):
+    """Background job; queued by request handlers and run by services/jobs workers"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # registered task name, e.g. email.send
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher runs first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)  # not claimed before this
+    locked_by = db.Column(db.String(100))  # worker id while running
+    locked_at = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON return value of the task
+    last_error = db.Column(db.Text)
+    owner_type = db.Column(db.String(20))  # user or admin who queued it
+    owner_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_jobs_status_priority_run_at', 'status', 'priority', 'run_at'),
+        db.Index('idx_jobs_owner', 'owner_type', 'owner_id', 'created_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'payload': json.loads(self.payload) if self.payload else {},
+            'result': json.loads(self.result) if self.result else None,
+            'last_error': self.last_error,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class Lease(db.Model):
+    """A named lock held by one process until it expires; see services.jobs.acquire_lease"""
+    __tablename__ = 'leases'
+
+    name = db.Column(db.String(100), primary_key=True)  # e.g. weather.prefetch
+    holder = db.Column(db.String(100), nullable=False)  # id of the process holding it
+    expires_at = db.Column(db.DateTime, nullable=False)
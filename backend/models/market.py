@@ -1,6 +1,7 @@
 #backend/models/market.py
 from extensions import db
 import datetime
+import json
 
 class MarketPost(db.Model):
     __tablename__ = 'market_posts'
@@ -38,6 +39,17 @@ class MarketPost(db.Model):
     interests = db.relationship('MarketInterest', backref='market_post', lazy=True, cascade='all, delete-orphan')
     accepter = db.relationship('User', foreign_keys=[accepted_by], backref='accepted_needs')
     
+    # Indexes for the listing filters and sorts
+    __table_args__ = (
+        db.Index('idx_market_posts_created_at_id', 'created_at', 'id'),
+        db.Index('idx_market_posts_category_created_at', 'category', 'created_at'),
+        db.Index('idx_market_posts_type_status_created_at', 'type', 'status', 'created_at'),
+        db.Index('idx_market_posts_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('idx_market_posts_approved_status', 'approved', 'status'),
+        db.Index('idx_market_posts_region', 'region'),
+        db.Index('idx_market_posts_price', 'price'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -73,6 +85,7 @@ class MarketPost(db.Model):
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'images': [img.to_dict()['image_url'] for img in self.images if img.to_dict()['image_url']],
+            'thumbnails': [img.to_dict()['thumbnail_url'] for img in self.images if img.image_url],
             'interests': [interest.to_dict() for interest in self.interests]
         }
 
@@ -83,8 +96,15 @@ class MarketPostImage(db.Model):
     market_post_id = db.Column(db.Integer, db.ForeignKey('market_posts.id'), nullable=False)
     image_url = db.Column(db.String(255), nullable=False)
     caption = db.Column(db.String(200))
+    variants = db.Column(db.Text)  # JSON thumb/medium/full WebP+JPEG paths, see services/images.py
+    processing_status = db.Column(db.String(20), default='pending')  # pending, ready, failed
     uploaded_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_market_post_images_post_id', 'market_post_id'),
+    )
+    
     def to_dict(self):
         # Create full URL for image if it exists
         image_url = None
@@ -94,10 +114,23 @@ class MarketPostImage(db.Model):
             else:
                 image_url = f'http://localhost:5000/static/uploads/{self.image_url}'
         
+        # Once processed, serve the resized variants; the original may be gone
+        variants = None
+        if self.variants:
+            variants = {
+                name: {key: f'http://localhost:5000/static/uploads/{value}' if key in ('webp', 'jpeg') else value
+                       for key, value in entry.items()}
+                for name, entry in json.loads(self.variants).items()
+            }
+            image_url = variants['full']['jpeg']
+        
         return {
             'id': self.id,
             'market_post_id': self.market_post_id,
             'image_url': image_url,
+            'thumbnail_url': variants['thumb']['webp'] if variants else image_url,
+            'variants': variants,
+            'processing_status': self.processing_status,
             'caption': self.caption,
             'uploaded_at': self.uploaded_at.isoformat()
         }
@@ -118,6 +151,12 @@ class MarketInterest(db.Model):
     # Relationships
     user = db.relationship('User', backref='market_interests')
     
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_market_interests_post_id_status', 'market_post_id', 'status'),
+        db.Index('idx_market_interests_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -276,4 +315,26 @@ class MarketDemand(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'is_active': self.is_active
-        }
\ No newline at end of file
+        }
+
+class MarketStat(db.Model):
+    """Materialized counter maintained by services/market_stats.py"""
+    __tablename__ = 'market_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # global, category, user
+    scope_key = db.Column(db.String(100), nullable=False, default='')  # category name or user id
+    metric = db.Column(db.String(40), nullable=False)  # posts, posts_active, interests_pending, ...
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_key', 'metric', name='uq_market_stats_scope_key_metric'),
+    )
+    
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'scope_key': self.scope_key,
+            'metric': self.metric,
+            'value': self.value
+        }
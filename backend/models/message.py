@@ -6,16 +6,29 @@ class Conversation(db.Model):
     __tablename__ = 'conversations'
     
     id = db.Column(db.Integer, primary_key=True)
+    # Canonical pair: user1_id is the lower id, so each pair of users has one row
     user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user2_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    message_count = db.Column(db.Integer, nullable=False, default=0)  # maintained by services/inbox.py
     
     # Relationships
     participant1 = db.relationship('User', foreign_keys=[user1_id], backref='conversations_as_participant1')
     participant2 = db.relationship('User', foreign_keys=[user2_id], backref='conversations_as_participant2')
     messages = db.relationship('Message', backref='conversation', lazy=True, cascade='all, delete-orphan')
     
+    __table_args__ = (
+        db.UniqueConstraint('user1_id', 'user2_id', name='uq_conversations_pair'),
+        db.Index('idx_conversations_user2_id', 'user2_id'),
+        db.Index('idx_conversations_updated_at', 'updated_at', 'id'),
+    )
+    
+    @staticmethod
+    def pair(user_a, user_b):
+        """(user1_id, user2_id) for a conversation between two users"""
+        return (user_a, user_b) if user_a <= user_b else (user_b, user_a)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -25,9 +38,14 @@ class Conversation(db.Model):
             'participant2': self.participant2.to_dict() if self.participant2 else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'message_count': len(self.messages)
+            'message_count': self.message_count or 0
         }
 
+@db.event.listens_for(Conversation, 'before_insert')
+def _store_canonical_pair(mapper, connection, conversation):
+    if conversation.user1_id is not None and conversation.user2_id is not None:
+        conversation.user1_id, conversation.user2_id = Conversation.pair(conversation.user1_id, conversation.user2_id)
+
 class Message(db.Model):
     __tablename__ = 'messages'
     
@@ -40,6 +58,12 @@ class Message(db.Model):
     sent_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     read_at = db.Column(db.DateTime)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_messages_conversation_id_sent_at', 'conversation_id', 'sent_at', 'id'),
+        db.Index('idx_messages_receiver_id_is_read', 'receiver_id', 'is_read'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -52,4 +76,38 @@ class Message(db.Model):
             'is_read': self.is_read,
             'sent_at': self.sent_at.isoformat() if self.sent_at else None,
             'read_at': self.read_at.isoformat() if self.read_at else None
-        }
\ No newline at end of file
+        }
+
+class InboxEntry(db.Model):
+    """One participant's view of a conversation, maintained by services/inbox.py"""
+    __tablename__ = 'inbox_entries'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # whose inbox
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
+    other_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    last_message_id = db.Column(db.Integer)
+    last_message_sender_id = db.Column(db.Integer)
+    last_message_preview = db.Column(db.String(200))
+    unread_count = db.Column(db.Integer, nullable=False, default=0)  # messages to user_id not yet read
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)  # last message, else conversation creation
+    
+    other_user = db.relationship('User', foreign_keys=[other_user_id])
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'conversation_id', name='uq_inbox_entries_user_conversation'),
+        db.Index('idx_inbox_entries_user_updated_at', 'user_id', 'updated_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'conversation_id': self.conversation_id,
+            'other_user': self.other_user.to_dict() if self.other_user else None,
+            'last_message': {
+                'id': self.last_message_id,
+                'sender_id': self.last_message_sender_id,
+                'preview': self.last_message_preview
+            } if self.last_message_id else None,
+            'unread_count': self.unread_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
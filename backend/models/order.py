@@ -30,6 +30,12 @@ class Order(db.Model):
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_orders_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('idx_orders_created_at', 'created_at'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -56,6 +62,11 @@ class OrderItem(db.Model):
     price = db.Column(db.Float, nullable=False)  # price at the time of order
     subtotal = db.Column(db.Float, nullable=False)
     
+    # Indexes
+    __table_args__ = (
+        db.Index('idx_order_items_order_id', 'order_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
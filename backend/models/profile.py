@@ -1,6 +1,7 @@
 #backend/models/profile.py
 from extensions import db
 import datetime
+import json
 
 class UserProfile(db.Model):
     __tablename__ = 'user_profiles'
@@ -14,6 +15,7 @@ class UserProfile(db.Model):
     region = db.Column(db.String(100))
     farm_size = db.Column(db.Float)  # in acres
     profile_picture = db.Column(db.String(255))
+    profile_picture_variants = db.Column(db.Text)  # JSON thumb/medium/full WebP+JPEG paths, see services/images.py
     date_of_birth = db.Column(db.Date)
     gender = db.Column(db.String(10))
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
@@ -34,6 +36,11 @@ class UserProfile(db.Model):
             'region': self.region,
             'farm_size': self.farm_size,
             'profile_picture': self.profile_picture,
+            'profile_picture_variants': {
+                name: {key: f'/static/uploads/{value}' if key in ('webp', 'jpeg') else value
+                       for key, value in entry.items()}
+                for name, entry in json.loads(self.profile_picture_variants).items()
+            } if self.profile_picture_variants else None,
             'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
             'gender': self.gender,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -111,18 +111,25 @@ class LoanApplication(db.Model):
     repayment_start_date = db.Column(db.Date)
     repayment_end_date = db.Column(db.Date)
     
+    __table_args__ = (
+        db.Index('idx_loan_applications_application_date_id', 'application_date', 'id'),
+        db.Index('idx_loan_applications_status_application_date', 'status', 'application_date'),
+        db.Index('idx_loan_applications_user_id_application_date', 'user_id', 'application_date'),
+        db.Index('idx_loan_applications_loan_id', 'loan_id'),
+    )
+    
     def to_dict(self):
-        # Import here to avoid circular imports
-        from models.user import User
-        
-        # Get user details by querying directly
-        user = User.query.get(self.user_id)
+        # User and loan details come from relationships; list endpoints eager-load
+        # them with loaders.loan_application_listing(). Otherwise the applicant
+        # comes from the cached user summary rather than a query per row.
+        from services.identity import user_summary
         user_data = {}
-        if user:
+        summary = user_summary(self.user_id, self.__dict__.get('user'))
+        if summary:
             user_data = {
-                'username': user.username,
-                'email': user.email,
-                'user_type': user.user_type
+                'username': summary['username'],
+                'email': summary['email'],
+                'user_type': summary['user_type']
             }
         
         # Get loan details
@@ -130,10 +137,9 @@ class LoanApplication(db.Model):
         if self.loan:
             loan_data = {
                 'loan_name': self.loan.name,
-                'loan_type': self.loan.loan_type,
                 'interest_rate': float(self.loan.interest_rate) if self.loan.interest_rate else 0.0,
                 'max_amount': float(self.loan.max_amount) if self.loan.max_amount else 0.0,
-                'repayment_period_months': self.loan.repayment_period_months,
+                'repayment_period_months': self.loan.repayment_period,
                 'sacco_name': self.loan.sacco.name if self.loan.sacco else None,
                 'sacco_id': self.loan.sacco_id
             }
@@ -166,4 +172,40 @@ class LoanApplication(db.Model):
             **user_data,
             # Loan details  
             **loan_data
-        }
\ No newline at end of file
+        }
+
+class SavingsTransaction(db.Model):
+    """Append-only savings ledger; each row records the member's balance after it"""
+    __tablename__ = 'savings_transactions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    member_id = db.Column(db.Integer, db.ForeignKey('sacco_members.id'), nullable=False)
+    sacco_id = db.Column(db.Integer, db.ForeignKey('saccos.id'), nullable=False)
+    transaction_type = db.Column(db.String(20), nullable=False)  # deposit, withdrawal, interest, opening_balance
+    amount = db.Column(db.Numeric(15, 2), nullable=False)
+    balance_after = db.Column(db.Numeric(15, 2), nullable=False)
+    idempotency_key = db.Column(db.String(100), unique=True)
+    description = db.Column(db.String(255))
+    created_by_admin_id = db.Column(db.Integer, db.ForeignKey('admins.id'))
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    
+    # Relationships
+    member = db.relationship('SaccoMember', backref=db.backref('savings_transactions', lazy='dynamic'))
+    
+    __table_args__ = (
+        db.Index('idx_savings_transactions_member_id_created_at', 'member_id', 'created_at', 'id'),
+        db.Index('idx_savings_transactions_sacco_id_created_at', 'sacco_id', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'member_id': self.member_id,
+            'sacco_id': self.sacco_id,
+            'transaction_type': self.transaction_type,
+            'amount': float(self.amount) if self.amount is not None else 0.0,
+            'balance_after': float(self.balance_after) if self.balance_after is not None else 0.0,
+            'idempotency_key': self.idempotency_key,
+            'description': self.description,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
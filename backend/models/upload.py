@@ -0,0 +1,37 @@
+# backend/models/upload.py
+from extensions import db
+import datetime
+import uuid
+
+class UploadSession(db.Model):
+    """A resumable (tus-style) upload in progress; see services/uploads.py"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)  # opaque, part of the upload URL
+    filename = db.Column(db.String(255))  # client's name, from Upload-Metadata
+    extension = db.Column(db.String(10), nullable=False)
+    length = db.Column(db.BigInteger, nullable=False)  # Upload-Length, total bytes expected
+    offset = db.Column('upload_offset', db.BigInteger, nullable=False, default=0)  # bytes received so far
+    status = db.Column(db.String(20), nullable=False, default='active')  # active, complete
+    blob_path = db.Column(db.String(255))  # blob store path once complete
+    owner_type = db.Column(db.String(20), nullable=False)
+    owner_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)  # last chunk received
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_upload_sessions_expires_at', 'expires_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'length': self.length,
+            'offset': self.offset,
+            'status': self.status,
+            'url': f'/static/uploads/{self.blob_path}' if self.blob_path else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
@@ -20,6 +20,7 @@ class User(db.Model):
     orders = db.relationship('Order', backref='user', lazy=True)
     market_posts = db.relationship('MarketPost', foreign_keys='MarketPost.user_id', backref='user', lazy=True)
     sacco_memberships = db.relationship('SaccoMember', backref='user', lazy=True)
+    loan_applications = db.relationship('LoanApplication', backref='user', lazy=True)
     storage_requests = db.relationship('StorageRequest', backref='user', lazy=True)
     sent_messages = db.relationship('Message', foreign_keys='Message.sender_id', backref='sender', lazy=True)
     received_messages = db.relationship('Message', foreign_keys='Message.receiver_id', backref='receiver', lazy=True)
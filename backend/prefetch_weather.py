@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Refresh the realtime weather for every region
+
+Run once (e.g. from cron):   python prefetch_weather.py
+Keep running on a cadence:   python prefetch_weather.py --loop [--interval SECONDS]
+Also store hourly forecasts:  python prefetch_weather.py --forecast
+
+Uses the same cache, rate limit and circuit breaker settings as the API
+(WEATHER_PREFETCH_WORKERS, WEATHER_RATE_PER_MINUTE, WEATHER_PREFETCH_INTERVAL).
+The API serves the readings stored here, so no shared cache is needed. With
+--loop, the process takes the weather.prefetch lease before each pass, so a
+second --loop process, or a web worker with WEATHER_PREFETCH_ENABLED, waits
+until this one stops.
+"""
+import sys
+import os
+import argparse
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from app import app
+from services.weather_prefetch import WeatherPrefetcher
+
+def main():
+    parser = argparse.ArgumentParser(description='Prefetch weather for all regions')
+    parser.add_argument('--loop', action='store_true', help='keep refreshing on a fixed cadence')
+    parser.add_argument('--interval', type=int, help='seconds between passes (default WEATHER_PREFETCH_INTERVAL)')
+    parser.add_argument('--forecast', action='store_true', help='also store the hourly forecast for each region')
+    args = parser.parse_args()
+
+    if args.forecast:
+        app.config['WEATHER_PREFETCH_FORECAST'] = True
+
+    prefetcher = WeatherPrefetcher(app, interval=args.interval)
+
+    if not args.loop:
+        results = prefetcher.run_once()
+        if results.get('error'):
+            print(f"❌ {results['error']}")
+            return 1
+        print(f"✅ Refreshed {results['refreshed']} regions "
+              f"({results['failed']} failed, {results['skipped']} skipped)")
+        return 0
+
+    print(f"🔄 Refreshing weather every {prefetcher.interval}s (Ctrl+C to stop)")
+    prefetcher.start()
+    try:
+        prefetcher._thread.join()
+    except KeyboardInterrupt:
+        prefetcher.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
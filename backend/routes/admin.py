@@ -1,45 +1,33 @@
 #backend/routes/admin.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.admin import Admin
 from models.user import User
 from models.profile import UserProfile
 from extensions import db
-from functools import wraps
-import datetime
+from services import dashboard as dashboard_service, export
+from services.identity import current_admin, identity_required
 
 admin_bp = Blueprint('admin', __name__)
 
-def admin_required(fn):
-    @wraps(fn)
-    @jwt_required()
-    def wrapper(*args, **kwargs):
-        import json
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        admin_id = identity.get('id')
-        admin = Admin.query.get(admin_id)
-        if not admin or not admin.is_active:
-            return jsonify({'message': 'Admin account inactive or not found'}), 401
-        return fn(*args, **kwargs)
-    return wrapper
+admin_required = identity_required(
+    'admin', denied={'message': 'Admin access required'},
+    active=True, inactive={'message': 'Admin account inactive or not found'}
+)
 
 @admin_bp.route('/dashboard', methods=['GET'])
 @admin_required
 def dashboard():
-    # Get dashboard statistics
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    total_admins = Admin.query.count()
-    active_admins = Admin.query.filter_by(is_active=True).count()
+    # Get dashboard statistics in one query
+    timer = dashboard_service.SectionTimer()
+    with timer.section('counts'):
+        counts, _ = dashboard_service.admin_counts()
+    total_users = counts['users_all']
+    active_users = counts['users_active']
+    total_admins = counts['admins']
+    active_admins = counts['admins_active']
+    recent_users = counts['users_all_recent']
     
-    # Recent users (last 7 days)
-    recent_users = User.query.filter(
-        User.created_at >= datetime.datetime.utcnow() - datetime.timedelta(days=7)
-    ).count()
-    
-    return jsonify({
+    return timer.apply(jsonify({
         'total_users': total_users,
         'active_users': active_users,
         'total_admins': total_admins,
@@ -48,8 +36,9 @@ def dashboard():
         'stats': {
             'users': {'total': total_users, 'active': active_users},
             'admins': {'total': total_admins, 'active': active_admins}
-        }
-    })
+        },
+        'timings': timer.timings
+    }))
 
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
@@ -71,6 +60,23 @@ def get_users():
         }
     })
 
+@admin_bp.route('/users/export', methods=['GET'])
+@admin_required
+def export_users():
+    """Stream every user as NDJSON or CSV (?format=)"""
+    try:
+        fmt = export.export_format(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    query = db.session.query(
+        User.id, User.username, User.email, User.user_type, User.is_active, User.is_verified,
+        User.created_at, UserProfile.first_name.label('first_name'),
+        UserProfile.last_name.label('last_name'), UserProfile.phone.label('phone'),
+        UserProfile.region.label('region')
+    ).outerjoin(UserProfile, UserProfile.user_id == User.id).order_by(User.id)
+    return export.export_response(query, fmt, 'users')
+
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
 @admin_required
 def get_single_user(user_id):
@@ -122,10 +128,7 @@ def get_admins():
 @admin_bp.route('/profile', methods=['GET'])
 @admin_required
 def get_admin_profile():
-    import json
-    identity = json.loads(get_jwt_identity())
-    admin_id = identity.get('id')
-    admin = Admin.query.get_or_404(admin_id)
+    admin = current_admin()  # loaded and checked by admin_required
     return jsonify({
         'admin': admin.to_dict()
     })
\ No newline at end of file
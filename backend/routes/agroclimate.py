@@ -1,48 +1,18 @@
 # backend/routes/agroclimate.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.agroclimate import Region, WeatherData, CropRecommendation
+from models.agroclimate import Region, CropRecommendation
 from extensions import db
-import requests
-import json
-from datetime import date
+from services import jobs
+from services.weather import get_weather_service, api_key_configured, todays_weather, WeatherUnavailable
+from services.weather_history import aggregate_history
+from services.response_cache import cached_response
+from services.identity import admin_required, current_identity
+from datetime import date, timedelta
 
 agroclimate_bp = Blueprint('agroclimate', __name__)
 
-def _get_weather_condition(weather_code):
-    """Convert Tomorrow.io weather code to readable condition"""
-    weather_codes = {
-        0: 'Unknown',
-        1000: 'Clear',
-        1001: 'Cloudy',
-        1100: 'Mostly Clear',
-        1101: 'Partly Cloudy',
-        1102: 'Mostly Cloudy',
-        2000: 'Fog',
-        2100: 'Light Fog',
-        3000: 'Light Wind',
-        3001: 'Wind',
-        3002: 'Strong Wind',
-        4000: 'Drizzle',
-        4001: 'Rain',
-        4200: 'Light Rain',
-        4201: 'Heavy Rain',
-        5000: 'Snow',
-        5001: 'Flurries',
-        5100: 'Light Snow',
-        5101: 'Heavy Snow',
-        6000: 'Freezing Drizzle',
-        6001: 'Freezing Rain',
-        6200: 'Light Freezing Rain',
-        6201: 'Heavy Freezing Rain',
-        7000: 'Ice Pellets',
-        7101: 'Heavy Ice Pellets',
-        7102: 'Light Ice Pellets',
-        8000: 'Thunderstorm'
-    }
-    return weather_codes.get(weather_code, 'Unknown')
-
 @agroclimate_bp.route('/regions', methods=['GET'])
+@cached_response('agroclimate.regions', depends_on=(Region,))
 def get_regions():
     try:
         regions = Region.query.all()
@@ -67,6 +37,7 @@ def get_regions():
         return jsonify({'error': str(e), 'regions': []}), 500
 
 @agroclimate_bp.route('/regions/<int:region_id>', methods=['GET'])
+@cached_response('agroclimate.regions', depends_on=(Region,))
 def get_region(region_id):
     region = Region.query.get_or_404(region_id)
     return jsonify(region.to_dict())
@@ -74,95 +45,101 @@ def get_region(region_id):
 @agroclimate_bp.route('/weather/<int:region_id>', methods=['GET'])
 def get_weather(region_id):
     region = Region.query.get_or_404(region_id)
+    service = get_weather_service()
     
-    # Check if we have recent weather data (today)
-    recent_weather = WeatherData.query.filter(
-        WeatherData.region_id == region_id,
-        WeatherData.date == date.today()
-    ).first()
-    
-    if recent_weather:
-        return jsonify(recent_weather.to_dict())
-    
-    # If no recent data, fetch from Tomorrow.io
-    try:
-        from config import Config
-        API_KEY = Config.WEATHER_API_KEY
-        
-        # Check if API key is configured
-        if (API_KEY == "your-weatherapi-key-here" or 
-            API_KEY == "your-actual-api-key-here" or 
-            API_KEY == "your-tomorrow-io-api-key-here" or
-            not API_KEY or 
-            API_KEY == "your-weather-api-key-if-available"):
-            
-            return jsonify({
-                'message': 'Weather API key not configured. Please set WEATHER_API_KEY environment variable.',
-                'error': 'API key required for weather data'
-            }), 503
-        
-        # Tomorrow.io realtime weather endpoint
-        base_url = f"https://api.tomorrow.io/v4/weather/realtime"
-        params = {
-            'location': f"{region.latitude},{region.longitude}",
-            'units': 'metric',
-            'apikey': API_KEY
-        }
-        
-        response = requests.get(base_url, params=params, timeout=10)
-        
-        if response.status_code != 200:
-            return jsonify({
-                'message': 'Failed to fetch weather data from Tomorrow.io',
-                'error': response.text,
-                'status_code': response.status_code
-            }), 502
-        
-        weather_data = response.json()
-        
-        # Extract data from Tomorrow.io response structure
-        data = weather_data.get('data', {})
-        values = data.get('values', {})
-        
-        parsed_weather = {
-            'temperature': values.get('temperature', 0),
-            'humidity': values.get('humidity', 0), 
-            'rainfall': values.get('precipitationIntensity', 0.0),
-            'wind_speed': values.get('windSpeed', 0),
-            'wind_direction': values.get('windDirection', 0),
-            'weather_condition': _get_weather_condition(values.get('weatherCode', 0))
-        }
-        
-        # Save to database
-        new_weather = WeatherData(
-            region_id=region_id,
-            date=date.today(),
-            **parsed_weather
-        )
-        db.session.add(new_weather)
-        db.session.commit()
-        
-        return jsonify(new_weather.to_dict())
-    
-    except requests.exceptions.Timeout:
+    # Check if API key is configured
+    if not api_key_configured(service.client.api_key):
+        recent_weather = todays_weather(region_id)
+        if recent_weather:
+            return jsonify(recent_weather.to_dict())
         return jsonify({
-            'message': 'Weather service request timed out',
-            'error': 'Tomorrow.io weather service is currently unavailable'
-        }), 504
-    except requests.exceptions.ConnectionError:
-        return jsonify({
-            'message': 'Unable to connect to weather service',
-            'error': 'Tomorrow.io weather service is currently unavailable'
+            'message': 'Weather API key not configured. Please set WEATHER_API_KEY environment variable.',
+            'error': 'API key required for weather data'
         }), 503
+    
+    # Served from the weather cache or today's stored reading; concurrent misses share one Tomorrow.io call
+    try:
+        weather, cache_state = service.get_region(region_id, region.latitude, region.longitude)
+    except WeatherUnavailable as e:
+        # Fall back to today's stored reading while the upstream is failing
+        recent_weather = todays_weather(region_id)
+        if recent_weather:
+            return jsonify(recent_weather.to_dict())
+        return jsonify(e.to_dict()), e.status_code
     except Exception as e:
         return jsonify({
             'message': 'Failed to fetch weather data',
             'error': str(e)
         }), 500
+    
+    response = jsonify(weather)
+    response.headers['X-Cache'] = cache_state.upper()
+    return response
+
+@agroclimate_bp.route('/weather/<int:region_id>/history', methods=['GET'])
+def get_weather_history(region_id):
+    """Aggregated hourly observations (or stored forecasts) bucketed by hour/day/week/month"""
+    Region.query.get_or_404(region_id)
+    
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=6)
+    except ValueError:
+        return jsonify({'message': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    
+    interval = request.args.get('interval', 'day')
+    kind = request.args.get('kind', 'observed')
+    
+    try:
+        buckets = aggregate_history(region_id, start, end, interval=interval, kind=kind)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({
+        'region_id': region_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'interval': interval,
+        'kind': kind,
+        'buckets': buckets
+    })
+
+@agroclimate_bp.route('/weather/<int:region_id>/forecast', methods=['POST'])
+@admin_required
+def refresh_weather_forecast(region_id):
+    identity = current_identity()
+    
+    region = Region.query.get_or_404(region_id)
+    service = get_weather_service()
+    if not api_key_configured(service.client.api_key):
+        return jsonify({
+            'message': 'Weather API key not configured. Please set WEATHER_API_KEY environment variable.',
+            'error': 'API key required for weather data'
+        }), 503
+    
+    # The upstream call and the hourly inserts run on a job worker
+    job = jobs.enqueue('weather.forecast', {'region_id': region.id}, owner=identity)
+    db.session.commit()
+    response = jsonify({'message': 'Forecast refresh queued', 'job': job.to_dict()})
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+@agroclimate_bp.route('/weather/prefetch', methods=['POST'])
+@admin_required
+def queue_weather_prefetch():
+    """Queue one refresh of every region's weather (admin only)"""
+    identity = current_identity()
+    
+    data = request.get_json(silent=True) or {}
+    job = jobs.enqueue('weather.prefetch', {'forecast': bool(data.get('forecast'))}, owner=identity)
+    db.session.commit()
+    response = jsonify({'message': 'Weather refresh queued', 'job': job.to_dict()})
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
 
 @agroclimate_bp.route('/crop-recommendations/<int:region_id>', methods=['GET'])
 def get_crop_recommendations(region_id):
-    region = Region.query.get_or_404(region_id)
+    Region.query.get_or_404(region_id)
     season = request.args.get('season')
     
     query = CropRecommendation.query.filter_by(region_id=region_id)
@@ -175,12 +152,8 @@ def get_crop_recommendations(region_id):
     })
 
 @agroclimate_bp.route('/crop-recommendations', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_crop_recommendation():
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     recommendation = CropRecommendation(**data)
     db.session.add(recommendation)
@@ -192,12 +165,8 @@ def create_crop_recommendation():
     }), 201
 
 @agroclimate_bp.route('/crop-recommendations/<int:recommendation_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_crop_recommendation(recommendation_id):
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     recommendation = CropRecommendation.query.get_or_404(recommendation_id)
     db.session.delete(recommendation)
     db.session.commit()
@@ -4,7 +4,8 @@ from models.user import User
 from models.profile import UserProfile
 from models.admin import Admin
 from extensions import db
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from services.identity import current_admin, current_identity, current_user
+from flask_jwt_extended import create_access_token, jwt_required
 import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -184,12 +185,10 @@ def login():
 @jwt_required()
 def get_profile():
     try:
-        import json
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_type = identity.get('type')
         if user_type == 'user':
-            user_id = identity.get('id')
-            user = User.query.get(user_id)
+            user = current_user()
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             profile_data = user.to_dict()
@@ -200,8 +199,7 @@ def get_profile():
                 'user': profile_data
             }), 200
         elif user_type == 'admin':
-            admin_id = identity.get('id')
-            admin = Admin.query.get(admin_id)
+            admin = current_admin()
             if not admin:
                 return jsonify({'error': 'Admin not found'}), 404
             return jsonify({
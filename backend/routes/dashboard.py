@@ -1,67 +1,46 @@
 # backend/routes/dashboard.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.user import User
+from flask_jwt_extended import jwt_required
 from models.profile import UserProfile
-from models.market import MarketPost
-from models.order import Order
-from models.sacco import SaccoMember, LoanApplication
-from models.message import Message
 from models.agroclimate import WeatherData, Region
-from models.ecommerce import Product
 from extensions import db
-import json
+from services import dashboard as dashboard_service
+from services.dashboard import SectionTimer
+from services.response_cache import cached_response
+from services.identity import current_admin, current_user, identity_required
 from datetime import date, datetime, timedelta
-from sqlalchemy import func, desc
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+admin_required = identity_required('admin', denied={'error': 'Admin access required'})
+
 @dashboard_bp.route('/user/overview', methods=['GET'])
 @jwt_required()
 def get_user_dashboard():
     """Get comprehensive user dashboard data"""
     try:
-        identity = json.loads(get_jwt_identity())
-        user_id = identity['id']
-        
-        # Get user profile
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-            
-        profile = UserProfile.query.filter_by(user_id=user_id).first()
-        
-        # Get basic counts with error handling
-        try:
-            market_posts = MarketPost.query.filter_by(farmer_id=user_id).count()
-        except:
-            market_posts = 0
-            
-        try:
-            orders = Order.query.filter_by(buyer_id=user_id).count()
-        except:
-            orders = 0
-            
-        try:
-            sacco_member = SaccoMember.query.filter_by(user_id=user_id).first()
-            loan_applications = LoanApplication.query.filter_by(member_id=sacco_member.id).count() if sacco_member else 0
-        except:
-            loan_applications = 0
-            
-        try:
-            unread_messages = Message.query.filter(
-                Message.receiver_id == user_id,
-                Message.is_read == False
-            ).count()
-        except:
-            unread_messages = 0
+        timer = SectionTimer()
+        with timer.section('profile'):
+            user = current_user()
+            if not user:
+                return jsonify({'error': 'User not found'}), 404
+            user_id = user.id
+            profile = UserProfile.query.filter_by(user_id=user_id).first()
+
+        # Every counter in one query, cached per user until one of their rows changes
+        with timer.section('counts'):
+            counts, _ = dashboard_service.user_counts(user_id)
+        market_posts = counts['market_posts']
+        orders = counts['orders']
+        loan_applications = counts['loan_applications']
+        unread_messages = counts['unread_messages']
         
         # Quick stats
         activities = [
             {
                 'title': 'Market Posts',
                 'count': market_posts,
-                'recent': 0,
+                'recent': counts['market_posts_recent'],
                 'icon': '🌾',
                 'color': 'green',
                 'link': '/market'
@@ -69,7 +48,7 @@ def get_user_dashboard():
             {
                 'title': 'Orders Placed',
                 'count': orders,
-                'recent': 0,
+                'recent': counts['orders_recent'],
                 'icon': '🛒',
                 'color': 'blue',
                 'link': '/ecommerce'
@@ -77,7 +56,7 @@ def get_user_dashboard():
             {
                 'title': 'Loan Applications',
                 'count': loan_applications,
-                'recent': 0,
+                'recent': counts['loan_applications_recent'],
                 'icon': '💰',
                 'color': 'yellow',
                 'link': '/sacco'
@@ -103,7 +82,7 @@ def get_user_dashboard():
             }
         ]
         
-        return jsonify({
+        return timer.apply(jsonify({
             'user': {
                 'id': user.id,
                 'username': user.username,
@@ -161,56 +140,38 @@ def get_user_dashboard():
                     'link': '/agroclimate',
                     'icon': '🌤️'
                 }
-            ]
-        })
+            ],
+            'timings': timer.timings
+        }))
         
     except Exception as e:
         print(f"Dashboard error: {e}")
         return jsonify({'error': str(e)}), 500
 
 @dashboard_bp.route('/admin/overview', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_dashboard():
     """Get comprehensive admin dashboard data"""
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity['type'] != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
-        admin_id = identity['id']
-        admin = User.query.get(admin_id)
-        if not admin:
-            return jsonify({'error': 'Admin user not found'}), 404
-            
-        admin_profile = UserProfile.query.filter_by(user_id=admin_id).first()
-        
-        # Get system statistics with error handling
-        try:
-            total_users = User.query.filter_by(user_type='user').count()
-        except:
-            total_users = 0
-            
-        try:
-            total_market_posts = MarketPost.query.count()
-        except:
-            total_market_posts = 0
-            
-        try:
-            total_orders = Order.query.count()
-        except:
-            total_orders = 0
-            
-        try:
-            total_products = Product.query.count()
-        except:
-            total_products = 0
+        timer = SectionTimer()
+        with timer.section('profile'):
+            admin = current_admin()
+            if not admin:
+                return jsonify({'error': 'Admin user not found'}), 404
+
+        with timer.section('counts'):
+            counts, _ = dashboard_service.admin_counts()
+        total_users = counts['users']
+        total_market_posts = counts['market_posts']
+        total_orders = counts['orders']
+        total_products = counts['products']
         
         # System health metrics
         system_metrics = [
             {
                 'title': 'Total Users',
                 'count': total_users,
-                'recent': 0,
+                'recent': counts['users_recent'],
                 'icon': '👥',
                 'color': 'blue',
                 'link': '/admin/manage-users'
@@ -218,7 +179,7 @@ def get_admin_dashboard():
             {
                 'title': 'Market Posts',
                 'count': total_market_posts,
-                'recent': 0,
+                'recent': counts['market_posts_recent'],
                 'icon': '🌾',
                 'color': 'green',
                 'link': '/admin/manage-market'
@@ -226,7 +187,7 @@ def get_admin_dashboard():
             {
                 'title': 'Orders',
                 'count': total_orders,
-                'recent': 0,
+                'recent': counts['orders_recent'],
                 'icon': '📦',
                 'color': 'orange',
                 'link': '/admin/manage-orders'
@@ -278,32 +239,35 @@ def get_admin_dashboard():
             }
         ]
         
-        return jsonify({
+        return timer.apply(jsonify({
             'admin': {
                 'id': admin.id,
                 'username': admin.username,
                 'email': admin.email,
-                'full_name': f"{admin_profile.first_name} {admin_profile.last_name}" if admin_profile and admin_profile.first_name else admin.username,
-                'first_name': admin_profile.first_name if admin_profile and admin_profile.first_name else admin.username.split()[0] if admin.username else 'Admin',
-                'profile_picture': admin_profile.profile_picture if admin_profile else None,
-                'admin_since': admin.created_at.strftime('%B %Y') if hasattr(admin, 'created_at') and admin.created_at else 'Recently'
+                'full_name': admin.username,
+                'first_name': admin.username.split()[0] if admin.username else 'Admin',
+                'profile_picture': None,  # admins have no profile
+                'role': admin.role,
+                'admin_since': admin.created_at.strftime('%B %Y') if admin.created_at else 'Recently'
             },
             'system_metrics': system_metrics,
             'pending_actions': pending_actions,
             'policies': policies,
             'system_health': {
                 'total_users': total_users,
-                'total_admins': 1,
+                'total_admins': counts['admins'],
                 'active_sessions': total_users,
                 'system_status': 'healthy'
-            }
-        })
+            },
+            'timings': timer.timings
+        }))
         
     except Exception as e:
         print(f"Admin dashboard error: {e}")
         return jsonify({'error': str(e)}), 500
 
 @dashboard_bp.route('/policies', methods=['GET'])
+@cached_response('dashboard.content')
 def get_policies():
     """Get website policies and terms"""
     policies = [
@@ -396,6 +360,7 @@ def get_policies():
     return jsonify({'policies': policies})
 
 @dashboard_bp.route('/features', methods=['GET'])
+@cached_response('dashboard.content')
 def get_platform_features():
     """Get platform features and capabilities"""
     features = [
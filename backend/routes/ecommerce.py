@@ -1,13 +1,15 @@
 #backend/routes/ecommerce.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.ecommerce import Category, Product, Cart, CartItem
 from models.order import OrderItem  # Add missing import
 from extensions import db
+from services import serializers
+from services.response_cache import cached_response
+from services.identity import admin_required, current_identity
 from werkzeug.utils import secure_filename
 import os
 import uuid
-import json
 
 # Configure upload folder
 UPLOAD_FOLDER = 'static/uploads'
@@ -34,6 +36,7 @@ ecommerce_bp = Blueprint('ecommerce', __name__)
 
 # Public routes
 @ecommerce_bp.route('/categories', methods=['GET'])
+@cached_response('ecommerce.categories', depends_on=(Category,))
 def get_categories():
     try:
         categories = Category.query.all()
@@ -45,6 +48,7 @@ def get_categories():
         return jsonify({'message': f'Error retrieving categories: {str(e)}'}), 500
 
 @ecommerce_bp.route('/categories/<int:category_id>', methods=['GET'])
+@cached_response('ecommerce.categories', depends_on=(Category,))
 def get_category(category_id):
     try:
         category = Category.query.get_or_404(category_id)
@@ -56,6 +60,7 @@ def get_category(category_id):
         return jsonify({'message': f'Error retrieving category: {str(e)}'}), 500
 
 @ecommerce_bp.route('/products', methods=['GET'])
+@cached_response('ecommerce.products', depends_on=(Product,))
 def get_products():
     try:
         category_id = request.args.get('category_id')
@@ -94,6 +99,7 @@ def get_products():
         return jsonify({'message': f'Error retrieving products: {str(e)}'}), 500
 
 @ecommerce_bp.route('/products/<int:product_id>', methods=['GET'])
+@cached_response('ecommerce.products', depends_on=(Product,))
 def get_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
@@ -112,10 +118,11 @@ def get_product(product_id):
 @jwt_required()
 def get_cart():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
+        selection = serializers.CART.select(request.args)  # ?fields= / ?shape=
         
-        cart = Cart.query.filter_by(user_id=user_id).first()
+        cart = Cart.query.options(*selection.options()).filter_by(user_id=user_id).first()
         
         if not cart:
             cart = Cart(user_id=user_id)
@@ -123,7 +130,7 @@ def get_cart():
             db.session.commit()
         
         return jsonify({
-            'cart': cart.to_dict(),
+            'cart': selection.dump(cart),
             'message': 'Cart retrieved successfully'
         }), 200
     except Exception as e:
@@ -133,7 +140,7 @@ def get_cart():
 @jwt_required()
 def add_to_cart():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         data = request.get_json()
         
@@ -181,7 +188,7 @@ def add_to_cart():
 @jwt_required()
 def update_cart_item(item_id):
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         data = request.get_json()
         
@@ -213,7 +220,7 @@ def update_cart_item(item_id):
 @jwt_required()
 def remove_from_cart(item_id):
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         item = CartItem.query.get_or_404(item_id)
@@ -235,7 +242,7 @@ def remove_from_cart(item_id):
 @jwt_required()
 def clear_cart():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         cart = Cart.query.filter_by(user_id=user_id).first()
@@ -253,15 +260,9 @@ def clear_cart():
 
 # Admin operations
 @ecommerce_bp.route('/admin/products', methods=['GET'])
-@jwt_required()
+@admin_required
 def admin_get_products():
     try:
-        import json
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status')
@@ -298,16 +299,9 @@ def admin_get_products():
         return jsonify({'message': f'Error retrieving products: {str(e)}'}), 500
 
 @ecommerce_bp.route('/products', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_product():
     try:
-        import json
-        identity_raw = get_jwt_identity()
-        identity = identity_raw if isinstance(identity_raw, dict) else json.loads(identity_raw)
-        user_type = identity.get('type')
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         data = request.form
         file = request.files.get('image')
         
@@ -386,15 +380,9 @@ def create_product():
         return jsonify({'message': f'Error creating product: {str(e)}'}), 500
 
 @ecommerce_bp.route('/products/<int:product_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_product(product_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         product = Product.query.get_or_404(product_id)
         data = request.form
         file = request.files.get('image')
@@ -441,15 +429,7 @@ def delete_product(product_id):
     try:
         print(f"DEBUG: Attempting to delete product {product_id}")
         
-        identity_raw = get_jwt_identity()
-        print(f"DEBUG: Raw identity: {identity_raw}")
-        
-        # Handle both string and dict formats for backward compatibility
-        if isinstance(identity_raw, dict):
-            identity = identity_raw
-        else:
-            identity = json.loads(identity_raw)
-            
+        identity = current_identity()
         print(f"DEBUG: Parsed identity: {identity}")
         
         user_type = identity.get('type')
@@ -491,15 +471,9 @@ def delete_product(product_id):
         return jsonify({'message': f'Error deleting product: {str(e)}'}), 500
 
 @ecommerce_bp.route('/products/<int:product_id>/status', methods=['PATCH'])
-@jwt_required()
+@admin_required
 def update_product_status(product_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         data = request.get_json()
         product = Product.query.get_or_404(product_id)
         
@@ -518,15 +492,9 @@ def update_product_status(product_id):
         return jsonify({'message': f'Error updating product status: {str(e)}'}), 500
 
 @ecommerce_bp.route('/categories', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_category():
     try:
-        import json
-        identity_raw = get_jwt_identity()
-        identity = identity_raw if isinstance(identity_raw, dict) else json.loads(identity_raw)
-        user_type = identity.get('type')
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
         data = request.form
         file = request.files.get('image')
         if 'name' not in data or not data['name']:
@@ -549,15 +517,9 @@ def create_category():
         return jsonify({'message': f'Error creating category: {str(e)}'}), 500
 
 @ecommerce_bp.route('/categories/<int:category_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_category(category_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         category = Category.query.get_or_404(category_id)
         data = request.form
         file = request.files.get('image')
@@ -583,15 +545,9 @@ def update_category(category_id):
         return jsonify({'message': f'Error updating category: {str(e)}'}), 500
 
 @ecommerce_bp.route('/categories/<int:category_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_category(category_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         category = Category.query.get_or_404(category_id)
         
         # Check if category has products
@@ -0,0 +1,74 @@
+# backend/routes/jobs.py
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from models.job import Job
+from services import jobs
+from services.pagination import keyset_page, InvalidCursor
+from services.identity import admin_required, current_identity
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _visible(job, identity):
+    """Admins see every job; anyone else only the jobs they queued"""
+    if identity.get('type') == 'admin':
+        return True
+    return job.owner_type == identity.get('type') and job.owner_id == identity.get('id')
+
+
+@jobs_bp.route('', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    """Newest jobs first (``?status=``, ``?name=``, ``?cursor=``); non-admins get their own"""
+    identity = current_identity()
+    query = Job.query
+    if identity.get('type') != 'admin':
+        query = query.filter(Job.owner_type == identity.get('type'), Job.owner_id == identity.get('id'))
+
+    status = request.args.get('status')
+    if status:
+        query = query.filter(Job.status.in_([value.strip() for value in status.split(',')]))
+    name = request.args.get('name')
+    if name:
+        query = query.filter(Job.name == name)
+
+    per_page = request.args.get('per_page', 20, type=int)
+    try:
+        page = keyset_page(query, Job.created_at, Job.id, cursor=request.args.get('cursor'), limit=per_page)
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify({
+        'jobs': [job.to_dict() for job in page.items],
+        'per_page': per_page,
+        **page.meta()
+    })
+
+
+@jobs_bp.route('/stats', methods=['GET'])
+@admin_required
+def job_stats():
+    """Queue depth by status (admin only)"""
+    return jsonify({**jobs.stats(), 'tasks': jobs.registered()})
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status (and result, once finished) of a queued job"""
+    job = Job.query.get(job_id)
+    if not job or not _visible(job, current_identity()):
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify({'job': job.to_dict()})
+
+
+@jobs_bp.route('/<int:job_id>/retry', methods=['POST'])
+@admin_required
+def retry_job(job_id):
+    """Queue a failed job again (admin only)"""
+    job = Job.query.get(job_id)
+    if not job:
+        return jsonify({'message': 'Job not found'}), 404
+    if job.status != 'failed':
+        return jsonify({'message': f'Only failed jobs can be retried; this job is {job.status}'}), 409
+    jobs.retry(job)
+    return jsonify({'message': 'Job queued again', 'job': job.to_dict()}), 202
@@ -1,20 +1,32 @@
 # backend/routes/market.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
 from models.market import MarketPost, MarketPostImage, MarketInterest
 from models.user import User
 from models.order import Order
 from extensions import db
+from services import blobstore, export, jobs, loaders, market_stats, pagination, serializers
+from services import search as post_search
+from services.identity import current_identity, current_user, identity_required
 import datetime
-import json
 import os
-import uuid
 from werkzeug.utils import secure_filename
 
 market_bp = Blueprint('market', __name__)
 
+# Access checks, with this blueprint's error bodies
+admin_required = identity_required('admin', denied={'error': 'Admin access required'})
+user_required = identity_required('user', denied={'error': 'User access required'})
+member_required = identity_required('user', 'admin', 'farmer', 'agent',
+                                    denied={'success': False, 'message': 'Access denied'})
+
+
+def _is_admin():
+    """Admin tokens, and users whose account type is admin"""
+    user = current_user()
+    return current_identity().get('type') == 'admin' or (user is not None and user.user_type == 'admin')
+
 # Configuration
-UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
 
@@ -32,17 +44,17 @@ def save_uploaded_file(file):
         if file_length > MAX_FILE_SIZE:
             return None, "File size too large"
         
+        # Stored by content hash under UPLOAD_FOLDER/blobs; duplicates are kept once
         ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}.{ext}"
-        path = os.path.join(UPLOAD_FOLDER, filename)
-        
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER)
-        
-        file.save(path)
-        return filename, None
+        return blobstore.put(file.stream, ext), None
     return None, "Invalid file type"
 
+def queue_image_variants(post_images, identity=None):
+    """Queue thumb/medium/full variants for new images; they are rendered off the request"""
+    db.session.flush()
+    for post_image in post_images:
+        jobs.enqueue('images.market_post_image', {'image_id': post_image.id}, owner=identity)
+
 @market_bp.route('/posts', methods=['GET'])
 def get_market_posts():
     try:
@@ -62,10 +74,11 @@ def get_market_posts():
         delivery_available = request.args.get('delivery_available')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        sort_by = request.args.get('sort_by', 'created_at')  # created_at, price, view_count, interest_count
+        sort_by = request.args.get('sort_by', 'created_at')  # created_at, price, view_count, interest_count, relevance
         sort_order = request.args.get('sort_order', 'desc')  # asc, desc
+        selection = serializers.MARKET_POST.select(request.args)  # ?fields= / ?shape=
         
-        query = MarketPost.query
+        query = MarketPost.query.options(*selection.options(default=loaders.market_post_listing()))
         
         # Apply filters
         if category:
@@ -93,44 +106,59 @@ def get_market_posts():
         if max_price is not None:
             query = query.filter(MarketPost.price <= max_price)
         
-        # Search filter
+        # Search filter (full-text index where the database supports it)
+        rank_order = None
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    MarketPost.title.ilike(search_term),
-                    MarketPost.description.ilike(search_term),
-                    MarketPost.tags.ilike(search_term)
-                )
-            )
+            query, rank_order = post_search.apply_search(query, search)
         
         # Filter by user type if specified
         if user_type:
-            from models.user import User
-            user_ids = [u.id for u in User.query.filter_by(user_type=user_type).all()]
+            user_ids = db.session.query(User.id).filter(User.user_type == user_type)
             query = query.filter(MarketPost.user_id.in_(user_ids))
         
-        # Apply sorting
+        # Cursor pagination: constant-time deep scrolling on (created_at, id)
+        if pagination.cursor_requested(request.args):
+            if sort_by != 'created_at':
+                return jsonify({'success': False, 'message': 'Cursor pagination only supports sort_by=created_at'}), 400
+            page_result = pagination.keyset_page(
+                query, MarketPost.created_at, MarketPost.id,
+                cursor=request.args.get('cursor'), limit=per_page,
+                descending=sort_order.lower() == 'desc',
+                with_total=pagination.include_total(request.args, default=False)
+            )
+            return jsonify({
+                'success': True,
+                'posts': [selection.dump(post) for post in page_result.items],
+                'per_page': per_page,
+                **page_result.meta()
+            })
+        
+        # Apply sorting; searches are ranked by relevance unless another sort is asked for
         sort_column = getattr(MarketPost, sort_by, MarketPost.created_at)
-        if sort_order.lower() == 'desc':
+        if rank_order is not None and (sort_by == 'relevance' or 'sort_by' not in request.args):
+            query = query.order_by(rank_order, MarketPost.id.desc())
+        elif sort_order.lower() == 'desc':
             query = query.order_by(sort_column.desc())
         else:
             query = query.order_by(sort_column.asc())
         
         # Pagination
+        with_total = pagination.include_total(request.args)
         posts = query.paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
         return jsonify({
             'success': True,
-            'posts': [post.to_dict() for post in posts.items],
+            'posts': [selection.dump(post) for post in posts.items],
             'total': posts.total,
-            'pages': posts.pages,
+            'pages': posts.pages if with_total else None,
             'current_page': page,
             'per_page': per_page
         })
         
+    except pagination.InvalidCursor as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -147,15 +175,15 @@ def get_market_needs():
         priority = request.args.get('priority')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        selection = serializers.MARKET_POST.select(request.args)
         
-        from models.user import User
-        
-        # Get all admin users
-        admin_users = User.query.filter_by(user_type='admin').all()
-        admin_user_ids = [user.id for user in admin_users]
+        # Admin users, resolved inside the main query
+        admin_user_ids = db.session.query(User.id).filter(User.user_type == 'admin')
         
         # Query for admin-created needs only
-        query = MarketPost.query.filter(
+        query = MarketPost.query.options(
+            *selection.options(default=loaders.market_post_listing())
+        ).filter(
             MarketPost.user_id.in_(admin_user_ids),
             MarketPost.type == 'need',
             MarketPost.approved == True  # Admin posts are auto-approved
@@ -184,7 +212,7 @@ def get_market_needs():
         
         return jsonify({
             'success': True,
-            'needs': [need.to_dict() for need in needs.items],
+            'needs': [selection.dump(need) for need in needs.items],
             'total': needs.total,
             'pages': needs.pages,
             'current_page': page
@@ -196,27 +224,27 @@ def get_market_needs():
 @market_bp.route('/posts/<int:post_id>', methods=['GET'])
 def get_market_post(post_id):
     try:
-        post = MarketPost.query.get_or_404(post_id)
-        # Increment view count
-        post.view_count += 1
-        db.session.commit()
+        post = MarketPost.query.options(*loaders.market_post_detail()).get_or_404(post_id)
+        
+        # Record the view in the write-behind buffer; it is flushed in batches
+        view_counter = current_app.extensions['view_counter']
+        view_counter.incr(post.id)
+        post_data = post.to_dict()
+        post_data['view_count'] = (post.view_count or 0) + view_counter.pending(post.id)
         
         return jsonify({
             'success': True,
-            'post': post.to_dict()
+            'post': post_data
         })
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts', methods=['POST'])
-@jwt_required()
+@member_required
 def create_market_post():
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
-
+        identity = current_identity()
         user_id = identity['id']
         data = request.form.to_dict()
 
@@ -249,11 +277,9 @@ def create_market_post():
                 pass
 
         # Determine if post needs approval (products are auto-approved, requests need approval)
-        from models.user import User
-        user = User.query.get(user_id)
         post_type = data.get('type', 'product')
         # Auto-approve products, require approval for requests/demands
-        approved = post_type == 'product' or user.user_type == 'admin' if user else False
+        approved = post_type == 'product' or _is_admin()
 
         # Parse tags
         tags = data.get('tags', '')
@@ -287,14 +313,11 @@ def create_market_post():
         db.session.add(market_post)
         db.session.flush()
 
-        # Add images
-        for i, image_url in enumerate(image_files):
-            post_image = MarketPostImage(
-                market_post_id=market_post.id,
-                image_url=image_url,
-                is_primary=(i == 0)  # First image is primary
-            )
-            db.session.add(post_image)
+        # Add images; the first (lowest id) is the primary one
+        post_images = [MarketPostImage(market_post_id=market_post.id, image_url=image_url)
+                       for image_url in image_files]
+        db.session.add_all(post_images)
+        queue_image_variants(post_images, identity)
 
         db.session.commit()
         
@@ -313,20 +336,15 @@ def create_market_post():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>', methods=['PUT'])
-@jwt_required()
+@member_required
 def update_market_post(post_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
-
+        identity = current_identity()
         user_id = identity['id']
         post = MarketPost.query.get_or_404(post_id)
         
         # Check if user owns the post or is admin
-        from models.user import User
-        user = User.query.get(user_id)
-        if post.user_id != user_id and user.user_type != 'admin':
+        if post.user_id != user_id and not _is_admin():
             return jsonify({'success': False, 'message': 'Permission denied'}), 403
 
         data = request.get_json() if request.is_json else request.form.to_dict()
@@ -362,20 +380,19 @@ def update_market_post(post_id):
 
         # Handle image updates if provided
         if 'images' in request.files:
-            # Remove existing images
-            MarketPostImage.query.filter_by(market_post_id=post_id).delete()
+            # Remove existing images (through the session, so their blobs are released)
+            for old_image in MarketPostImage.query.filter_by(market_post_id=post_id):
+                db.session.delete(old_image)
             
             # Add new images
             images = request.files.getlist('images')
-            for i, image in enumerate(images):
+            post_images = []
+            for image in images:
                 filename, error = save_uploaded_file(image)
                 if filename:
-                    post_image = MarketPostImage(
-                        market_post_id=post_id,
-                        image_url=filename,
-                        is_primary=(i == 0)
-                    )
-                    db.session.add(post_image)
+                    post_images.append(MarketPostImage(market_post_id=post_id, image_url=filename))
+            db.session.add_all(post_images)
+            queue_image_variants(post_images, identity)
 
         post.updated_at = datetime.datetime.utcnow()
         db.session.commit()
@@ -391,20 +408,15 @@ def update_market_post(post_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>', methods=['DELETE'])
-@jwt_required()
+@member_required
 def delete_market_post(post_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
-
+        identity = current_identity()
         user_id = identity['id']
         post = MarketPost.query.get_or_404(post_id)
         
         # Check if user owns the post or is admin
-        from models.user import User
-        user = User.query.get(user_id)
-        if post.user_id != user_id and user.user_type != 'admin':
+        if post.user_id != user_id and not _is_admin():
             return jsonify({'success': False, 'message': 'Permission denied'}), 403
 
         db.session.delete(post)
@@ -420,13 +432,9 @@ def delete_market_post(post_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>/approve', methods=['POST'])
-@jwt_required()
+@identity_required('admin', denied={'success': False, 'message': 'Admin access required'})
 def approve_market_post(post_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') != 'admin':
-            return jsonify({'success': False, 'message': 'Admin access required'}), 403
-
         post = MarketPost.query.get_or_404(post_id)
         post.approved = True
         post.updated_at = datetime.datetime.utcnow()
@@ -443,14 +451,11 @@ def approve_market_post(post_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>/interest', methods=['POST'])
-@jwt_required()
+@member_required
 def express_interest(post_id):
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
 
         data = request.get_json() if request.is_json else request.form.to_dict()
         
@@ -499,9 +504,11 @@ def express_interest(post_id):
         
         db.session.add(interest)
         
-        # Update interest count on post
-        post.interest_count += 1
-        post.updated_at = datetime.datetime.utcnow()
+        # Update interest count on post (atomic increment in the same transaction)
+        MarketPost.query.filter_by(id=post_id).update({
+            MarketPost.interest_count: db.func.coalesce(MarketPost.interest_count, 0) + 1,
+            MarketPost.updated_at: datetime.datetime.utcnow()
+        }, synchronize_session=False)
         
         db.session.commit()
         
@@ -520,23 +527,20 @@ def express_interest(post_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>/interests', methods=['GET'])
-@jwt_required()
+@member_required
 def get_post_interests(post_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
-
+        identity = current_identity()
         user_id = identity['id']
         post = MarketPost.query.get_or_404(post_id)
         
         # Check if user owns the post or is admin
-        from models.user import User
-        user = User.query.get(user_id)
-        if post.user_id != user_id and user.user_type != 'admin':
+        if post.user_id != user_id and not _is_admin():
             return jsonify({'success': False, 'message': 'Permission denied'}), 403
 
-        interests = MarketInterest.query.filter_by(market_post_id=post_id).all()
+        interests = MarketInterest.query.options(
+            *loaders.market_interest_listing()
+        ).filter_by(market_post_id=post_id).all()
         
         return jsonify({
             'success': True,
@@ -550,15 +554,13 @@ def get_post_interests(post_id):
 @jwt_required()
 def get_interest(interest_id):
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         interest = MarketInterest.query.get_or_404(interest_id)
         
         # Check if user has permission to view this interest
-        from models.user import User
-        user = User.query.get(identity['id'])
         if (interest.user_id != identity['id'] and 
             interest.market_post.user_id != identity['id'] and 
-            user.user_type != 'admin'):
+            not _is_admin()):
             return jsonify({'success': False, 'message': 'Permission denied'}), 403
 
         return jsonify({
@@ -570,13 +572,10 @@ def get_interest(interest_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @market_bp.route('/interests/<int:interest_id>/respond', methods=['POST'])
-@jwt_required()
+@member_required
 def respond_to_interest(interest_id):
     try:
-        identity = json.loads(get_jwt_identity())
-        if identity.get('type') not in ['user', 'admin', 'farmer', 'agent']:
-            return jsonify({'success': False, 'message': 'Access denied'}), 403
-
+        identity = current_identity()
         user_id = identity['id']
         data = request.get_json()
         action = data.get('action')  # accept, decline, counter_offer
@@ -585,9 +584,7 @@ def respond_to_interest(interest_id):
         post = interest.market_post
         
         # Check if user owns the post or is admin
-        from models.user import User
-        user = User.query.get(user_id)
-        if post.user_id != user_id and user.user_type != 'admin':
+        if post.user_id != user_id and not _is_admin():
             return jsonify({'success': False, 'message': 'Permission denied'}), 403
         
         # Check if interest is still pending
@@ -644,30 +641,48 @@ def respond_to_interest(interest_id):
 @jwt_required()
 def get_my_interests():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         status = request.args.get('status')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        selection = serializers.MARKET_INTEREST.select(request.args)
         
-        query = MarketInterest.query.filter_by(user_id=user_id)
+        query = MarketInterest.query.options(
+            *selection.options(default=loaders.market_interest_listing())
+        ).filter_by(user_id=user_id)
         
         if status:
             query = query.filter_by(status=status)
         
+        if pagination.cursor_requested(request.args):
+            page_result = pagination.keyset_page(
+                query, MarketInterest.created_at, MarketInterest.id,
+                cursor=request.args.get('cursor'), limit=per_page,
+                with_total=pagination.include_total(request.args, default=False)
+            )
+            return jsonify({
+                'success': True,
+                'interests': [selection.dump(interest) for interest in page_result.items],
+                **page_result.meta()
+            })
+        
+        with_total = pagination.include_total(request.args)
         interests = query.order_by(MarketInterest.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
         return jsonify({
             'success': True,
-            'interests': [interest.to_dict() for interest in interests.items],
+            'interests': [selection.dump(interest) for interest in interests.items],
             'total': interests.total,
-            'pages': interests.pages,
+            'pages': interests.pages if with_total else None,
             'current_page': page
         })
         
+    except pagination.InvalidCursor as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -675,53 +690,39 @@ def get_my_interests():
 @jwt_required()
 def get_market_stats():
     try:
-        identity = json.loads(get_jwt_identity())
-        
+        identity = current_identity()
         user_id = identity['id']
         is_admin = identity.get('type') == 'admin'
         
+        # Read from the materialized counters (services/market_stats.py)
         if is_admin:
             # Admin stats
-            total_posts = MarketPost.query.count()
-            pending_approvals = MarketPost.query.filter_by(approved=False).count()
-            active_posts = MarketPost.query.filter_by(status='active').count()
-            total_interests = MarketInterest.query.count()
-            pending_interests = MarketInterest.query.filter_by(status='pending').count()
-            
-            # Category distribution
-            from sqlalchemy import func
-            category_stats = db.session.query(
-                MarketPost.category,
-                func.count(MarketPost.id).label('count')
-            ).group_by(MarketPost.category).all()
+            stats = market_stats.get_stats(market_stats.GLOBAL)
             
             return jsonify({
                 'success': True,
                 'stats': {
-                    'total_posts': total_posts,
-                    'pending_approvals': pending_approvals,
-                    'active_posts': active_posts,
-                    'total_interests': total_interests,
-                    'pending_interests': pending_interests,
-                    'category_distribution': {cat: count for cat, count in category_stats}
+                    'total_posts': stats.get('posts', 0),
+                    'pending_approvals': stats.get('posts_unapproved', 0),
+                    'active_posts': stats.get('posts_active', 0),
+                    'total_interests': stats.get('interests', 0),
+                    'pending_interests': stats.get('interests_pending', 0),
+                    'category_distribution': {cat or 'uncategorized': count
+                                              for cat, count in market_stats.category_counts()}
                 }
             })
         else:
             # User stats
-            user_posts = MarketPost.query.filter_by(user_id=user_id).count()
-            active_user_posts = MarketPost.query.filter_by(user_id=user_id, status='active').count()
-            user_interests = MarketInterest.query.filter_by(user_id=user_id).count()
-            accepted_interests = MarketInterest.query.filter_by(user_id=user_id, status='accepted').count()
-            pending_interests = MarketInterest.query.filter_by(user_id=user_id, status='pending').count()
+            stats = market_stats.get_stats(market_stats.USER, user_id)
             
             return jsonify({
                 'success': True,
                 'stats': {
-                    'user_posts': user_posts,
-                    'active_user_posts': active_user_posts,
-                    'user_interests': user_interests,
-                    'accepted_interests': accepted_interests,
-                    'pending_interests': pending_interests
+                    'user_posts': stats.get('posts', 0),
+                    'active_user_posts': stats.get('posts_active', 0),
+                    'user_interests': stats.get('interests', 0),
+                    'accepted_interests': stats.get('interests_accepted', 0),
+                    'pending_interests': stats.get('interests_pending', 0)
                 }
             })
             
@@ -732,18 +733,11 @@ def get_market_stats():
 def get_categories():
     """Get all available categories"""
     try:
-        from sqlalchemy import func
-        categories = db.session.query(
-            MarketPost.category,
-            func.count(MarketPost.id).label('count')
-        ).filter(
-            MarketPost.category.isnot(None),
-            MarketPost.category != ''
-        ).group_by(MarketPost.category).order_by(func.count(MarketPost.id).desc()).all()
+        categories = market_stats.category_counts()
         
         return jsonify({
             'success': True,
-            'categories': [{'name': cat, 'count': count} for cat, count in categories]
+            'categories': [{'name': cat, 'count': count} for cat, count in categories if cat]
         })
         
     except Exception as e:
@@ -753,19 +747,15 @@ def get_categories():
 # ==================== USER (FARMER) ROUTES ====================
 
 @market_bp.route('/user/products', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_products():
     """Get user's own products"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get user's products (including both 'product' and 'offer' types for backward compatibility)
-        products = MarketPost.query.filter(
+        products = MarketPost.query.options(*loaders.market_post_listing()).filter(
             MarketPost.user_id == user_id,
             MarketPost.type.in_(['product', 'offer'])  # Include both types
         ).order_by(MarketPost.created_at.desc()).all()
@@ -779,17 +769,13 @@ def get_user_products():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/products', methods=['POST'])
-@jwt_required()
+@user_required
 def create_user_product():
     """Create a new product listing"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get form data
         data = request.form.to_dict()
         
@@ -839,6 +825,7 @@ def create_user_product():
                 image_url=image_url
             )
             db.session.add(post_image)
+            queue_image_variants([post_image], identity)
         
         db.session.commit()
         
@@ -855,17 +842,13 @@ def create_user_product():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/products/<int:product_id>', methods=['PUT'])
-@jwt_required()
+@user_required
 def update_user_product(product_id):
     """Update user's product"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get product and verify ownership
         product = MarketPost.query.get(product_id)
         if not product or product.user_id != user_id:
@@ -895,17 +878,13 @@ def update_user_product(product_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/products/<int:product_id>', methods=['DELETE'])
-@jwt_required()
+@user_required
 def delete_user_product(product_id):
     """Delete user's product"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get product and verify ownership
         product = MarketPost.query.get(product_id)
         if not product or product.user_id != user_id:
@@ -923,26 +902,22 @@ def delete_user_product(product_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/admin-requests', methods=['GET'])
-@jwt_required()
+@user_required
 def get_admin_requests():
     """Get requests from admins for user's products"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get interests in user's products from admins
-        user_products = MarketPost.query.filter_by(
+        product_ids = db.session.query(MarketPost.id).filter_by(
             user_id=user_id,
             type='product'
-        ).all()
-        
-        product_ids = [p.id for p in user_products]
+        )
         
-        interests = MarketInterest.query.filter(
+        interests = MarketInterest.query.options(
+            *loaders.market_interest_with_post()
+        ).filter(
             MarketInterest.market_post_id.in_(product_ids)
         ).join(User, MarketInterest.user_id == User.id).filter(
             User.user_type == 'admin'
@@ -964,17 +939,13 @@ def get_admin_requests():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/admin-requests/<int:interest_id>/respond', methods=['POST'])
-@jwt_required()
+@user_required
 def respond_to_admin_request(interest_id):
     """Respond to admin request (accept/decline)"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         data = request.get_json()
         response_type = data.get('response')  # 'accept' or 'decline'
         
@@ -999,17 +970,13 @@ def respond_to_admin_request(interest_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/notifications', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_notifications():
     """Get user notifications"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Generate notifications based on recent activity
         notifications = [
             {
@@ -1039,17 +1006,13 @@ def get_user_notifications():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/market-insights', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_market_insights():
     """Get market insights for users"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Generate market insights
         insights = [
             {
@@ -1079,26 +1042,22 @@ def get_user_market_insights():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/sales', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_sales():
     """Get user's sales data"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get completed sales (accepted interests)
-        user_products = MarketPost.query.filter_by(
+        product_ids = db.session.query(MarketPost.id).filter_by(
             user_id=user_id,
             type='product'
-        ).all()
-        
-        product_ids = [p.id for p in user_products]
+        )
         
-        completed_sales = MarketInterest.query.filter(
+        completed_sales = MarketInterest.query.options(
+            *loaders.market_interest_with_post_summary()
+        ).filter(
             MarketInterest.market_post_id.in_(product_ids),
             MarketInterest.status == 'accepted'
         ).all()
@@ -1127,19 +1086,15 @@ def get_user_sales():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/dashboard', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_dashboard():
     """Get user dashboard summary data"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # Get user's products
-        products = MarketPost.query.filter_by(
+        products = MarketPost.query.options(*loaders.market_post_listing()).filter_by(
             user_id=user_id,
             type='product'
         ).all()
@@ -1147,7 +1102,9 @@ def get_user_dashboard():
         product_ids = [p.id for p in products]
         
         # Get interests in user's products
-        interests = MarketInterest.query.filter(
+        interests = MarketInterest.query.options(
+            *loaders.market_interest_with_post_summary()
+        ).filter(
             MarketInterest.market_post_id.in_(product_ids)
         ).all()
         
@@ -1185,19 +1142,15 @@ def get_user_dashboard():
 # ==================== ADMIN (AGENT) ROUTES ====================
 
 @market_bp.route('/admin/user-products', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_user_products():
     """Get products from users that admins can connect with buyers"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Get ALL user products (both approved and pending) for admin review
-        products = MarketPost.query.filter(
+        products = MarketPost.query.options(*loaders.market_post_listing()).filter(
             MarketPost.type == 'product',
             MarketPost.status == 'active'
         ).order_by(MarketPost.created_at.desc()).all()
@@ -1211,19 +1164,15 @@ def get_admin_user_products():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/buyer-requests', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_buyer_requests():
     """Get market needs/requests from buyers/other admins"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Get market needs (buyer requests)
-        buyer_requests = MarketPost.query.filter(
+        buyer_requests = MarketPost.query.options(*loaders.market_post_listing()).filter(
             MarketPost.type == 'need',
             MarketPost.status == 'active'
         ).order_by(MarketPost.priority.desc(), MarketPost.created_at.desc()).all()
@@ -1236,18 +1185,53 @@ def get_admin_buyer_requests():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _post_export_query(post_type):
+    """Flat columns of active posts of one type, with the owner's username"""
+    return db.session.query(
+        MarketPost.id, MarketPost.user_id, User.username.label('username'), MarketPost.title,
+        MarketPost.category, MarketPost.type, MarketPost.status, MarketPost.approved, MarketPost.priority,
+        MarketPost.price, MarketPost.quantity, MarketPost.unit, MarketPost.location, MarketPost.region,
+        MarketPost.quality_grade, MarketPost.view_count, MarketPost.interest_count,
+        MarketPost.created_at, MarketPost.updated_at
+    ).join(User, MarketPost.user_id == User.id).filter(
+        MarketPost.type == post_type,
+        MarketPost.status == 'active'
+    )
+
+@market_bp.route('/admin/user-products/export', methods=['GET'])
+@admin_required
+def export_admin_user_products():
+    """Stream every active user product as NDJSON or CSV (?format=)"""
+    try:
+        fmt = export.export_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = _post_export_query('product').order_by(MarketPost.created_at.desc(), MarketPost.id.desc())
+    return export.export_response(query, fmt, 'user-products')
+
+@market_bp.route('/admin/buyer-requests/export', methods=['GET'])
+@admin_required
+def export_admin_buyer_requests():
+    """Stream every active buyer request as NDJSON or CSV (?format=)"""
+    try:
+        fmt = export.export_format(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    query = _post_export_query('need').order_by(
+        MarketPost.priority.desc(), MarketPost.created_at.desc(), MarketPost.id.desc()
+    )
+    return export.export_response(query, fmt, 'buyer-requests')
+
 @market_bp.route('/admin/product-requests', methods=['POST'])
-@jwt_required()
+@admin_required
 def admin_request_product():
     """Admin requests a specific product from user for a buyer"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         data = request.get_json()
         product_id = data.get('productId')
         quantity = data.get('quantity')
@@ -1283,19 +1267,17 @@ def admin_request_product():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/transactions', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_transactions():
     """Get admin's transaction history"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Get interests/transactions involving this admin
-        transactions = MarketInterest.query.filter_by(user_id=user_id).order_by(
+        transactions = MarketInterest.query.options(
+            *loaders.market_interest_with_post()
+        ).filter_by(user_id=user_id).order_by(
             MarketInterest.created_at.desc()
         ).all()
         
@@ -1314,19 +1296,17 @@ def get_admin_transactions():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/commissions', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_commissions():
     """Get admin's commission data"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Calculate commissions from completed transactions
-        completed_transactions = MarketInterest.query.filter_by(
+        completed_transactions = MarketInterest.query.options(
+            *loaders.market_interest_with_post_summary()
+        ).filter_by(
             user_id=user_id,
             status='accepted'
         ).all()
@@ -1361,17 +1341,13 @@ def get_admin_commissions():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/market-updates', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_market_updates():
     """Get market trends and updates for admins"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Generate market insights based on recent activity
         recent_products = MarketPost.query.filter(
             MarketPost.type == 'product',
@@ -1411,19 +1387,15 @@ def get_admin_market_updates():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/trending-products', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_trending_products():
     """Get trending products for admins"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Get products with high interest/view counts
-        trending_products = MarketPost.query.filter(
+        trending_products = MarketPost.query.options(*loaders.market_post_listing()).filter(
             MarketPost.type == 'product',
             MarketPost.status == 'active'
         ).order_by(
@@ -1440,17 +1412,13 @@ def get_admin_trending_products():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/dashboard', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_dashboard():
     """Get admin dashboard summary data"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Calculate dashboard stats
         total_transactions = MarketInterest.query.filter_by(user_id=user_id).count()
         active_transactions = MarketInterest.query.filter_by(
@@ -1463,7 +1431,9 @@ def get_admin_dashboard():
         ).count()
         
         # Calculate total commission (simplified)
-        completed_interests = MarketInterest.query.filter_by(
+        completed_interests = MarketInterest.query.options(
+            *loaders.market_interest_with_post_summary()
+        ).filter_by(
             user_id=user_id,
             status='accepted'
         ).all()
@@ -1490,17 +1460,13 @@ def get_admin_dashboard():
 # ==================== ADDITIONAL ENDPOINTS ====================
 
 @market_bp.route('/user/fill-form/<int:request_id>', methods=['POST'])
-@jwt_required()
+@user_required
 def user_fill_form(request_id):
     """Fill form for admin request - placeholder endpoint"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         data = request.get_json()
         
         # This is a placeholder implementation
@@ -1515,17 +1481,13 @@ def user_fill_form(request_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/notifications/<int:notification_id>', methods=['PATCH'])
-@jwt_required()
+@user_required
 def mark_user_notification_read(notification_id):
     """Mark user notification as read - placeholder endpoint"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         # This is a placeholder implementation
         # You would implement the actual notification marking logic here
         
@@ -1545,7 +1507,7 @@ def mark_user_notification_read(notification_id):
 def create_product_request():
     """Create a product request from buyer to farmer"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         data = request.get_json()
@@ -1588,7 +1550,7 @@ def create_product_request():
 def approve_product_request():
     """Farmer approves a product request"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         from models.market import ProductRequest
@@ -1619,7 +1581,7 @@ def approve_product_request():
 def reject_product_request():
     """Farmer rejects a product request"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         from models.market import ProductRequest
@@ -1649,7 +1611,7 @@ def reject_product_request():
 def create_delivery_details():
     """Create delivery details for approved request"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         data = request.get_json()
@@ -1705,21 +1667,19 @@ def create_delivery_details():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/user/requests', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_requests():
     """Get user's product requests"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is a regular user (farmer)
-        if identity.get('type') != 'user':
-            return jsonify({'error': 'User access required'}), 403
-        
+
         from models.market import ProductRequest
         
         # Get requests for user's products
-        requests = ProductRequest.query.filter_by(farmer_id=user_id).order_by(
+        requests = ProductRequest.query.options(
+            *loaders.product_request_listing()
+        ).filter_by(farmer_id=user_id).order_by(
             ProductRequest.created_at.desc()
         ).all()
         
@@ -1739,12 +1699,14 @@ def get_user_requests():
 def get_market_notifications():
     """Get market notifications"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         
         from models.market import MarketNotification
         
         # Get all active notifications
-        notifications = MarketNotification.query.filter_by(
+        notifications = MarketNotification.query.options(
+            *loaders.market_notification_listing()
+        ).filter_by(
             status='active'
         ).order_by(MarketNotification.created_at.desc()).all()
         
@@ -1757,17 +1719,13 @@ def get_market_notifications():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/notifications', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_market_notification():
     """Create market notification (admin only)"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         data = request.get_json()
         
         from models.market import MarketNotification
@@ -1806,17 +1764,13 @@ def create_market_notification():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/notifications/<int:notification_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_market_notification(notification_id):
     """Update market notification"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         from models.market import MarketNotification
         
         notification = MarketNotification.query.get_or_404(notification_id)
@@ -1863,17 +1817,13 @@ def update_market_notification(notification_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/notifications/<int:notification_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_market_notification(notification_id):
     """Delete market notification"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         from models.market import MarketNotification
         
         notification = MarketNotification.query.get_or_404(notification_id)
@@ -1895,17 +1845,13 @@ def delete_market_notification(notification_id):
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>/request', methods=['POST'])
-@jwt_required()
+@admin_required
 def admin_request_product_new():
     """Admin requests a product from user (creates interest with admin request flag)"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         data = request.get_json()
         
         # Get the product
@@ -1939,17 +1885,13 @@ def admin_request_product_new():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/posts/<int:post_id>/reject', methods=['POST'])
-@jwt_required()
+@admin_required
 def admin_reject_product():
     """Admin rejects a product"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        
-        # Verify user is an admin
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
+
         # Get the product
         product = MarketPost.query.get_or_404(post_id)
         
@@ -1970,12 +1912,14 @@ def admin_reject_product():
         return jsonify({'error': str(e)}), 500
     """Get farmer's received requests"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         from models.market import ProductRequest
         
-        requests = ProductRequest.query.filter_by(farmer_id=user_id).order_by(
+        requests = ProductRequest.query.options(
+            *loaders.product_request_listing()
+        ).filter_by(farmer_id=user_id).order_by(
             ProductRequest.created_at.desc()
         ).all()
         
@@ -1988,15 +1932,10 @@ def admin_reject_product():
         return jsonify({'error': str(e)}), 500
 
 @market_bp.route('/admin/demands', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_market_demand():
     """Admin creates market demand notification"""
     try:
-        identity = json.loads(get_jwt_identity())
-        
-        if identity.get('type') != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-        
         data = request.get_json()
         
         from models.market import MarketDemand
@@ -2054,11 +1993,11 @@ def get_market_demands():
 def get_market_history():
     """Get completed transactions history"""
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         
         # Get completed products for this user
-        completed_products = MarketPost.query.filter_by(
+        completed_products = MarketPost.query.options(*loaders.market_post_listing()).filter_by(
             user_id=user_id,
             status='sold'
         ).order_by(MarketPost.updated_at.desc()).all()
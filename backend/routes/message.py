@@ -1,65 +1,111 @@
 # backend/routes/message.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.message import Conversation, Message
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from models.message import Conversation, InboxEntry, Message
 from models.user import User
 from models.admin import Admin
 from extensions import db
+from services import inbox, pagination, realtime, serializers
+from services.identity import current_identity, user_required
 import datetime
-import json   # ✅ added
 
 message_bp = Blueprint('message', __name__)
 
 
+def _message_dict(message, read_ids):
+    """``message.to_dict()`` showing receipts that are still buffered as read"""
+    data = message.to_dict()
+    if message.id in read_ids:
+        data['is_read'] = True
+    return data
+
+
 @message_bp.route('/conversations', methods=['GET'])
 @jwt_required()
 def get_conversations():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
+    identity = current_identity()
     user_id = identity['id']
     user_type = identity['type']
+    selection = serializers.CONVERSATION.select(request.args)  # ?fields= / ?shape=
+    query = Conversation.query.options(*selection.options())
     
     if user_type == 'user':
-        conversations = Conversation.query.filter(
+        query = query.filter(
             (Conversation.user1_id == user_id) | (Conversation.user2_id == user_id)
-        ).all()
-    elif user_type == 'admin':
-        # Admin can see all conversations
-        conversations = Conversation.query.all()
-    else:
+        )
+    elif user_type != 'admin':  # Admin can see all conversations
         return jsonify({'message': 'Invalid user type'}), 403
     
+    # Paged newest first when ?limit= or ?cursor= is given
+    if 'limit' in request.args or pagination.cursor_requested(request.args):
+        try:
+            page_result = pagination.keyset_page(
+                query, Conversation.updated_at, Conversation.id,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', 20, type=int),
+                with_total=pagination.include_total(request.args, default=False)
+            )
+        except pagination.InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify({
+            'conversations': [selection.dump(conv) for conv in page_result.items],
+            **page_result.meta()
+        })
+    
+    conversations = query.all()
+    
     return jsonify({
-        'conversations': [conv.to_dict() for conv in conversations]
+        'conversations': [selection.dump(conv) for conv in conversations]
     })
 
 
-@message_bp.route('/conversations', methods=['POST'])
-@jwt_required()
-def create_conversation():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+@message_bp.route('/inbox', methods=['GET'])
+@user_required
+def get_inbox():
+    identity = current_identity()
 
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
+    # Newest conversation first, one range scan on the inbox read model
+    try:
+        page_result = pagination.keyset_page(
+            inbox.inbox_query(identity['id']), InboxEntry.updated_at, InboxEntry.id,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 20, type=int),
+            with_total=pagination.include_total(request.args, default=False)
+        )
+    except pagination.InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     
-    user_id = identity['id']
-    data = request.get_json()
-    receiver_id = data['receiver_id']
+    # Reads still waiting in the receipt buffer are not unread any more
+    pending = current_app.extensions['read_receipts'].unread_pending(identity['id'])
+    entries = []
+    for entry in page_result.items:
+        entry_data = entry.to_dict()
+        entry_data['unread_count'] = max(entry.unread_count - pending.get(entry.conversation_id, 0), 0)
+        entries.append(entry_data)
     
-    # Check if conversation already exists
-    conversation = Conversation.query.filter(
-        ((Conversation.user1_id == user_id) & (Conversation.user2_id == receiver_id)) |
-        ((Conversation.user1_id == receiver_id) & (Conversation.user2_id == user_id))
-    ).first()
+    return jsonify({
+        'inbox': entries,
+        'unread_total': max(inbox.unread_total(identity['id']) - sum(pending.values()), 0),
+        **page_result.meta()
+    })
+
+
+@message_bp.route('/conversations', methods=['POST'])
+@user_required
+def create_conversation():
+    identity = current_identity()
+    user_id = identity['id']
+    data = request.get_json() or {}
+    try:
+        receiver_id = int(data['receiver_id'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': 'receiver_id is required'}), 400
+    if db.session.get(User, receiver_id) is None:
+        return jsonify({'message': 'User not found'}), 404
     
-    if not conversation:
-        conversation = Conversation(user1_id=user_id, user2_id=receiver_id)
-        db.session.add(conversation)
-        db.session.commit()
+    # One row per user pair (uq_conversations_pair); concurrent creates get the same conversation
+    conversation, _ = inbox.get_or_create_conversation(user_id, receiver_id)
+    db.session.commit()
     
     return jsonify(conversation.to_dict())
 
@@ -67,10 +113,7 @@ def create_conversation():
 @message_bp.route('/conversations/<int:conversation_id>/messages', methods=['GET'])
 @jwt_required()
 def get_messages(conversation_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
+    identity = current_identity()
     user_id = identity['id']
     
     conversation = Conversation.query.get_or_404(conversation_id)
@@ -79,20 +122,40 @@ def get_messages(conversation_id):
     if identity.get('type') == 'user' and user_id not in [conversation.user1_id, conversation.user2_id]:
         return jsonify({'message': 'Not authorized to view this conversation'}), 403
     
-    messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.sent_at.asc()).all()
+    query = Message.query.filter_by(conversation_id=conversation_id)
+    # Receipts are recorded by each message's receiver; either may still be buffered
+    receipts = current_app.extensions['read_receipts']
+    read_ids = receipts.pending(conversation.user1_id, conversation_id) | \
+        receipts.pending(conversation.user2_id, conversation_id)
+    
+    # Paged when ?limit= or ?cursor= is given; order=desc walks back from the newest message
+    if 'limit' in request.args or pagination.cursor_requested(request.args):
+        try:
+            page_result = pagination.keyset_page(
+                query, Message.sent_at, Message.id,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', 50, type=int),
+                descending=request.args.get('order', 'asc').lower() == 'desc',
+                with_total=pagination.include_total(request.args, default=False)
+            )
+        except pagination.InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify({
+            'messages': [_message_dict(msg, read_ids) for msg in page_result.items],
+            **page_result.meta()
+        })
+    
+    messages = query.order_by(Message.sent_at.asc()).all()
     
     return jsonify({
-        'messages': [msg.to_dict() for msg in messages]
+        'messages': [_message_dict(msg, read_ids) for msg in messages]
     })
 
 
 @message_bp.route('/conversations/<int:conversation_id>/messages', methods=['POST'])
 @jwt_required()
 def send_message(conversation_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
+    identity = current_identity()
     user_id = identity['id']
     user_type = identity['type']
     
@@ -120,6 +183,7 @@ def send_message(conversation_id):
     db.session.add(message)
     conversation.updated_at = datetime.datetime.utcnow()
     db.session.commit()
+    realtime.publish_message(message)
     
     return jsonify({
         'message': 'Message sent successfully',
@@ -127,13 +191,58 @@ def send_message(conversation_id):
     }), 201
 
 
+@message_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])  # EventSource cannot send headers: ?jwt=<token>
+def stream_messages():
+    identity = current_identity()
+
+    if identity.get('type') != 'user':
+        return jsonify({'message': 'User access required'}), 403
+    
+    # Resume after the last delivered message: Last-Event-ID on reconnect, ?since_id= on first open
+    since_id = request.headers.get('Last-Event-ID') or request.args.get('since_id')
+    if since_id is not None:
+        try:
+            since_id = int(since_id)
+        except ValueError:
+            return jsonify({'message': 'since_id must be a message id'}), 400
+    
+    return Response(
+        stream_with_context(realtime.stream(identity['id'], since_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@message_bp.route('/conversations/<int:conversation_id>/read', methods=['PUT'])
+@user_required
+def mark_conversation_as_read(conversation_id):
+    identity = current_identity()
+    user_id = identity['id']
+    
+    conversation = Conversation.query.get_or_404(conversation_id)
+    if user_id not in [conversation.user1_id, conversation.user2_id]:
+        return jsonify({'message': 'Not authorized to mark this conversation as read'}), 403
+    
+    # Everything received up to up_to_id (default: all of it) in one UPDATE
+    data = request.get_json(silent=True) or {}
+    up_to_id = data.get('up_to_id', request.args.get('up_to_id'))
+    if up_to_id is not None:
+        try:
+            up_to_id = int(up_to_id)
+        except (TypeError, ValueError):
+            return jsonify({'message': 'up_to_id must be a message id'}), 400
+    
+    marked = inbox.mark_read(user_id, conversation_id, up_to_id=up_to_id)
+    db.session.commit()
+    
+    return jsonify({'message': 'Conversation marked as read', 'marked': marked})
+
+
 @message_bp.route('/messages/<int:message_id>/read', methods=['PUT'])
-@jwt_required()
+@user_required
 def mark_message_as_read(message_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
+    identity = current_identity()
     user_id = identity['id']
     
     message = Message.query.get_or_404(message_id)
@@ -142,8 +251,8 @@ def mark_message_as_read(message_id):
     if message.receiver_id != user_id:
         return jsonify({'message': 'Not authorized to mark this message as read'}), 403
     
-    message.is_read = True
-    message.read_at = datetime.datetime.utcnow()
-    db.session.commit()
+    # Coalesced with the reader's other receipts and written within READ_RECEIPT_FLUSH_INTERVAL
+    if not message.is_read:
+        current_app.extensions['read_receipts'].record(user_id, message.conversation_id, message.id)
     
     return jsonify({'message': 'Message marked as read'})
@@ -1,13 +1,15 @@
 # backend/routes/order.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.order import Order, OrderItem, OrderStatus
 from models.ecommerce import Cart, CartItem
 from extensions import db
+from services import serializers
+from services.pagination import keyset_page, cursor_requested, include_total, InvalidCursor
+from services.identity import admin_required, current_identity, user_required
 import datetime
 import random
 import string
-import json
 
 order_bp = Blueprint('order', __name__)
 
@@ -15,7 +17,7 @@ order_bp = Blueprint('order', __name__)
 @jwt_required()
 def get_orders():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         user_type = identity['type']
         
@@ -23,9 +25,10 @@ def get_orders():
         page = request.args.get("page", 1, type=int)
         per_page = request.args.get("per_page", 10, type=int)
         status = request.args.get("status")
+        selection = serializers.ORDER.select(request.args)  # ?fields= / ?shape=
         
         # Determine base query
-        query = Order.query
+        query = Order.query.options(*selection.options())
         
         # If not admin, filter by user ID
         if user_type != "admin":
@@ -43,21 +46,38 @@ def get_orders():
                     'valid_statuses': valid_statuses
                 }), 422
         
+        # Cursor pagination on (created_at, id)
+        if cursor_requested(request.args):
+            page_result = keyset_page(
+                query, Order.created_at, Order.id,
+                cursor=request.args.get("cursor"), limit=per_page,
+                with_total=include_total(request.args, default=False)
+            )
+            return jsonify({
+                "orders": [selection.dump(order) for order in page_result.items],
+                "per_page": per_page,
+                **page_result.meta(),
+                "message": "Orders retrieved successfully"
+            }), 200
+        
         # Apply pagination
+        with_total = include_total(request.args)
         pagination = query.order_by(Order.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+            page=page, per_page=per_page, error_out=False, count=with_total
         )
         
-        orders = [order.to_dict() for order in pagination.items]
+        orders = [selection.dump(order) for order in pagination.items]
         
         return jsonify({
             "orders": orders,
             "total": pagination.total,
             "page": pagination.page,
             "per_page": pagination.per_page,
-            "pages": pagination.pages,
+            "pages": pagination.pages if with_total else None,
             "message": "Orders retrieved successfully"
         }), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': f'Error retrieving orders: {str(e)}'}), 500
 
@@ -65,7 +85,7 @@ def get_orders():
 @jwt_required()
 def get_order(order_id):
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
         user_type = identity['type']
         
@@ -83,16 +103,12 @@ def get_order(order_id):
         return jsonify({'message': f'Error retrieving order: {str(e)}'}), 500
 
 @order_bp.route('/orders', methods=['POST'])
-@jwt_required()
+@user_required
 def create_order():
     try:
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_id = identity['id']
-        user_type = identity['type']
-        
-        if user_type != 'user':
-            return jsonify({'message': 'User access required'}), 403
-        
+
         data = request.get_json()
         
         # Validate required fields
@@ -153,16 +169,9 @@ def create_order():
         return jsonify({'message': f'Error creating order: {str(e)}'}), 500
 
 @order_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_order_status(order_id):
     try:
-        # Parse JWT identity correctly
-        identity = json.loads(get_jwt_identity())
-        user_type = identity.get('type')
-        
-        if user_type != 'admin':
-            return jsonify({'message': 'Admin access required'}), 403
-        
         order = Order.query.get_or_404(order_id)
         data = request.get_json()
         
@@ -198,7 +207,7 @@ def update_order_status(order_id):
 def update_order(order_id):
     try:
         # Parse JWT identity correctly
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_type = identity.get('type')
         user_id = identity.get('id')
         
@@ -233,7 +242,7 @@ def update_order(order_id):
 def cancel_order(order_id):
     try:
         # Parse JWT identity correctly
-        identity = json.loads(get_jwt_identity())
+        identity = current_identity()
         user_type = identity.get('type')
         user_id = identity.get('id')
         
@@ -1,11 +1,10 @@
 #backend/routes/profile.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
 from models.profile import UserProfile
-from models.user import User
 from extensions import db
+from services import blobstore, jobs
+from services.identity import current_identity, current_user, user_required
 import os
-from werkzeug.utils import secure_filename
 import datetime
 
 profile_bp = Blueprint('profile', __name__)
@@ -14,17 +13,22 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif'}
 
+def save_profile_picture(profile, image, identity):
+    """Store the uploaded original and queue its resized variants"""
+    # Stored by content hash, so two users' "photo.jpg" no longer overwrite each other
+    path = blobstore.put(image.stream, image.filename.rsplit('.', 1)[1])
+    
+    # The old picture's variants no longer describe the profile
+    profile.profile_picture_variants = None
+    profile.profile_picture = f'/static/uploads/{path}'
+    db.session.flush()
+    jobs.enqueue('images.profile_picture', {'profile_id': profile.id, 'picture': profile.profile_picture},
+                 owner=identity)
+
 @profile_bp.route('', methods=['GET'])
-@jwt_required()
+@user_required
 def get_user_profile():
-    import json
-    identity_raw = get_jwt_identity()
-    identity = identity_raw if isinstance(identity_raw, dict) else json.loads(identity_raw)
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
-    user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     
     return jsonify({
         'user': user.to_dict(),
@@ -32,14 +36,11 @@ def get_user_profile():
     })
 
 @profile_bp.route('', methods=['POST'])
-@jwt_required()
+@user_required
 def create_user_profile():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     
     if user.profile:
         return jsonify({'message': 'Profile already exists'}), 400
@@ -74,14 +75,11 @@ def create_user_profile():
     })
 
 @profile_bp.route('', methods=['PUT'])
-@jwt_required()
+@user_required
 def update_user_profile():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     profile = user.profile
     
     if not profile:
@@ -90,21 +88,16 @@ def update_user_profile():
     
     data = request.form.to_dict()
     
+    # Update profile fields; the variant paths are only ever written by the image pipeline
+    for key, value in data.items():
+        if hasattr(profile, key) and key != 'profile_picture_variants':
+            setattr(profile, key, value)
+    
     # Handle profile picture upload
     if 'profile_picture' in request.files:
         image = request.files['profile_picture']
         if image and allowed_file(image.filename):
-            filename = secure_filename(image.filename)
-            upload_folder = 'uploads/profiles'
-            os.makedirs(upload_folder, exist_ok=True)
-            image_path = os.path.join(upload_folder, filename)
-            image.save(image_path)
-            profile.profile_picture = f'/{upload_folder}/{filename}'
-    
-    # Update profile fields
-    for key, value in data.items():
-        if hasattr(profile, key):
-            setattr(profile, key, value)
+            save_profile_picture(profile, image, identity)
     
     profile.updated_at = datetime.datetime.utcnow()
     db.session.commit()
@@ -115,14 +108,11 @@ def update_user_profile():
     })
 
 @profile_bp.route('/picture', methods=['POST'])
-@jwt_required()
+@user_required
 def upload_profile_picture():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     profile = user.profile
     
     if 'profile_picture' not in request.files:
@@ -130,52 +120,45 @@ def upload_profile_picture():
     
     image = request.files['profile_picture']
     if image and allowed_file(image.filename):
-        filename = secure_filename(image.filename)
-        upload_folder = 'uploads/profiles'
-        os.makedirs(upload_folder, exist_ok=True)
-        image_path = os.path.join(upload_folder, filename)
-        image.save(image_path)
-        
         if not profile:
             profile = UserProfile(user_id=user_id)
             profile.first_name = 'N/A'
             profile.last_name = 'N/A'
             db.session.add(profile)
         
-        profile.profile_picture = f'/{upload_folder}/{filename}'
+        save_profile_picture(profile, image, identity)
         profile.updated_at = datetime.datetime.utcnow()
         db.session.commit()
         
         return jsonify({
             'message': 'Profile picture uploaded successfully',
-            'profile_picture': profile.profile_picture
+            'profile_picture': profile.profile_picture,
+            'processing': True
         })
     
     return jsonify({'message': 'Invalid file type'}), 400
 
 @profile_bp.route('/picture', methods=['DELETE'])
-@jwt_required()
+@user_required
 def delete_profile_picture():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
-    user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     profile = user.profile
     
     if not profile or not profile.profile_picture:
         return jsonify({'message': 'No profile picture found'}), 404
     
-    # Delete file from disk
-    image_path = os.path.join('uploads/profiles', profile.profile_picture.split('/')[-1])
-    try:
-        if os.path.exists(image_path):
-            os.remove(image_path)
-    except OSError:
-        pass  # Continue even if file deletion fails
+    # Stored blobs are shared and removed by the blob garbage collector once unreferenced;
+    # only pictures from before the blob store are deleted here
+    if not blobstore.digests(profile.profile_picture):
+        image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'profiles', profile.profile_picture.split('/')[-1])
+        try:
+            if os.path.exists(image_path):
+                os.remove(image_path)
+        except OSError:
+            pass  # Continue even if file deletion fails
     
     profile.profile_picture = None
+    profile.profile_picture_variants = None
     profile.updated_at = datetime.datetime.utcnow()
     db.session.commit()
     
@@ -1,18 +1,23 @@
 # backend/routes/sacco.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.sacco import Sacco, SaccoMember, Loan, LoanApplication
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from models.sacco import Sacco, SaccoMember, Loan, LoanApplication, SavingsTransaction
+from models.user import User
 from extensions import db
-from decimal import Decimal
+from services import export, jobs, loaders, sacco_engine, savings, serializers
+from services.pagination import keyset_page, cursor_requested, include_total, InvalidCursor
+from services.response_cache import cached_response
+from services.identity import admin_required, current_identity, user_required
+from decimal import Decimal, InvalidOperation
 import datetime
 import random
 import string
-import json   # ✅ added
 
 sacco_bp = Blueprint('sacco', __name__)
 
 
 @sacco_bp.route('/saccos', methods=['GET'])
+@cached_response('sacco.saccos', depends_on=(Sacco,))
 def get_saccos():
     region = request.args.get('region')
     search = request.args.get('search')
@@ -45,15 +50,8 @@ def get_saccos():
 
 
 @sacco_bp.route('/saccos', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_sacco():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.form.to_dict()
     print(f"DEBUG: Received SACCO creation data: {data}")  # Debug log
     
@@ -106,21 +104,15 @@ def create_sacco():
 
 
 @sacco_bp.route('/saccos/<int:sacco_id>', methods=['GET'])
+@cached_response('sacco.saccos', depends_on=(Sacco,))
 def get_sacco(sacco_id):
     sacco = Sacco.query.get_or_404(sacco_id)
     return jsonify(sacco.to_dict())
 
 
 @sacco_bp.route('/saccos/<int:sacco_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_sacco(sacco_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     sacco = Sacco.query.get_or_404(sacco_id)
     data = request.form.to_dict()
     
@@ -165,15 +157,8 @@ def update_sacco(sacco_id):
 
 
 @sacco_bp.route('/saccos/<int:sacco_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_sacco(sacco_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     sacco = Sacco.query.get_or_404(sacco_id)
     sacco.is_active = False
     db.session.commit()
@@ -184,15 +169,9 @@ def delete_sacco(sacco_id):
 
 
 @sacco_bp.route('/saccos/<int:sacco_id>/join', methods=['POST'])
-@jwt_required()
+@user_required
 def join_sacco(sacco_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
     sacco = Sacco.query.get_or_404(sacco_id)
     
@@ -227,15 +206,9 @@ def join_sacco(sacco_id):
 
 
 @sacco_bp.route('/membership', methods=['GET'])
-@jwt_required()
+@user_required
 def get_membership():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
     memberships = SaccoMember.query.filter_by(user_id=user_id).all()
     
@@ -265,15 +238,9 @@ def get_loans():
 
 
 @sacco_bp.route('/loan-applications', methods=['POST'])
-@jwt_required()
+@user_required
 def apply_for_loan():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
     data = request.get_json()
     
@@ -303,41 +270,123 @@ def apply_for_loan():
     }), 201
 
 
+def _parse_date(value, name):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} '{value}'; expected YYYY-MM-DD")
+
+
 @sacco_bp.route('/loan-applications', methods=['GET'])
 @jwt_required()
 def get_loan_applications():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+    """
+    Loan applications with their applicant, loan and sacco loaded in one query.
 
+    Filters: ``status`` (comma separated), ``date_from`` / ``date_to`` on the
+    application date, ``sacco_id``, ``loan_id`` and, for admins, ``user_id``.
+    Pages with ``?cursor=`` / ``?pagination=cursor`` or ``?page=`` / ``?per_page=``;
+    without either every matching application is returned.
+    """
+    identity = current_identity()
+
+    selection = serializers.LOAN_APPLICATION.select(request.args)  # ?fields= / ?shape=
+    query = LoanApplication.query.options(*selection.options(loaders.loan_application_listing()))
+    
     if identity.get('type') == 'user':
-        user_id = identity['id']
-        applications = LoanApplication.query.filter_by(user_id=user_id).all()
+        query = query.filter(LoanApplication.user_id == identity['id'])
     elif identity.get('type') == 'admin':
-        sacco_id = request.args.get('sacco_id')
-        if sacco_id:
-            applications = LoanApplication.query.join(Loan).filter(Loan.sacco_id == sacco_id).all()
-        else:
-            applications = LoanApplication.query.all()
+        user_id = request.args.get('user_id', type=int)
+        if user_id:
+            query = query.filter(LoanApplication.user_id == user_id)
     else:
         return jsonify({'message': 'Invalid user type'}), 403
-    
+
+    sacco_id = request.args.get('sacco_id', type=int)
+    if sacco_id:
+        query = query.filter(LoanApplication.loan.has(Loan.sacco_id == sacco_id))
+    loan_id = request.args.get('loan_id', type=int)
+    if loan_id:
+        query = query.filter(LoanApplication.loan_id == loan_id)
+    status = request.args.get('status')
+    if status and status != 'all':
+        query = query.filter(LoanApplication.status.in_([value.strip() for value in status.split(',')]))
+    try:
+        if request.args.get('date_from'):
+            query = query.filter(LoanApplication.application_date >= _parse_date(request.args['date_from'], 'date_from'))
+        if request.args.get('date_to'):
+            query = query.filter(LoanApplication.application_date <= _parse_date(request.args['date_to'], 'date_to'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    per_page = request.args.get('per_page', 20, type=int)
+
+    # Cursor pagination on (application_date, id)
+    if cursor_requested(request.args):
+        try:
+            page_result = keyset_page(
+                query, LoanApplication.application_date, LoanApplication.id,
+                cursor=request.args.get('cursor'), limit=per_page,
+                with_total=include_total(request.args, default=False)
+            )
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        return jsonify({
+            'applications': [selection.dump(application) for application in page_result.items],
+            'per_page': per_page,
+            **page_result.meta()
+        })
+
+    query = query.order_by(LoanApplication.application_date.desc(), LoanApplication.id.desc())
+    if 'page' in request.args or 'per_page' in request.args:
+        with_total = include_total(request.args)
+        page = query.paginate(page=request.args.get('page', 1, type=int), per_page=per_page,
+                              error_out=False, count=with_total)
+        return jsonify({
+            'applications': [selection.dump(application) for application in page.items],
+            'total': page.total,
+            'page': page.page,
+            'per_page': page.per_page,
+            'pages': page.pages if with_total else None
+        })
+
     return jsonify({
-        'applications': [app.to_dict() for app in applications]
+        'applications': [selection.dump(application) for application in query.all()]
     })
 
 
+@sacco_bp.route('/loan-applications/export', methods=['GET'])
+@admin_required
+def export_loan_applications():
+    """Stream loan applications as NDJSON or CSV (?format=, optional ?sacco_id=); admins only"""
+    try:
+        fmt = export.export_format(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    query = db.session.query(
+        LoanApplication.id, LoanApplication.user_id, User.username.label('username'),
+        User.email.label('email'), LoanApplication.loan_id, Loan.name.label('loan_name'),
+        Loan.sacco_id.label('sacco_id'), Sacco.name.label('sacco_name'), LoanApplication.amount,
+        LoanApplication.purpose, LoanApplication.status, LoanApplication.application_date,
+        LoanApplication.approval_date, LoanApplication.disbursement_date,
+        LoanApplication.repayment_start_date, LoanApplication.repayment_end_date
+    ).join(User, LoanApplication.user_id == User.id).join(
+        Loan, LoanApplication.loan_id == Loan.id
+    ).outerjoin(Sacco, Loan.sacco_id == Sacco.id)
+
+    sacco_id = request.args.get('sacco_id', type=int)
+    if sacco_id:
+        query = query.filter(Loan.sacco_id == sacco_id)
+
+    return export.export_response(query.order_by(LoanApplication.id), fmt, 'loan-applications')
+
+
 @sacco_bp.route('/loan-applications/<int:application_id>/status', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_loan_application_status(application_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+    identity = current_identity()
 
-    # Only admins can update loan application status
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     new_status = data.get('status')
     
@@ -355,6 +404,7 @@ def update_loan_application_status(application_id):
         return jsonify({'message': 'Loan application not found'}), 404
     
     # Update the status
+    previous_status = application.status
     application.status = new_status
     
     # Set approval/disbursement dates if applicable
@@ -366,6 +416,18 @@ def update_loan_application_status(application_id):
         if not application.approval_date:
             application.approval_date = datetime.date.today()
     
+    # Tell the applicant by email; the worker sends it, so the admin does not wait on SMTP
+    if (new_status != previous_status and new_status != 'pending'
+            and current_app.config.get('MAIL_USERNAME') and application.user and application.user.email):
+        loan_name = application.loan.name if application.loan else 'loan'
+        jobs.enqueue('email.send', {
+            'to': application.user.email,
+            'subject': f'Your {loan_name} application is {new_status}',
+            'body': (f'Hello {application.user.username},\n\n'
+                     f'Your application for KSh {float(application.amount):,.2f} ({loan_name}) '
+                     f'is now {new_status}.\n')
+        }, owner=identity)
+    
     try:
         db.session.commit()
         return jsonify({
@@ -377,60 +439,46 @@ def update_loan_application_status(application_id):
         return jsonify({'message': 'Failed to update status', 'error': str(e)}), 500
 
 
+def _idempotency_key(data):
+    """Client key that makes a retried posting return the original transaction"""
+    key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    return str(key)[:100] if key else None
+
+
 @sacco_bp.route('/members/<int:member_id>/deposit', methods=['POST'])
-@jwt_required()
+@admin_required
 def process_deposit(member_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+    identity = current_identity()
 
-    # Only admins can process deposits
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
-    data = request.get_json()
-    amount = data.get('amount')
-    
-    # Validate amount
-    if not amount or float(amount) <= 0:
-        return jsonify({'message': 'Invalid deposit amount'}), 400
+    data = request.get_json() or {}
+    SaccoMember.query.get_or_404(member_id)
     
     try:
-        amount = Decimal(str(amount))
-    except:
-        return jsonify({'message': 'Invalid amount format'}), 400
-    
-    # Find the member
-    member = SaccoMember.query.get_or_404(member_id)
-    
-    # Update member's savings
-    member.savings = (member.savings or Decimal('0.00')) + amount
-    
-    # Update SACCO total assets
-    sacco = Sacco.query.get(member.sacco_id)
-    if sacco:
-        sacco.total_assets = (sacco.total_assets or Decimal('0.00')) + amount
-    
-    db.session.commit()
+        transaction, replayed = savings.post_transaction(
+            member_id, 'deposit', data.get('amount'),
+            idempotency_key=_idempotency_key(data),
+            description=data.get('description'),
+            created_by_admin_id=identity.get('id')
+        )
+    except savings.SavingsError as e:
+        message = 'Invalid deposit amount' if e.message == 'Invalid amount' else e.message
+        return jsonify({'message': message}), e.status_code
     
-    return jsonify({
-        'message': f'Deposit of KSh {amount:,.2f} processed successfully',
+    member = SaccoMember.query.get(member_id)
+    response = jsonify({
+        'message': f'Deposit of KSh {transaction.amount:,.2f} processed successfully',
         'member': member.to_dict(),
-        'new_balance': float(member.savings)
-    }), 200
+        'new_balance': float(transaction.balance_after),
+        'transaction': transaction.to_dict()
+    })
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response, 200
 
 
 @sacco_bp.route('/saccos/<int:sacco_id>/members', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_sacco_members(sacco_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    # Only admins can view all members
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     sacco = Sacco.query.get_or_404(sacco_id)
     members = SaccoMember.query.filter_by(sacco_id=sacco_id).all()
     
@@ -441,16 +489,9 @@ def get_sacco_members(sacco_id):
 
 
 @sacco_bp.route('/savings/transaction', methods=['POST'])
-@jwt_required()
+@user_required
 def process_savings_transaction():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    # Only regular users can process their own savings transactions
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
     data = request.get_json()
     
@@ -464,15 +505,6 @@ def process_savings_transaction():
     transaction_type = data['transaction_type']
     amount = data.get('amount')
     
-    # Validate amount
-    if not amount or float(amount) <= 0:
-        return jsonify({'message': 'Invalid amount'}), 400
-    
-    try:
-        amount = Decimal(str(amount))
-    except:
-        return jsonify({'message': 'Invalid amount format'}), 400
-    
     # Check if user is a member of the SACCO
     member = SaccoMember.query.filter_by(
         user_id=user_id, 
@@ -483,45 +515,162 @@ def process_savings_transaction():
     if not member:
         return jsonify({'message': 'You must be an active member of this SACCO to make transactions'}), 400
     
-    # Process transaction based on type
-    if transaction_type == 'deposit':
-        # Add to member's savings
-        member.savings = (member.savings or Decimal('0.00')) + amount
-        
-        # Update SACCO total assets
-        sacco = Sacco.query.get(sacco_id)
-        if sacco:
-            sacco.total_assets = (sacco.total_assets or Decimal('0.00')) + amount
-        
-        message = f'Deposit of KSh {amount:,.2f} processed successfully'
-        
-    elif transaction_type == 'withdrawal':
-        # Check if user has sufficient balance
-        current_savings = member.savings or Decimal('0.00')
-        if current_savings < amount:
-            return jsonify({
-                'message': f'Insufficient balance. Available: KSh {float(current_savings):,.2f}'
-            }), 400
-        
-        # Deduct from member's savings
-        member.savings = current_savings - amount
-        
-        # Update SACCO total assets
-        sacco = Sacco.query.get(sacco_id)
-        if sacco:
-            sacco.total_assets = (sacco.total_assets or Decimal('0.00')) - amount
-        
-        message = f'Withdrawal of KSh {amount:,.2f} processed successfully'
-        
-    else:
-        return jsonify({'message': 'Invalid transaction type. Must be deposit or withdrawal'}), 400
+    # The balance is changed by one conditional UPDATE and recorded in the ledger
+    try:
+        transaction, replayed = savings.post_transaction(
+            member.id, transaction_type, amount,
+            idempotency_key=_idempotency_key(data),
+            description=data.get('description')
+        )
+    except savings.SavingsError as e:
+        return jsonify({'message': e.message}), e.status_code
     
+    label = 'Deposit' if transaction_type == 'deposit' else 'Withdrawal'
+    member = SaccoMember.query.get(member.id)
+    response = jsonify({
+        'message': f'{label} of KSh {transaction.amount:,.2f} processed successfully',
+        'transaction_type': transaction_type,
+        'amount': float(transaction.amount),
+        'new_balance': float(transaction.balance_after),
+        'member': member.to_dict(),
+        'transaction': transaction.to_dict()
+    })
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response, 200
+
+
+@sacco_bp.route('/members/<int:member_id>/statement', methods=['GET'])
+@jwt_required()
+def get_member_statement(member_id):
+    """
+    Savings statement for ``?from=`` / ``?to=`` (YYYY-MM-DD, inclusive).
+
+    Opening and closing balances come from the ledger's balance snapshots; the
+    transactions are paged oldest first with ``?cursor=`` and ``?per_page=``.
+    """
+    identity = current_identity()
+
+    member = SaccoMember.query.get_or_404(member_id)
+    if identity.get('type') != 'admin' and not (identity.get('type') == 'user' and member.user_id == identity.get('id')):
+        return jsonify({'message': 'Access denied'}), 403
+
+    try:
+        start = savings.parse_statement_date(request.args['from'], 'from') if request.args.get('from') else None
+        end = savings.parse_statement_date(request.args['to'], 'to') if request.args.get('to') else None
+        if end is not None:
+            end += datetime.timedelta(days=1)
+        opening, closing, query = savings.statement(member_id, start, end)
+        page_result = keyset_page(
+            query, SavingsTransaction.created_at, SavingsTransaction.id,
+            cursor=request.args.get('cursor'), limit=request.args.get('per_page', 50, type=int),
+            descending=False
+        )
+    except savings.SavingsError as e:
+        return jsonify({'message': e.message}), e.status_code
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({
+        'member': member.to_dict(),
+        'from': request.args.get('from'),
+        'to': request.args.get('to'),
+        'opening_balance': float(opening),
+        'closing_balance': float(closing),
+        'transactions': [transaction.to_dict() for transaction in page_result.items],
+        **page_result.meta()
+    })
+
+
+def _statement_rate(value):
+    """Optional ?rate= / "rate" override of SAVINGS_INTEREST_RATE"""
+    if value in (None, ''):
+        return None
+    rate = Decimal(str(value))
+    if not rate.is_finite() or rate < 0:
+        raise InvalidOperation
+    return rate
+
+
+@sacco_bp.route('/saccos/<int:sacco_id>/statements', methods=['GET'])
+@admin_required
+def get_sacco_statements(sacco_id):
+    """
+    Monthly statements for every member (``?month=YYYY-MM``, optional ``?rate=``).
+
+    ``?format=csv`` or ``ndjson`` streams one flattened row per member; the
+    default JSON also carries each member's loan positions and the totals.
+    """
+
+    Sacco.query.get_or_404(sacco_id)
+    month = request.args.get('month') or datetime.date.today().strftime('%Y-%m')
+    fmt = request.args.get('format', 'json').lower()
+    try:
+        rate = _statement_rate(request.args.get('rate'))
+        if fmt != 'json':
+            fmt = export.export_format(request.args)
+        run = sacco_engine.run_statements(sacco_id, month, rate)
+    except InvalidOperation:
+        return jsonify({'message': 'Invalid rate'}), 400
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    if fmt != 'json':
+        rows = (sacco_engine.statement_row(statement) for statement in run['statements'])
+        return export.rows_response(sacco_engine.STATEMENT_FIELDS, rows, fmt, f'sacco-{sacco_id}-statements-{month}')
+    return jsonify(sacco_engine.to_json(run))
+
+
+@sacco_bp.route('/saccos/<int:sacco_id>/interest', methods=['POST'])
+@admin_required
+def accrue_sacco_interest(sacco_id):
+    """Queue crediting a month's savings interest to every member; safe to repeat"""
+    identity = current_identity()
+
+    Sacco.query.get_or_404(sacco_id)
+    data = request.get_json() or {}
+    month = data.get('month')
+    if not month:
+        return jsonify({'message': 'month is required'}), 400
+    try:
+        month = sacco_engine.closed_month(month)
+        rate = _statement_rate(data.get('rate'))
+    except InvalidOperation:
+        return jsonify({'message': 'Invalid rate'}), 400
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Statements for every member are a heavy pass; a worker runs it and posts the credits
+    job = jobs.enqueue('sacco.post_interest', {
+        'sacco_id': sacco_id,
+        'month': month,
+        'rate': str(rate) if rate is not None else None
+    }, owner=identity)
     db.session.commit()
-    
+    response = jsonify({'message': 'Interest posting queued', 'job': job.to_dict()})
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+
+@sacco_bp.route('/loan-applications/<int:application_id>/schedule', methods=['GET'])
+@jwt_required()
+def get_loan_schedule(application_id):
+    """Amortization schedule of a loan application"""
+    identity = current_identity()
+
+    application = LoanApplication.query.options(*loaders.loan_application_listing()).get_or_404(application_id)
+    if identity.get('type') != 'admin' and not (identity.get('type') == 'user' and application.user_id == identity.get('id')):
+        return jsonify({'message': 'Access denied'}), 403
+    if not application.loan:
+        return jsonify({'message': 'Loan not found'}), 404
+
+    schedule = sacco_engine.amortization_schedule(
+        application.amount, application.loan.interest_rate, application.loan.repayment_period,
+        sacco_engine.first_due(application)
+    )
     return jsonify({
-        'message': message,
-        'transaction_type': transaction_type,
-        'amount': float(amount),
-        'new_balance': float(member.savings),
-        'member': member.to_dict()
-    }), 200
+        'application': application.to_dict(),
+        'schedule': sacco_engine.to_json(schedule),
+        'total_payable': float(sum((row['payment'] for row in schedule), Decimal('0.00'))),
+        'total_interest': float(sum((row['interest'] for row in schedule), Decimal('0.00')))
+    })
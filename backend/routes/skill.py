@@ -1,13 +1,15 @@
 #backend/routes/skill.py
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app, url_for
 from models.skill import SkillCategory, Skill, SkillVideo
 from extensions import db
-import json
+from services import blobstore, serializers, uploads
+from services.response_cache import cached_response
+from services.identity import admin_required, current_identity
 
 skill_bp = Blueprint('skill', __name__)
 
 @skill_bp.route('/categories', methods=['GET'])
+@cached_response('skill.categories', depends_on=(SkillCategory,))
 def get_skill_categories():
     categories = SkillCategory.query.all()
     return jsonify({
@@ -15,6 +17,7 @@ def get_skill_categories():
     })
 
 @skill_bp.route('/categories/<int:category_id>', methods=['GET'])
+@cached_response('skill.categories', depends_on=(SkillCategory,))
 def get_skill_category(category_id):
     category = SkillCategory.query.get_or_404(category_id)
     return jsonify(category.to_dict())
@@ -24,8 +27,9 @@ def get_skills():
     category_id = request.args.get('category_id')
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    selection = serializers.SKILL.select(request.args)  # ?fields= / ?shape=
     
-    query = Skill.query.filter_by(is_active=True)
+    query = Skill.query.options(*selection.options()).filter_by(is_active=True)
     
     if category_id:
         query = query.filter_by(category_id=category_id)
@@ -33,7 +37,7 @@ def get_skills():
     skills = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'skills': [skill.to_dict() for skill in skills.items],
+        'skills': [selection.dump(skill) for skill in skills.items],
         'total': skills.total,
         'pages': skills.pages,
         'current_page': page
@@ -45,12 +49,8 @@ def get_skill(skill_id):
     return jsonify(skill.to_dict())
 
 @skill_bp.route('/skills', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_skill():
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     skill = Skill(**data)
     db.session.add(skill)
@@ -62,12 +62,8 @@ def create_skill():
     }), 201
 
 @skill_bp.route('/skills/<int:skill_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_skill(skill_id):
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     skill = Skill.query.get_or_404(skill_id)
     data = request.get_json()
     
@@ -84,12 +80,8 @@ def update_skill(skill_id):
     }), 200
 
 @skill_bp.route('/skills/<int:skill_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_skill(skill_id):
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     skill = Skill.query.get_or_404(skill_id)
     skill.is_active = False  # Soft delete
     db.session.commit()
@@ -99,11 +91,9 @@ def delete_skill(skill_id):
     }), 200
 
 @skill_bp.route('/videos', methods=['POST'])
-@jwt_required()
+@admin_required
 def add_skill_video():
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
+    identity = current_identity()
     
     print("DEBUG: Content type:", request.content_type)
     print("DEBUG: Form data:", dict(request.form))
@@ -131,22 +121,15 @@ def add_skill_video():
         if 'video_file' in request.files:
             video_file = request.files['video_file']
             if video_file and video_file.filename:
-                from werkzeug.utils import secure_filename
                 from extensions import allowed_file
-                import uuid
                 import os
                 
                 if not allowed_file(video_file.filename):
                     return jsonify({'error': 'Invalid file type'}), 400
                 
-                # Generate unique filename
+                # Stored by content hash; re-uploading the same video reuses the stored copy
                 file_extension = os.path.splitext(video_file.filename)[1]
-                filename = str(uuid.uuid4().hex) + file_extension
-                
-                # Save file
-                upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-                video_file.save(upload_path)
+                filename = blobstore.put(video_file.stream, file_extension)
                 
                 # Set video_url to the file path
                 data['video_url'] = f'/static/uploads/{filename}'
@@ -161,13 +144,21 @@ def add_skill_video():
         data = request.get_json()
         print("DEBUG: JSON data:", data)
     
+    # A finished resumable upload (see /uploads) instead of a file in this request
+    upload_id = data.pop('upload_id', None) or request.form.get('upload_id')
+    if upload_id:
+        try:
+            data['video_url'] = f'/static/uploads/{uploads.take(upload_id, identity)}'
+        except uploads.UploadError as e:
+            return jsonify({'error': e.message}), e.status_code
+    
     # Validate required fields
     if not data.get('skill_id'):
         return jsonify({'error': 'skill_id is required'}), 400
     if not data.get('title'):
         return jsonify({'error': 'title is required'}), 400
     if not data.get('video_url'):
-        return jsonify({'error': 'video_url or video_file is required'}), 400
+        return jsonify({'error': 'video_url, video_file or upload_id is required'}), 400
     
     print("DEBUG: Final data for SkillVideo:", data)
     
@@ -192,18 +183,16 @@ def add_skill_video():
         return jsonify({'error': f'Database error: {str(e)}'}), 500
 
 @skill_bp.route('/videos/<int:video_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required
 def delete_skill_video(video_id):
-    identity = json.loads(get_jwt_identity())
-    if identity['type'] != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     try:
         # Find the video
         video = SkillVideo.query.get_or_404(video_id)
         
-        # If it's a file upload (not a URL), delete the file
-        if video.video_url and video.video_url.startswith('/static/uploads/'):
+        # If it's a file upload (not a URL), delete the file; stored blobs are shared
+        # and are removed by the blob garbage collector once nothing references them
+        if (video.video_url and video.video_url.startswith('/static/uploads/')
+                and not blobstore.digests(video.video_url)):
             import os
             file_path = os.path.join(current_app.static_folder, 'uploads', os.path.basename(video.video_url))
             if os.path.exists(file_path):
@@ -221,4 +210,111 @@ def delete_skill_video(video_id):
     except Exception as e:
         print(f"DEBUG: Error deleting video: {str(e)}")
         db.session.rollback()
-        return jsonify({'error': f'Error deleting video: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'error': f'Error deleting video: {str(e)}'}), 500
+# ==================== RESUMABLE VIDEO UPLOADS (tus 1.0) ====================
+
+def _tus_error(e):
+    response = jsonify({'error': e.message})
+    response.headers.update(uploads.protocol_headers())
+    return response, e.status_code
+
+def _tus_version_error():
+    """A 412 response when the client speaks another Tus-Resumable version, else None"""
+    version = request.headers.get('Tus-Resumable')
+    if request.method != 'GET' and version and version != uploads.TUS_VERSION:
+        response = jsonify({'error': f'Unsupported Tus-Resumable version {version}'})
+        response.headers['Tus-Version'] = uploads.TUS_VERSION
+        return response, 412
+    return None
+
+@skill_bp.route('/uploads', methods=['OPTIONS'])
+def upload_capabilities():
+    response = current_app.make_default_options_response()
+    response.headers.update({
+        'Tus-Resumable': uploads.TUS_VERSION,
+        'Tus-Version': uploads.TUS_VERSION,
+        'Tus-Extension': uploads.TUS_EXTENSIONS,
+        'Tus-Max-Size': str(current_app.config['UPLOAD_MAX_SIZE']),
+    })
+    response.status_code = 204
+    return response
+
+@skill_bp.route('/uploads', methods=['POST'])
+@admin_required
+def create_video_upload():
+    error = _tus_version_error()
+    if error:
+        return error
+    identity = current_identity()
+    
+    try:
+        length = uploads.parse_length(request.headers.get('Upload-Length'), 'Upload-Length')
+        metadata = uploads.parse_metadata(request.headers.get('Upload-Metadata'))
+        upload = uploads.create(length, metadata, identity, allowed={'mp4', 'avi', 'mov', 'webm', 'mkv'})
+        db.session.commit()
+    except uploads.UploadError as e:
+        db.session.rollback()
+        return _tus_error(e)
+    
+    response = jsonify({'upload': upload.to_dict()})
+    response.headers.update(uploads.protocol_headers(upload))
+    response.headers['Location'] = url_for('skill.video_upload_status', upload_id=upload.id)
+    return response, 201
+
+@skill_bp.route('/uploads/<upload_id>', methods=['GET'])  # HEAD is answered from this too
+@admin_required
+def video_upload_status(upload_id):
+    error = _tus_version_error()
+    if error:
+        return error
+    identity = current_identity()
+    
+    upload = uploads.get(upload_id, identity)
+    if upload is None:
+        return _tus_error(uploads.UploadError('Upload not found', 404))
+    
+    response = jsonify({'upload': upload.to_dict()})
+    response.headers.update(uploads.protocol_headers(upload))
+    return response
+
+@skill_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+@admin_required
+def append_video_upload(upload_id):
+    error = _tus_version_error()
+    if error:
+        return error
+    identity = current_identity()
+    
+    upload = uploads.get(upload_id, identity)
+    if upload is None:
+        return _tus_error(uploads.UploadError('Upload not found', 404))
+    if request.mimetype != uploads.CONTENT_TYPE:
+        return _tus_error(uploads.UploadError(f'Content-Type must be {uploads.CONTENT_TYPE}', 415))
+    
+    try:
+        offset = uploads.parse_length(request.headers.get('Upload-Offset'), 'Upload-Offset')
+        upload = uploads.write(upload, offset, request.stream, request.content_length)
+    except uploads.UploadError as e:
+        return _tus_error(e)
+    
+    response = current_app.response_class(status=204)
+    response.headers.update(uploads.protocol_headers(upload))
+    return response
+
+@skill_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@admin_required
+def delete_video_upload(upload_id):
+    error = _tus_version_error()
+    if error:
+        return error
+    identity = current_identity()
+    
+    upload = uploads.get(upload_id, identity)
+    if upload is None:
+        return _tus_error(uploads.UploadError('Upload not found', 404))
+    
+    uploads.terminate(upload)
+    db.session.commit()
+    response = current_app.response_class(status=204)
+    response.headers.update(uploads.protocol_headers())
+    return response
@@ -1,8 +1,11 @@
 # backend/routes/storage.py
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.storage import Warehouse, StorageRequest, StorageTransaction
 from extensions import db, allowed_file
+from services import export
+from services.response_cache import cached_response
+from services.identity import admin_required, current_identity, user_required
 from decimal import Decimal
 import datetime
 import json   # ✅ added
@@ -14,6 +17,7 @@ storage_bp = Blueprint('storage', __name__)
 
 
 @storage_bp.route('/warehouses', methods=['GET'])
+@cached_response('storage.warehouses', depends_on=(Warehouse,))
 def get_warehouses():
     region = request.args.get('region')
     page = request.args.get('page', 1, type=int)
@@ -34,21 +38,15 @@ def get_warehouses():
 
 
 @storage_bp.route('/warehouses/<int:warehouse_id>', methods=['GET'])
+@cached_response('storage.warehouses', depends_on=(Warehouse,))
 def get_warehouse(warehouse_id):
     warehouse = Warehouse.query.get_or_404(warehouse_id)
     return jsonify(warehouse.to_dict())
 
 
 @storage_bp.route('/warehouses', methods=['POST'])
-@jwt_required()
+@admin_required
 def create_warehouse():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     # Handle both JSON and FormData
     if request.content_type and 'multipart/form-data' in request.content_type:
         # FormData (with file upload)
@@ -104,15 +102,8 @@ def create_warehouse():
 
 
 @storage_bp.route('/warehouses/<int:warehouse_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_warehouse(warehouse_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     warehouse = Warehouse.query.get_or_404(warehouse_id)
     data = request.get_json()
     
@@ -144,15 +135,9 @@ def update_warehouse(warehouse_id):
 
 
 @storage_bp.route('/storage-requests', methods=['POST'])
-@jwt_required()
+@user_required
 def create_storage_request():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
-
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
     data = request.get_json()
     
@@ -211,9 +196,7 @@ def create_storage_request():
 @storage_bp.route('/storage-requests', methods=['GET'])
 @jwt_required()
 def get_storage_requests():
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+    identity = current_identity()
 
     if identity.get('type') == 'user':
         user_id = identity['id']
@@ -232,16 +215,39 @@ def get_storage_requests():
     })
 
 
-@storage_bp.route('/storage-requests/<int:request_id>/status', methods=['PUT'])
+@storage_bp.route('/storage-requests/export', methods=['GET'])
 @jwt_required()
-def update_storage_request_status(request_id):
-    identity = get_jwt_identity()
-    if isinstance(identity, str):
-        identity = json.loads(identity)
+def export_storage_requests():
+    """Stream storage requests as NDJSON or CSV (?format=); users get their own, admins all"""
+    identity = current_identity()
+    try:
+        fmt = export.export_format(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    if identity.get('type') != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
+    query = db.session.query(
+        StorageRequest.id, StorageRequest.user_id, StorageRequest.warehouse_id,
+        Warehouse.name.label('warehouse_name'), StorageRequest.product_type, StorageRequest.quantity,
+        StorageRequest.duration, StorageRequest.start_date, StorageRequest.end_date,
+        StorageRequest.special_requirements, StorageRequest.status, StorageRequest.requested_at,
+        StorageRequest.approved_at, StorageRequest.total_cost
+    ).outerjoin(Warehouse, StorageRequest.warehouse_id == Warehouse.id)
+
+    if identity.get('type') == 'user':
+        query = query.filter(StorageRequest.user_id == identity['id'])
+    elif identity.get('type') == 'admin':
+        warehouse_id = request.args.get('warehouse_id', type=int)
+        if warehouse_id:
+            query = query.filter(StorageRequest.warehouse_id == warehouse_id)
+    else:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    return export.export_response(query.order_by(StorageRequest.id), fmt, 'storage-requests')
+
+
+@storage_bp.route('/storage-requests/<int:request_id>/status', methods=['PUT'])
+@admin_required
+def update_storage_request_status(request_id):
     storage_request = StorageRequest.query.get_or_404(request_id)
     data = request.get_json()
     
@@ -1,20 +1,17 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from models.user import User
 from extensions import db
+from services.identity import current_identity, current_user, user_required
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/dashboard', methods=['GET'])
-@jwt_required()
+@user_required
 def user_dashboard():
-    import json
-    identity = json.loads(get_jwt_identity())
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
+    identity = current_identity()
     user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -22,37 +19,38 @@ def user_dashboard():
     # Get user statistics
     from models.order import Order
     from models.market import MarketPost
-    from models.storage import StorageRequest
+    from services import dashboard as dashboard_service, loaders
     
-    order_count = Order.query.filter_by(user_id=user_id).count()
-    market_post_count = MarketPost.query.filter_by(user_id=user_id).count()
-    storage_request_count = StorageRequest.query.filter_by(user_id=user_id).count()
+    timer = dashboard_service.SectionTimer()
+    with timer.section('counts'):
+        counts, _ = dashboard_service.user_counts(user_id)
     
     # Get recent activity
-    recent_orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).limit(5).all()
-    recent_posts = MarketPost.query.filter_by(user_id=user_id).order_by(MarketPost.created_at.desc()).limit(5).all()
-    
-    return jsonify({
+    with timer.section('recent'):
+        recent_orders = Order.query.options(*loaders.order_listing()).filter_by(
+            user_id=user_id
+        ).order_by(Order.created_at.desc()).limit(5).all()
+        recent_posts = MarketPost.query.options(*loaders.market_post_listing()).filter_by(
+            user_id=user_id
+        ).order_by(MarketPost.created_at.desc()).limit(5).all()
+    
+    return timer.apply(jsonify({
         'user': user.to_dict(),
         'profile': user.profile.to_dict() if user.profile else None,
         'stats': {
-            'orders': order_count,
-            'market_posts': market_post_count,
-            'storage_requests': storage_request_count
+            'orders': counts['orders'],
+            'market_posts': counts['market_posts'],
+            'storage_requests': counts['storage_requests']
         },
         'recent_orders': [order.to_dict() for order in recent_orders],
-        'recent_posts': [post.to_dict() for post in recent_posts]
-    })
+        'recent_posts': [post.to_dict() for post in recent_posts],
+        'timings': timer.timings
+    }))
 
 @user_bp.route('/me', methods=['GET'])
-@jwt_required()
+@user_required
 def get_current_user():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
-    user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     
     return jsonify({
         'user': user.to_dict(),
@@ -60,14 +58,9 @@ def get_current_user():
     })
 
 @user_bp.route('/change-password', methods=['PUT'])
-@jwt_required()
+@user_required
 def change_password():
-    identity = get_jwt_identity()
-    if identity.get('type') != 'user':
-        return jsonify({'message': 'User access required'}), 403
-    
-    user_id = identity['id']
-    user = User.query.get(user_id)
+    user = current_user()
     data = request.get_json()
     
     # Verify current password
@@ -83,8 +76,7 @@ def change_password():
 @user_bp.route('/search', methods=['GET'])
 @jwt_required()
 def search_users():
-    import json
-    identity = json.loads(get_jwt_identity())
+    identity = current_identity()
     
     query = request.args.get('q', '').strip()
     limit = min(int(request.args.get('limit', 20)), 50)  # Max 50 results
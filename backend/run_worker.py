@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Run background job workers
+
+Keep working (Ctrl+C to stop):  python run_worker.py [--processes 4]
+Drain the queue and exit:       python run_worker.py --burst
+Only some tasks:                python run_worker.py --tasks email.send,weather.forecast
+
+Each process claims jobs from the jobs table on its own, so workers can run
+on several machines against the same database (JOB_POLL_INTERVAL,
+JOB_RETRY_BACKOFF, JOB_LOCK_TIMEOUT, JOB_HEARTBEAT_INTERVAL).
+"""
+import sys
+import os
+import argparse
+import multiprocessing
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+
+def work(tasks, burst, poll_interval):
+    from app import app
+    from services.jobs import JobWorker
+
+    worker = JobWorker(app, names=tasks, poll_interval=poll_interval)
+    if burst:
+        print(f"✅ Worker {worker.worker_id} ran {worker.run_pending()} jobs")
+        return
+    print(f"🔄 Worker {worker.worker_id} waiting for jobs")
+    worker.start()
+    try:
+        worker._thread.join()
+    except KeyboardInterrupt:
+        worker.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes to run (default 1)')
+    parser.add_argument('--tasks', help='comma separated task names to run (default: all)')
+    parser.add_argument('--burst', action='store_true', help='run the ready jobs, then exit')
+    parser.add_argument('--poll', type=float, help='seconds between polls when idle (default JOB_POLL_INTERVAL)')
+    args = parser.parse_args()
+    tasks = [name.strip() for name in args.tasks.split(',')] if args.tasks else None
+
+    if args.processes <= 1:
+        work(tasks, args.burst, args.poll)
+        return 0
+
+    processes = [multiprocessing.Process(target=work, args=(tasks, args.burst, args.poll), name=f'job-worker-{n}')
+                 for n in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
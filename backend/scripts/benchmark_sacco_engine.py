@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the batch SACCO statement engine
+
+Seeds a throwaway SQLite database with one SACCO, N members (default 100,000),
+a few savings transactions per member and a loan for every tenth member. It
+then times run_statements() and post_interest() and reports the number of
+queries each issued. Usage:
+
+    python scripts/benchmark_sacco_engine.py [--members 100000] [--transactions 3]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+parser = argparse.ArgumentParser(description='Benchmark the SACCO statement engine')
+parser.add_argument('--members', type=int, default=100000)
+parser.add_argument('--transactions', type=int, default=3, help='ledger rows per member in the month')
+parser.add_argument('--month', default='2025-01')
+args = parser.parse_args()
+
+# The app reads DATABASE_URL when it is imported, so point it at a scratch file first
+database = os.path.join(tempfile.mkdtemp(prefix='sacco-bench-'), 'bench.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+os.environ['WEATHER_PREFETCH_ENABLED'] = 'false'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from app import app
+from extensions import db
+from models.user import User
+from models.sacco import Sacco, SaccoMember, Loan, LoanApplication, SavingsTransaction
+from services import sacco_engine
+
+
+def seed(members, transactions, month):
+    random.seed(7)
+    start, end = sacco_engine.parse_month(month)
+    seconds = int((end - start).total_seconds())
+    opening_day = start - datetime.timedelta(days=10)
+
+    sacco = Sacco(name='Benchmark Sacco', registration_number='BENCH-001', total_assets=Decimal('0.00'))
+    db.session.add(sacco)
+    loan = Loan(sacco=sacco, name='Benchmark Loan', interest_rate=12.0, repayment_period=12,
+                max_amount=Decimal('500000'))
+    db.session.add(loan)
+    db.session.flush()
+
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    db.session.execute(User.__table__.insert(), [
+        {'id': first_user + i, 'username': f'bench_{i}', 'email': f'bench_{i}@example.com',
+         'password_hash': 'x', 'user_type': 'farmer'}
+        for i in range(members)
+    ])
+    db.session.execute(SaccoMember.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + i, 'sacco_id': sacco.id, 'membership_id': f'BENCH-{i}',
+         'savings': Decimal('0.00'), 'is_active': True, 'shares': 0}
+        for i in range(members)
+    ])
+
+    ledger, balances = [], {}
+    for member_id in range(1, members + 1):
+        balance = Decimal(random.randint(1000, 50000))
+        ledger.append({'member_id': member_id, 'sacco_id': sacco.id, 'transaction_type': 'opening_balance',
+                       'amount': balance, 'balance_after': balance, 'created_at': opening_day})
+        for moment in sorted(random.randrange(seconds) for _ in range(transactions)):
+            amount = Decimal(random.randint(100, 5000))
+            kind = 'withdrawal' if balance > amount and random.random() < 0.3 else 'deposit'
+            balance += -amount if kind == 'withdrawal' else amount
+            ledger.append({'member_id': member_id, 'sacco_id': sacco.id, 'transaction_type': kind,
+                           'amount': amount, 'balance_after': balance,
+                           'created_at': start + datetime.timedelta(seconds=moment)})
+        balances[member_id] = balance
+    for offset in range(0, len(ledger), 50000):
+        db.session.execute(SavingsTransaction.__table__.insert(), ledger[offset:offset + 50000])
+    db.session.execute(
+        SaccoMember.__table__.update().where(SaccoMember.__table__.c.id == db.bindparam('member_id'))
+        .values(savings=db.bindparam('balance')),
+        [{'member_id': member_id, 'balance': balance} for member_id, balance in balances.items()]
+    )
+    db.session.execute(LoanApplication.__table__.insert(), [
+        {'user_id': first_user + i, 'loan_id': loan.id, 'amount': Decimal(random.randint(10000, 200000)),
+         'purpose': 'Inputs', 'status': 'disbursed', 'application_date': (start - datetime.timedelta(days=90)).date(),
+         'disbursement_date': (start - datetime.timedelta(days=60)).date()}
+        for i in range(0, members, 10)
+    ])
+    db.session.commit()
+    return sacco.id, len(ledger)
+
+
+def timed(label, fn):
+    statements = []
+    record = lambda conn, cursor, statement, *a: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, 'before_cursor_execute', record)
+    print(f"⏱  {label}: {elapsed:.2f}s, {len(statements)} queries")
+    return result, elapsed
+
+
+with app.app_context():
+    print(f"🔄 Seeding {args.members:,} members into {database}...")
+    started = time.perf_counter()
+    sacco_id, ledger_rows = seed(args.members, args.transactions, args.month)
+    print(f"   {ledger_rows:,} ledger rows in {time.perf_counter() - started:.1f}s")
+
+    run, elapsed = timed('run_statements', lambda: sacco_engine.run_statements(sacco_id, args.month, '6'))
+    print(f"   {run['member_count']:,} statements, {run['member_count'] / elapsed:,.0f} members/s, "
+          f"interest accrued KSh {run['totals']['interest_accrued']:,.2f}")
+
+    (credited, total), _ = timed('post_interest', lambda: sacco_engine.post_interest(run))
+    print(f"   credited KSh {total:,.2f} to {credited:,} members")
+    (again, _), _ = timed('post_interest (repeat)', lambda: sacco_engine.post_interest(run))
+    print(f"   repeat credited {again} members")
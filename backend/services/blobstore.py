@@ -0,0 +1,272 @@
+# backend/services/blobstore.py
+"""
+Content-addressed upload storage.
+
+Uploads are stored once per distinct content under
+``UPLOAD_FOLDER/blobs/ab/cd/<sha256>.<ext>``. The two-level shard keeps every
+directory small however many files there are. ``put`` streams the upload to
+a temp file in the same tree while hashing it. If a blob with that digest
+already exists, the copy is dropped (deduplicated). Otherwise it is renamed
+into place. Either way the ``blobs`` row is upserted in the caller's
+transaction, and the path is returned for the caller to store in its own
+column.
+
+``blobs.ref_count`` is how many rows point at a blob. A session
+``after_flush`` hook reads the upload columns of MarketPostImage, SkillVideo,
+UserProfile and UploadSession (see REFERENCES) from every inserted, updated or deleted row.
+It applies the difference in the same transaction, the way market_stats
+maintains its counters, and reads old values through ``services.history``. ``collect_garbage`` first recomputes the counts from
+those columns to repair drift from bulk updates. It then deletes blobs that
+have been unreferenced for longer than BLOB_GC_GRACE, along with files that
+never got a row (uploads whose request rolled back).
+"""
+import datetime
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from flask import current_app
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from extensions import db
+from models.blob import Blob
+from models.market import MarketPostImage
+from models.profile import UserProfile
+from models.skill import SkillVideo
+from models.upload import UploadSession
+from services import history
+
+CHUNK_SIZE = 1024 * 1024
+BLOB_DIR = 'blobs'
+TMP_DIR = 'tmp'
+# A blob path anywhere in a column value, including inside the variants JSON
+BLOB_PATH = re.compile(r'blobs/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+')
+
+# Columns whose values may point at blobs
+REFERENCES = {
+    MarketPostImage: ('image_url', 'variants'),
+    SkillVideo: ('video_url', 'thumbnail_url'),
+    UserProfile: ('profile_picture', 'profile_picture_variants'),
+    UploadSession: ('blob_path',),  # finished resumable uploads not yet attached
+}
+for _model, _fields in REFERENCES.items():
+    history.track(_model, _fields)
+
+
+def _absolute(relative):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], relative)
+
+
+def _tmp_dir():
+    path = _absolute(os.path.join(BLOB_DIR, TMP_DIR))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def blob_path(digest, extension):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}.{extension}'
+
+
+def digests(*values):
+    """SHA-256 digests of the blobs referenced by ``values``"""
+    found = set()
+    for value in values:
+        if isinstance(value, str):
+            found.update(BLOB_PATH.findall(value))
+    return found
+
+
+def partial_file(extension=''):
+    """A fresh temp path in the store's filesystem, for files handed to ``adopt``"""
+    fd, path = tempfile.mkstemp(dir=_tmp_dir(), suffix=f'.{extension}.part' if extension else '.part')
+    os.close(fd)
+    return path
+
+
+def _upsert(digest, extension, size):
+    """The blob row for ``digest``, created if new and touched either way"""
+    now = datetime.datetime.utcnow()
+    row = {'sha256': digest, 'extension': extension, 'size': size, 'ref_count': 0,
+           'created_at': now, 'touched_at': now}
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        db.session.execute(insert(Blob).values(row).on_conflict_do_nothing(index_elements=['sha256']))
+    elif db.session.execute(select(Blob.id).where(Blob.sha256 == digest)).first() is None:
+        db.session.execute(Blob.__table__.insert().values(row))
+
+    db.session.execute(update(Blob).where(Blob.sha256 == digest).values(touched_at=now)
+                       .execution_options(synchronize_session=False))
+    return db.session.execute(select(Blob.extension).where(Blob.sha256 == digest)).scalar_one()
+
+
+def adopt(partial, extension):
+    """Move the finished temp file ``partial`` into the store; returns its blob path"""
+    extension = (extension or 'bin').lower().lstrip('.')[:10]
+    try:
+        hasher, size = hashlib.sha256(), 0
+        with open(partial, 'rb') as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                size += len(chunk)
+        return _place(partial, hasher.hexdigest(), extension, size)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def put(stream, extension):
+    """Store the bytes read from ``stream``; returns the blob path under UPLOAD_FOLDER"""
+    extension = (extension or 'bin').lower().lstrip('.')[:10]
+    partial = partial_file()
+    try:
+        hasher, size = hashlib.sha256(), 0
+        with open(partial, 'wb') as out:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        return _place(partial, hasher.hexdigest(), extension, size)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _place(partial, digest, extension, size):
+    # A digest already stored keeps its first extension, so its path never changes
+    path = blob_path(digest, _upsert(digest, extension, size))
+    target = _absolute(path)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(partial, target)
+    return path
+
+
+# ==================== REFERENCE COUNTS ====================
+
+def flush_deltas(session):
+    """ref_count deltas by digest implied by the pending changes in ``session``"""
+    deltas = Counter()
+    for obj in session.new:
+        fields = REFERENCES.get(type(obj))
+        if fields:
+            deltas.update(digests(*history.column_values(obj, fields, before=False)))
+    for obj in session.deleted:
+        fields = REFERENCES.get(type(obj))
+        if fields:
+            deltas.subtract(digests(*history.column_values(obj, fields, before=True)))
+    for obj in session.dirty:
+        fields = REFERENCES.get(type(obj))
+        if fields and session.is_modified(obj, include_collections=False):
+            deltas.subtract(digests(*history.column_values(obj, fields, before=True)))
+            deltas.update(digests(*history.column_values(obj, fields, before=False)))
+    return {digest: delta for digest, delta in deltas.items() if delta}
+
+
+def apply_deltas(connection, deltas):
+    """One UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for digest, delta in deltas.items():
+        by_delta[delta].append(digest)
+    for delta, group in by_delta.items():
+        connection.execute(
+            update(Blob).where(Blob.sha256.in_(group)).values(ref_count=Blob.ref_count + delta)
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_ref_counts(session, flush_context):
+    deltas = flush_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def compute_ref_counts():
+    """How many rows reference each digest, read from the upload columns"""
+    counts = Counter()
+    for model, fields in REFERENCES.items():
+        columns = [getattr(model, field) for field in fields]
+        for row in db.session.execute(select(*columns)).yield_per(1000):
+            counts.update(digests(*row))
+    return counts
+
+
+def reconcile_ref_counts():
+    """Rewrite drifted ref_counts from the upload columns; returns how many were wrong"""
+    expected = compute_ref_counts()
+    drifted = {
+        digest: expected.get(digest, 0)
+        for digest, stored in db.session.execute(select(Blob.sha256, Blob.ref_count)).all()
+        if stored != expected.get(digest, 0)
+    }
+    for digest, count in drifted.items():
+        db.session.execute(update(Blob).where(Blob.sha256 == digest).values(ref_count=count)
+                           .execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(drifted)
+
+
+# ==================== GARBAGE COLLECTION ====================
+
+def collect_garbage(grace=None):
+    """Delete unreferenced blobs and row-less files older than ``grace`` seconds; returns counts"""
+    grace = current_app.config.get('BLOB_GC_GRACE', 3600) if grace is None else grace
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=grace)
+    results = {'drifted': reconcile_ref_counts(), 'blobs_deleted': 0, 'bytes_freed': 0, 'files_swept': 0}
+
+    candidates = db.session.execute(
+        select(Blob.id, Blob.sha256, Blob.extension, Blob.size)
+        .where(Blob.ref_count <= 0, Blob.touched_at < cutoff)
+    ).all()
+    for blob_id, digest, extension, size in candidates:
+        # Park the file first: a concurrent put() of the same content touches the row,
+        # the guarded DELETE then matches nothing and the file is put back
+        target = _absolute(blob_path(digest, extension))
+        parked = f'{target}.gc'
+        try:
+            os.replace(target, parked)
+        except FileNotFoundError:
+            parked = None
+        deleted = db.session.execute(
+            delete(Blob).where(Blob.id == blob_id, Blob.ref_count <= 0, Blob.touched_at < cutoff)
+        ).rowcount
+        db.session.commit()
+        if deleted:
+            results['blobs_deleted'] += 1
+            results['bytes_freed'] += size
+            if parked:
+                os.remove(parked)
+        elif parked:
+            os.replace(parked, target)
+
+    results['files_swept'] = _sweep_files(cutoff.timestamp())
+    return results
+
+
+def _sweep_files(cutoff):
+    """Remove stale temp files and blob files with no row"""
+    swept = 0
+    root = _absolute(BLOB_DIR)
+    if not os.path.isdir(root):
+        return 0
+    for directory, subdirectories, files in os.walk(root):
+        stale = [name for name in files if os.path.getmtime(os.path.join(directory, name)) < cutoff]
+        if not stale:
+            continue
+        if os.path.basename(directory) == TMP_DIR:
+            orphans = stale
+        else:
+            by_digest = {name.split('.', 1)[0]: name for name in stale}
+            known = set(db.session.execute(
+                select(Blob.sha256).where(Blob.sha256.in_(list(by_digest)))
+            ).scalars())
+            orphans = [name for digest, name in by_digest.items() if digest not in known]
+        for name in orphans:
+            try:
+                os.remove(os.path.join(directory, name))
+                swept += 1
+            except OSError:
+                pass
+    return swept
@@ -0,0 +1,153 @@
+# backend/services/cache.py
+"""
+Key/value caches with per-entry TTL.
+
+``MemoryCache`` is a thread-safe in-process LRU. When ``CACHE_REDIS_URL`` is set
+and the ``redis`` package is installed, ``get_cache()`` layers it over a shared
+Redis cache so every worker process sees the same entries; otherwise the
+in-process cache is used on its own.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+
+class MemoryCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Shared cache; values are stored as JSON"""
+
+    def __init__(self, url, prefix='fsh:'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix):
+        for key in self.client.scan_iter(match=self.prefix + prefix + '*'):
+            self.client.delete(key)
+
+    def clear(self):
+        self.delete_prefix('')
+
+
+class TieredCache:
+    """In-process cache in front of a shared one; shared errors degrade to local only"""
+
+    def __init__(self, local, shared, local_ttl=30):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        try:
+            value = self.shared.get(key)
+        except Exception:
+            return None
+        if value is not None:
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, min(ttl, self.local_ttl) if ttl else self.local_ttl)
+        try:
+            self.shared.set(key, value, ttl)
+        except Exception:
+            pass
+
+    def delete(self, key):
+        self.local.delete(key)
+        try:
+            self.shared.delete(key)
+        except Exception:
+            pass
+
+    def delete_prefix(self, prefix):
+        self.local.delete_prefix(prefix)
+        try:
+            self.shared.delete_prefix(prefix)
+        except Exception:
+            pass
+
+    def clear(self):
+        self.local.clear()
+        try:
+            self.shared.clear()
+        except Exception:
+            pass
+
+
+_init_lock = threading.Lock()
+
+
+def create_cache(config):
+    local = MemoryCache(config.get('CACHE_MAX_ENTRIES', 1024))
+    url = config.get('CACHE_REDIS_URL')
+    if url and redis is not None:
+        return TieredCache(local, RedisCache(url))
+    return local
+
+
+def get_cache(app=None):
+    """The app-wide cache, created on first use"""
+    app = app or current_app._get_current_object()
+    with _init_lock:
+        if 'cache' not in app.extensions:
+            app.extensions['cache'] = create_cache(app.config)
+    return app.extensions['cache']
@@ -0,0 +1,205 @@
+# backend/services/counters.py
+"""
+Write-behind counters.
+
+Hot read paths record increments in a ``CounterBuffer`` instead of updating
+the row. A flusher thread periodically applies them in one transaction with
+batched ``UPDATE ... SET col = col + n WHERE id IN (...)`` statements (one per
+distinct increment), so increments are never lost to read-modify-write races
+and reads do not open write transactions. Pending increments are also flushed
+at interpreter exit.
+
+``WriteBehindBuffer`` holds what every such buffer shares: the pending map and
+its lock, the flusher thread, re-queueing on a failed flush and the flush
+schedule. Subclasses say how entries merge and how a batch is written.
+``register_buffer`` installs a buffer on the app; the after_request and atexit
+hooks that flush buffers are registered once per app.
+"""
+import atexit
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import func, update
+from extensions import db
+
+
+class WriteBehindBuffer:
+    """Pending writes keyed by row, flushed in batches by a thread or between requests"""
+
+    name = 'buffer'
+
+    def __init__(self, flush_interval=5, max_pending=5000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = self._empty()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_flush = time.monotonic()
+
+    def _empty(self):
+        raise NotImplementedError
+
+    def _merge(self, pending):
+        """Put entries of a failed flush back into the buffer; called with the lock held"""
+        raise NotImplementedError
+
+    def _write(self, pending):
+        """Write a batch of entries; needs an app context. Returns the number of rows written"""
+        raise NotImplementedError
+
+    def _queued(self):
+        """Call with the lock held after adding an entry"""
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+
+    def flush(self):
+        """Write all pending entries; needs an app context. Returns what ``_write`` returns"""
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            return self._write(pending)
+        except Exception:
+            # Put the entries back so the next flush retries them
+            with self._lock:
+                self._merge(pending)
+            raise
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _run(self, app):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Flush of {self.name} failed: {e}")
+
+    def start(self, app):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(app,), daemon=True,
+                                            name=f'{self.name}-flusher')
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+class CounterBuffer(WriteBehindBuffer):
+    def __init__(self, model, column, flush_interval=5, max_pending=5000):
+        self.model = model
+        self.column = column
+        self.name = f'{model.__tablename__}-{column}'
+        super().__init__(flush_interval, max_pending)
+
+    def _empty(self):
+        return defaultdict(int)
+
+    def _merge(self, pending):
+        for row_id, amount in pending.items():
+            self._pending[row_id] += amount
+
+    def incr(self, row_id, amount=1):
+        with self._lock:
+            self._pending[row_id] += amount
+            self._queued()
+
+    def pending(self, row_id):
+        """Increments recorded for a row but not yet written"""
+        with self._lock:
+            return self._pending.get(row_id, 0)
+
+    def _write(self, pending):
+        by_amount = defaultdict(list)
+        for row_id, amount in pending.items():
+            by_amount[amount].append(row_id)
+
+        model_column = getattr(self.model, self.column)
+        values = {self.column: func.coalesce(model_column, 0)}
+        # Assigning updated_at to itself keeps its onupdate hook from firing for counter writes
+        if hasattr(self.model, 'updated_at'):
+            values['updated_at'] = self.model.updated_at
+
+        with db.engine.begin() as conn:
+            for amount, row_ids in by_amount.items():
+                conn.execute(
+                    update(self.model)
+                    .where(self.model.id.in_(row_ids))
+                    .values({**values, self.column: values[self.column] + amount})
+                )
+        return len(pending)
+
+
+def is_in_memory_sqlite(app):
+    """In-memory SQLite is one connection shared by every thread"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    return uri in ('sqlite://', 'sqlite:///:memory:')
+
+
+def _buffers(app):
+    """The app's write-behind buffers; the first call registers the hooks that flush them"""
+    buffers = app.extensions.get('write_behind_buffers')
+    if buffers is not None:
+        return buffers
+    buffers = app.extensions['write_behind_buffers'] = []
+
+    @app.after_request
+    def flush_buffers(response):
+        for buffer in buffers:
+            if not buffer.running:
+                try:
+                    buffer.flush_if_due()
+                except Exception as e:
+                    print(f"Flush of {buffer.name} failed: {e}")
+        return response
+
+    atexit.register(flush_all, app)
+    return buffers
+
+
+def flush_all(app):
+    """Stop the app's flusher threads and write what the buffers still hold; runs at exit"""
+    buffers = app.extensions.get('write_behind_buffers', ())
+    for buffer in buffers:
+        buffer.stop()
+    with app.app_context():
+        for buffer in buffers:
+            try:
+                buffer.flush()
+            except Exception as e:
+                print(f"Flush of {buffer.name} at exit failed: {e}")
+
+
+def register_buffer(app, key, buffer):
+    """Install ``buffer`` as ``app.extensions[key]`` and start flushing it"""
+    app.extensions[key] = buffer
+    _buffers(app).append(buffer)
+    # An in-memory SQLite database is one connection shared by every thread, so
+    # a flusher thread could interleave with a request's transaction; there the
+    # buffer is flushed between requests instead
+    if buffer.flush_interval and not is_in_memory_sqlite(app):
+        buffer.start(app)
+    return buffer
+
+
+def init_counters(app):
+    """Create the app's counter buffers and their flusher"""
+    from models.market import MarketPost
+
+    interval = app.config.get('COUNTER_FLUSH_INTERVAL', 5)
+    return register_buffer(app, 'view_counter', CounterBuffer(MarketPost, 'view_count', flush_interval=interval))
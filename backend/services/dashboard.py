@@ -0,0 +1,176 @@
+# backend/services/dashboard.py
+"""
+Dashboard counters in one round trip.
+
+Every counter a dashboard shows is expressed as a scalar subquery and all of
+them are fetched with a single ``SELECT (...), (...), ...``. Results are cached
+per user (and once for the admin overview) for ``DASHBOARD_CACHE_TTL`` seconds
+and invalidated when a commit touches a row that feeds them. ``SectionTimer``
+records how long each part of a dashboard took, for the ``Server-Timing``
+header.
+"""
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from extensions import db
+from models.user import User
+from models.admin import Admin
+from models.market import MarketPost
+from models.order import Order
+from models.sacco import LoanApplication
+from models.message import InboxEntry, Message
+from models.storage import StorageRequest
+from models.ecommerce import Product
+from services.cache import get_cache
+
+RECENT_DAYS = 7
+
+
+class SectionTimer:
+    """Collects per-section durations in milliseconds"""
+
+    def __init__(self):
+        self.timings = {}
+
+    def section(self, name):
+        timer = self
+
+        class _Section:
+            def __enter__(self):
+                self.started = time.perf_counter()
+
+            def __exit__(self, *exc):
+                timer.timings[name] = round((time.perf_counter() - self.started) * 1000, 2)
+
+        return _Section()
+
+    def header(self):
+        return ', '.join(f'{name};dur={duration}' for name, duration in self.timings.items())
+
+    def apply(self, response):
+        response.headers['Server-Timing'] = self.header()
+        return response
+
+
+def _count(model, *conditions):
+    return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def fetch_counts(counters):
+    """Evaluate ``{name: scalar subquery}`` in a single SELECT"""
+    names = list(counters)
+    row = db.session.execute(select(*[counters[name].label(name) for name in names])).one()
+    return {name: row[index] or 0 for index, name in enumerate(names)}
+
+
+def user_counters(user_id):
+    since = datetime.utcnow() - timedelta(days=RECENT_DAYS)
+    return {
+        'market_posts': _count(MarketPost, MarketPost.user_id == user_id),
+        'market_posts_recent': _count(MarketPost, MarketPost.user_id == user_id, MarketPost.created_at >= since),
+        'orders': _count(Order, Order.user_id == user_id),
+        'orders_recent': _count(Order, Order.user_id == user_id, Order.created_at >= since),
+        'loan_applications': _count(LoanApplication, LoanApplication.user_id == user_id),
+        'loan_applications_recent': _count(LoanApplication, LoanApplication.user_id == user_id,
+                                           LoanApplication.application_date >= since.date()),
+        # Maintained per conversation by services/inbox.py
+        'unread_messages': select(func.coalesce(func.sum(InboxEntry.unread_count), 0))
+                           .where(InboxEntry.user_id == user_id).scalar_subquery(),
+        'storage_requests': _count(StorageRequest, StorageRequest.user_id == user_id),
+    }
+
+
+def admin_counters():
+    since = datetime.utcnow() - timedelta(days=RECENT_DAYS)
+    return {
+        'users': _count(User, User.user_type != 'admin'),
+        'users_recent': _count(User, User.user_type != 'admin', User.created_at >= since),
+        'users_all': _count(User),
+        'users_all_recent': _count(User, User.created_at >= since),
+        'users_active': _count(User, User.is_active == True),
+        'admins': _count(Admin),
+        'admins_active': _count(Admin, Admin.is_active == True),
+        'market_posts': _count(MarketPost),
+        'market_posts_recent': _count(MarketPost, MarketPost.created_at >= since),
+        'orders': _count(Order),
+        'orders_recent': _count(Order, Order.created_at >= since),
+        'products': _count(Product),
+    }
+
+
+def _ttl():
+    return current_app.config.get('DASHBOARD_CACHE_TTL', 60)
+
+
+def user_key(user_id):
+    return f'dashboard:user:{user_id}'
+
+
+ADMIN_KEY = 'dashboard:admin'
+
+
+def _cached(key, counters):
+    """``(counts, cached)`` from the cache, computing and storing them on a miss"""
+    cache = get_cache()
+    counts = cache.get(key)
+    if counts is not None:
+        return counts, True
+    counts = fetch_counts(counters())
+    cache.set(key, counts, _ttl())
+    return counts, False
+
+
+def user_counts(user_id):
+    return _cached(user_key(user_id), lambda: user_counters(user_id))
+
+
+def admin_counts():
+    return _cached(ADMIN_KEY, admin_counters)
+
+
+# ==================== INVALIDATION ====================
+
+# The users whose dashboard counters a changed row feeds; every tracked model also feeds the admin overview
+_OWNERS = {
+    MarketPost: lambda obj: [obj.user_id],
+    Order: lambda obj: [obj.user_id],
+    LoanApplication: lambda obj: [obj.user_id],
+    Message: lambda obj: [obj.receiver_id],
+    InboxEntry: lambda obj: [obj.user_id],
+    StorageRequest: lambda obj: [obj.user_id],
+    User: lambda obj: [],
+    Admin: lambda obj: [],
+    Product: lambda obj: [],
+}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dashboard_keys(session, flush_context):
+    keys = session.info.setdefault('dashboard_keys', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        owners = _OWNERS.get(type(obj))
+        if owners is None:
+            continue
+        keys.add(ADMIN_KEY)
+        keys.update(user_key(user_id) for user_id in owners(obj) if user_id is not None)
+
+
+def mark_user_changed(session, user_id):
+    """Invalidate a user's dashboard at commit, for writes that bypass the flush hook (bulk UPDATEs)"""
+    session.info.setdefault('dashboard_keys', set()).add(user_key(user_id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_dashboards(session):
+    keys = session.info.pop('dashboard_keys', None)
+    if keys and has_app_context():
+        cache = get_cache()
+        for key in keys:
+            cache.delete(key)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_dashboard_keys(session, previous_transaction):
+    session.info.pop('dashboard_keys', None)
@@ -0,0 +1,64 @@
+# backend/services/history.py
+"""
+Before/after column values for the session hooks that maintain derived data.
+
+market_stats, blobstore and inbox diff some columns of every flushed row to
+update their counters. A plain column only remembers its previous value if
+that value was loaded. If the row was expired (for example by a commit) and
+then assigned, the old value is lost, and a row deleted while expired has no
+values at all. ``track`` closes both gaps for the columns it is given:
+
+* the columns get active history, so assigning one on an expired row loads
+  the committed value first;
+* a ``before_flush`` hook loads the tracked columns of expired rows that are
+  about to be updated or deleted.
+
+``column_values`` then always sees what is in the database.
+"""
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+_TRACKED = {}
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def track(model, fields):
+    """Keep the committed values of ``fields`` available to flush hooks"""
+    fields = tuple(fields)
+    for field in fields:
+        if field not in _TRACKED.get(model, ()):
+            event.listen(getattr(model, field), 'set', _keep_old_value, active_history=True, retval=True)
+    _TRACKED[model] = tuple(dict.fromkeys(_TRACKED.get(model, ()) + fields))
+
+
+def column_values(obj, fields, before):
+    """Current values of ``fields``, or the values before this flush when ``before``"""
+    state = sa_inspect(obj)
+    values = []
+    for field in fields:
+        history = state.attrs[field].history
+        if before and history.deleted:
+            values.append(history.deleted[0])
+        elif before and history.added:
+            # Nothing replaced: the column was inserted without a value
+            values.append(None)
+        elif history.added:
+            values.append(history.added[0])
+        elif history.unchanged:
+            values.append(history.unchanged[0])
+        else:
+            values.append(state.dict.get(field))
+    return values
+
+
+@event.listens_for(Session, 'before_flush')
+def _load_tracked(session, flush_context, instances):
+    for obj in list(session.dirty) + list(session.deleted):
+        fields = _TRACKED.get(type(obj))
+        if not fields:
+            continue
+        if sa_inspect(obj).expired_attributes.intersection(fields):
+            getattr(obj, fields[0])  # loads every expired column of the row in one SELECT
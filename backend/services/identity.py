@@ -0,0 +1,147 @@
+# backend/services/identity.py
+"""
+The caller's identity, decoded once per request.
+
+Access tokens carry a JSON identity, ``{"id": .., "type": "user" | "admin"}``.
+``current_identity()`` decodes it the first time a request asks and keeps the
+result with the token flask-jwt-extended verified for that request.
+``current_user()`` / ``current_admin()`` load the caller's row the first time
+they are asked, so a handler, its decorator and the helpers it calls share
+one lookup.
+
+``identity_required(*types, denied=...)`` replaces the hand-rolled checks at
+the top of handlers. It verifies the token, then answers 403 with ``denied``
+when the caller's type is not one of ``types``. ``denied`` is the blueprint's
+own error body, since their shapes differ. With ``active=True`` it also loads
+the account and answers 401 when it is missing or deactivated.
+
+``user_summary(user_id)`` returns a user's public fields from a
+cross-request cache. Entries live for USER_SUMMARY_CACHE_TTL seconds and are
+dropped at commit when a flush changes or deletes the user.
+"""
+import json
+from functools import wraps
+from flask import current_app, g, has_app_context, jsonify
+from flask_jwt_extended import get_jwt, jwt_required
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models.user import User
+from models.admin import Admin
+from services.cache import get_cache
+
+SUMMARY_FIELDS = ('id', 'username', 'email', 'user_type')
+_MISSING = object()
+
+
+def summary_key(user_id):
+    return f'user_summary:{user_id}'
+
+
+def _context():
+    """Per-request state, tied to the token decoded for this request"""
+    token = get_jwt()
+    context = g.get('_identity_context')
+    if context is None or context['token'] is not token:
+        # A new token means a new request even if the app context is shared (tests)
+        context = g._identity_context = {'token': token, 'identity': None, 'account': _MISSING}
+    return context
+
+
+def current_identity():
+    """The caller's identity dict, decoded once per request"""
+    context = _context()
+    if context['identity'] is None:
+        raw = context['token'].get(current_app.config.get('JWT_IDENTITY_CLAIM', 'sub'))
+        context['identity'] = json.loads(raw) if isinstance(raw, str) else (raw or {})
+    return context['identity']
+
+
+def current_account():
+    """The caller's User or Admin row, loaded once per request; None if it no longer exists"""
+    context = _context()
+    if context['account'] is _MISSING:
+        identity = current_identity()
+        model = Admin if identity.get('type') == 'admin' else User
+        context['account'] = db.session.get(model, identity.get('id')) if identity.get('id') else None
+    return context['account']
+
+
+def current_user():
+    """The calling User, or None for admins"""
+    return current_account() if current_identity().get('type') != 'admin' else None
+
+
+def current_admin():
+    """The calling Admin, or None for users"""
+    return current_account() if current_identity().get('type') == 'admin' else None
+
+
+def identity_required(*types, denied=None, active=False, inactive=None):
+    """``jwt_required()`` plus a check of the caller's type (and, optionally, that the account is active)"""
+    def decorator(fn):
+        @wraps(fn)
+        @jwt_required()
+        def wrapper(*args, **kwargs):
+            if types and current_identity().get('type') not in types:
+                return jsonify(denied or {'message': 'Access denied'}), 403
+            if active:
+                account = current_account()
+                if account is None or not account.is_active:
+                    return jsonify(inactive or {'message': 'Account inactive or not found'}), 401
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# The checks most blueprints use, with their {'message': ...} error body
+admin_required = identity_required('admin', denied={'message': 'Admin access required'})
+user_required = identity_required('user', denied={'message': 'User access required'})
+
+
+def _summarize(user):
+    return {field: getattr(user, field) for field in SUMMARY_FIELDS}
+
+
+def user_summary(user_id, user=None):
+    """Public fields of a user, or None if there is no such user.
+
+    ``user`` short-circuits the lookup when the caller already has the row loaded.
+    """
+    if user is not None:
+        return _summarize(user)
+    if user_id is None:
+        return None
+    ttl = current_app.config.get('USER_SUMMARY_CACHE_TTL', 0) if has_app_context() else 0
+    if ttl:
+        cached = get_cache().get(summary_key(user_id))
+        if cached is not None:
+            return cached
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    summary = _summarize(user)
+    if ttl:
+        get_cache().set(summary_key(user_id), summary, ttl)
+    return summary
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_summary_keys(session, flush_context):
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            session.info.setdefault('user_summary_keys', set()).add(summary_key(obj.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_summaries(session):
+    keys = session.info.pop('user_summary_keys', None)
+    if keys and has_app_context():
+        cache = get_cache()
+        for key in keys:
+            cache.delete(key)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_summary_keys(session, previous_transaction):
+    session.info.pop('user_summary_keys', None)
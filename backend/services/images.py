@@ -0,0 +1,145 @@
+# backend/services/images.py
+"""
+Resized WebP/JPEG variants of uploaded images.
+
+Upload handlers store the original and queue an ``images.*`` job (see
+services/tasks.py). The worker decodes the original once. For JPEGs it uses
+Pillow's draft mode, so a 16 MB photo is decoded at reduced scale. It applies
+the EXIF orientation, then writes a thumb, medium and full variant in WebP
+and JPEG. Each variant is downscaled from the previous larger one. Variants
+are re-encoded without metadata, so EXIF (including GPS position) is not
+served. Variants go into the content-addressed blob store
+(services/blobstore.py), so identical uploads share their variants too. Once
+the variants exist the row stops referencing the original, which the blob
+garbage collector then removes. Market post images keep theirs when
+IMAGE_KEEP_ORIGINALS is set.
+
+Variant blob paths (relative to UPLOAD_FOLDER) are stored as JSON on the
+owning row: ``{"thumb": {"webp": "blobs/ab/cd/<sha256>.webp", "jpeg": ...,
+"width": .., "height": ..}, ...}``.
+"""
+import json
+import os
+from collections import Counter
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import update
+from extensions import db
+from models.market import MarketPostImage
+from models.profile import UserProfile
+from services import blobstore
+
+# Longest edge in pixels, largest first; images are never upscaled
+VARIANTS = (('full', 1920), ('medium', 960), ('thumb', 320))
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+STATIC_PREFIX = '/static/uploads/'
+
+
+class ImageRejected(Exception):
+    """The upload is not an image Pillow can safely decode"""
+
+
+def upload_path(relative):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], relative)
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite onto white"""
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _store(image, extension, fmt, options):
+    # Encoded to a temp file in the store, then hashed and moved (or deduplicated)
+    partial = blobstore.partial_file(extension)
+    image.save(partial, fmt, **options)
+    return blobstore.adopt(partial, extension)
+
+
+def render_variants(source):
+    """Store every variant of the image at ``source``; returns the variants mapping"""
+    try:
+        with Image.open(source) as original:
+            # JPEG decodes straight to the nearest scale at or above the largest variant
+            original.draft('RGB', (VARIANTS[0][1], VARIANTS[0][1]))
+            oriented = ImageOps.exif_transpose(original)
+            has_alpha = oriented.mode in ('RGBA', 'LA', 'PA') or 'transparency' in oriented.info
+            image = oriented.convert('RGBA' if has_alpha else 'RGB')
+    except FileNotFoundError:
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, OSError) as e:
+        # Not an image, truncated, or too many pixels to decode safely
+        raise ImageRejected(str(e) or 'Unreadable image')
+
+    variants = {}
+    for name, edge in VARIANTS:
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        entry = {'width': image.width, 'height': image.height}
+        for extension, fmt, options in FORMATS:
+            output = _flatten(image) if fmt == 'JPEG' and has_alpha else image
+            entry[extension] = _store(output, extension, fmt, options)
+        variants[name] = entry
+    return variants
+
+
+# ==================== JOB BODIES ====================
+
+def process_market_post_image(image_id):
+    """Render a market post image's variants; returns a summary for the job result"""
+    image = db.session.get(MarketPostImage, image_id)
+    if image is None or image.processing_status == 'ready':
+        return {'image_id': image_id, 'skipped': True}
+    if image.image_url.startswith('http'):
+        image.processing_status = 'ready'
+        db.session.commit()
+        return {'image_id': image_id, 'skipped': True}
+
+    source = upload_path(image.image_url)
+    try:
+        variants = render_variants(source)
+    except (ImageRejected, FileNotFoundError):
+        image.processing_status = 'failed'
+        db.session.commit()
+        raise
+
+    image.variants = json.dumps(variants)
+    image.processing_status = 'ready'
+    if not current_app.config.get('IMAGE_KEEP_ORIGINALS'):
+        # Dropping the reference lets the blob GC remove the original (and its EXIF)
+        image.image_url = variants['full']['jpeg']
+    db.session.commit()
+    return {'image_id': image_id, 'variants': list(variants)}
+
+
+def process_profile_picture(profile_id, picture):
+    """Render a profile picture's variants, unless ``picture`` has since been replaced"""
+    profile = db.session.get(UserProfile, profile_id)
+    if profile is None or profile.profile_picture != picture or not picture.startswith(STATIC_PREFIX):
+        return {'profile_id': profile_id, 'skipped': True}
+
+    variants = render_variants(upload_path(picture[len(STATIC_PREFIX):]))
+    encoded = json.dumps(variants)
+    full = f"{STATIC_PREFIX}{variants['full']['jpeg']}"
+    # Rendering takes a while and the user may upload another picture meanwhile,
+    # so the row is only written if it still holds the picture that was rendered
+    replaced = db.session.execute(
+        update(UserProfile)
+        .where(UserProfile.id == profile_id, UserProfile.profile_picture == picture)
+        .values(profile_picture=full, profile_picture_variants=encoded)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if replaced:
+        # The bulk UPDATE bypasses the flush hooks: the replaced original and any
+        # earlier variants lose their references here
+        deltas = Counter(blobstore.digests(full, encoded))
+        deltas.subtract(blobstore.digests(picture, profile.profile_picture_variants))
+        blobstore.apply_deltas(db.session.connection(), {d: n for d, n in deltas.items() if n})
+    # Unused variants stay unreferenced and are removed by the blob garbage collector
+    db.session.commit()
+    if not replaced:
+        return {'profile_id': profile_id, 'skipped': True}
+    return {'profile_id': profile_id, 'variants': list(variants)}
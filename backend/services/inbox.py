@@ -0,0 +1,373 @@
+# backend/services/inbox.py
+"""
+Inbox read model.
+
+``inbox_entries`` holds one row per participant per conversation: the other
+participant, a preview of the last message, that participant's unread count
+and ``updated_at`` (when the last message was sent). ``conversations.message_count``
+is kept next to it. A session ``after_flush`` hook applies every change in the
+same transaction, the way market_stats maintains its counters:
+
+* a new Conversation gets an empty entry for each participant;
+* a new Message moves both participants' entries to the top with its preview,
+  adds one unread for the receiver and one to message_count;
+* a Message whose ``is_read`` flips adjusts the receiver's unread count;
+* deleted messages or conversations rebuild the conversations they belonged to.
+
+Reads are written in bulk. ``mark_read`` marks a receiver's messages in a
+conversation (all of them, or up to an id) with one UPDATE and takes the
+count off the entry in the same transaction. Single-message read receipts go
+through ``ReadReceiptBuffer``, which gathers them per conversation and
+writes each conversation's batch with one ``mark_read`` every
+READ_RECEIPT_FLUSH_INTERVAL. Until then the message and inbox routes overlay
+the buffered receipts, so a reader's reads do not show up as unread again.
+
+Opening an inbox is then one range scan on (user_id, updated_at, id) however
+long the threads are. ``reconcile_inbox`` rebuilds entries from the messages
+table to repair drift, e.g. from bulk updates that bypass the session.
+"""
+import datetime
+from collections import Counter, defaultdict
+from sqlalchemy import case, delete, event, func, inspect as sa_inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models.message import Conversation, InboxEntry, Message
+from services import dashboard, history
+from services.counters import WriteBehindBuffer, register_buffer
+
+PREVIEW_LENGTH = 200
+REBUILD_BATCH = 500
+
+history.track(Message, ['is_read'])
+
+
+def preview(content):
+    return (content or '')[:PREVIEW_LENGTH]
+
+
+def _entry(user_id, conversation_id, other_user_id, updated_at, message=None, unread=0):
+    return {
+        'user_id': user_id, 'conversation_id': conversation_id, 'other_user_id': other_user_id,
+        'last_message_id': message['id'] if message else None,
+        'last_message_sender_id': message['sender_id'] if message else None,
+        'last_message_preview': preview(message['content']) if message else None,
+        'unread_count': unread, 'updated_at': updated_at,
+    }
+
+
+def _participants(user1_id, user2_id):
+    """(user, other) per entry; a conversation with oneself has a single entry"""
+    return {user1_id: user2_id, user2_id: user1_id}.items()
+
+
+# ==================== MAINTENANCE ====================
+
+def flush_changes(session):
+    """New conversations, message upserts, unread deltas and conversations to rebuild"""
+    created = []
+    latest, unread, counts = {}, Counter(), Counter()
+    rebuild = set()
+
+    for obj in session.new:
+        if isinstance(obj, Conversation):
+            created.append(obj)
+        elif isinstance(obj, Message):
+            counts[obj.conversation_id] += 1
+            message = {'id': obj.id, 'sender_id': obj.sender_id, 'content': obj.content, 'sent_at': obj.sent_at}
+            for user_id, other_id in _participants(obj.sender_id, obj.receiver_id):
+                key = (user_id, obj.conversation_id)
+                if key not in latest or latest[key][1]['id'] < obj.id:
+                    latest[key] = (other_id, message)
+            if not obj.is_read:
+                unread[(obj.receiver_id, obj.conversation_id)] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Message) and sa_inspect(obj).attrs.is_read.history.has_changes():
+            was_read, = history.column_values(obj, ['is_read'], before=True)
+            if bool(was_read) != bool(obj.is_read):
+                unread[(obj.receiver_id, obj.conversation_id)] += -1 if obj.is_read else 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Conversation):
+            rebuild.add(obj.id)
+        elif isinstance(obj, Message):
+            rebuild.add(obj.conversation_id)
+
+    return created, latest, unread, counts, rebuild
+
+
+def _upsert(connection, rows, newer_wins):
+    """Insert entries, or on conflict add unread counts and take the newer last message"""
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(InboxEntry).values(rows)
+        newer = stmt.excluded.last_message_id > func.coalesce(InboxEntry.last_message_id, 0)
+        set_ = {'unread_count': InboxEntry.unread_count + stmt.excluded.unread_count}
+        if newer_wins:
+            for column in ('last_message_id', 'last_message_sender_id', 'last_message_preview', 'updated_at'):
+                set_[column] = case((newer, getattr(stmt.excluded, column)), else_=getattr(InboxEntry, column))
+        connection.execute(stmt.on_conflict_do_update(index_elements=['user_id', 'conversation_id'], set_=set_))
+        return
+
+    for row in rows:
+        current = connection.execute(
+            select(InboxEntry.id, InboxEntry.last_message_id)
+            .where(InboxEntry.user_id == row['user_id'], InboxEntry.conversation_id == row['conversation_id'])
+        ).first()
+        if current is None:
+            connection.execute(InboxEntry.__table__.insert().values(**row))
+            continue
+        values = {'unread_count': InboxEntry.unread_count + row['unread_count']}
+        if newer_wins and (row['last_message_id'] or 0) > (current.last_message_id or 0):
+            values.update({key: row[key] for key in
+                           ('last_message_id', 'last_message_sender_id', 'last_message_preview', 'updated_at')})
+        connection.execute(update(InboxEntry).where(InboxEntry.id == current.id).values(**values))
+
+
+def _adjust_unread(connection, user_id, conversation_id, delta):
+    floored = (func.max if connection.dialect.name == 'sqlite' else func.greatest)(
+        InboxEntry.unread_count + delta, 0
+    )
+    connection.execute(
+        update(InboxEntry)
+        .where(InboxEntry.user_id == user_id, InboxEntry.conversation_id == conversation_id)
+        .values(unread_count=floored)
+    )
+
+
+def apply_changes(connection, created, latest, unread, counts, rebuild):
+    rows = []
+    for conversation in created:
+        for user_id, other_id in _participants(conversation.user1_id, conversation.user2_id):
+            rows.append(_entry(user_id, conversation.id, other_id, conversation.created_at))
+    _upsert(connection, rows, newer_wins=False)
+
+    _upsert(connection, [
+        _entry(user_id, conversation_id, other_id, message['sent_at'], message,
+               unread.pop((user_id, conversation_id), 0))
+        for (user_id, conversation_id), (other_id, message) in latest.items()
+    ], newer_wins=True)
+
+    # Read-state changes only: the entry exists already
+    for (user_id, conversation_id), delta in unread.items():
+        if delta:
+            _adjust_unread(connection, user_id, conversation_id, delta)
+
+    for conversation_id, count in counts.items():
+        # updated_at is assigned to itself so its onupdate does not fire
+        connection.execute(
+            update(Conversation).where(Conversation.id == conversation_id)
+            .values(message_count=Conversation.message_count + count, updated_at=Conversation.updated_at)
+        )
+
+    if rebuild:
+        rebuild_conversations(connection, rebuild)
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_inbox(session, flush_context):
+    changes = flush_changes(session)
+    if any(changes):
+        apply_changes(session.connection(), *changes)
+
+
+def rebuild_conversations(connection, conversation_ids):
+    """Recompute the entries and message_count of ``conversation_ids`` from the messages table"""
+    ids = list(conversation_ids)
+    connection.execute(delete(InboxEntry).where(InboxEntry.conversation_id.in_(ids)))
+    conversations = connection.execute(
+        select(Conversation.id, Conversation.user1_id, Conversation.user2_id, Conversation.created_at)
+        .where(Conversation.id.in_(ids))
+    ).all()
+    if not conversations:
+        return
+
+    counts = dict(connection.execute(
+        select(Message.conversation_id, func.count(Message.id))
+        .where(Message.conversation_id.in_(ids)).group_by(Message.conversation_id)
+    ).all())
+    unread = {
+        (receiver_id, conversation_id): count
+        for conversation_id, receiver_id, count in connection.execute(
+            select(Message.conversation_id, Message.receiver_id, func.count(Message.id))
+            .where(Message.conversation_id.in_(ids), Message.is_read.isnot(True))
+            .group_by(Message.conversation_id, Message.receiver_id)
+        )
+    }
+    last_ids = select(func.max(Message.id)).where(Message.conversation_id.in_(ids)).group_by(Message.conversation_id)
+    latest = {
+        row.conversation_id: row._asdict()
+        for row in connection.execute(
+            select(Message.id, Message.conversation_id, Message.sender_id, Message.content, Message.sent_at)
+            .where(Message.id.in_(last_ids))
+        )
+    }
+
+    rows = []
+    for conversation in conversations:
+        message = latest.get(conversation.id)
+        updated_at = message['sent_at'] if message else conversation.created_at
+        for user_id, other_id in _participants(conversation.user1_id, conversation.user2_id):
+            rows.append(_entry(user_id, conversation.id, other_id, updated_at, message,
+                               unread.get((user_id, conversation.id), 0)))
+        connection.execute(
+            update(Conversation).where(Conversation.id == conversation.id)
+            .values(message_count=counts.get(conversation.id, 0), updated_at=Conversation.updated_at)
+        )
+    connection.execute(InboxEntry.__table__.insert(), rows)
+
+
+# ==================== CONVERSATIONS ====================
+
+def get_or_create_conversation(user_a, user_b):
+    """The conversation between two users, created if missing; returns (conversation, created).
+
+    Keyed by the canonical pair's unique index: an INSERT that skips on
+    conflict followed by a lookup on that index, so concurrent requests for a
+    new pair create one row between them. The caller commits.
+    """
+    user1_id, user2_id = Conversation.pair(user_a, user_b)
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    now = datetime.datetime.utcnow()
+    row = {'user1_id': user1_id, 'user2_id': user2_id, 'created_at': now, 'updated_at': now, 'message_count': 0}
+
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        created = connection.execute(
+            insert(Conversation).values(row).on_conflict_do_nothing(index_elements=['user1_id', 'user2_id'])
+        ).rowcount == 1
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.connection().execute(Conversation.__table__.insert().values(row))
+            created = True
+        except IntegrityError:
+            created = False
+
+    conversation = Conversation.query.filter_by(user1_id=user1_id, user2_id=user2_id).one()
+    if created:
+        # Inserted without the ORM, so the flush hook did not see it
+        rebuild_conversations(connection, [conversation.id])
+    return conversation, created
+
+
+# ==================== READS ====================
+
+def inbox_query(user_id):
+    """The user's entries; order and page them by (updated_at, id)"""
+    return InboxEntry.query.options(db.joinedload(InboxEntry.other_user)).filter(InboxEntry.user_id == user_id)
+
+
+def unread_total(user_id):
+    return db.session.query(func.coalesce(func.sum(InboxEntry.unread_count), 0)) \
+        .filter(InboxEntry.user_id == user_id).scalar()
+
+
+# ==================== READ RECEIPTS ====================
+
+def mark_read(user_id, conversation_id, up_to_id=None, message_ids=None):
+    """Mark the user's unread messages in a conversation read with one UPDATE; returns how many.
+
+    Limited to ids up to ``up_to_id`` and/or in ``message_ids`` when given. The caller commits.
+    """
+    conditions = [Message.conversation_id == conversation_id, Message.receiver_id == user_id,
+                  Message.is_read.isnot(True)]
+    if up_to_id is not None:
+        conditions.append(Message.id <= up_to_id)
+    if message_ids is not None:
+        conditions.append(Message.id.in_(list(message_ids)))
+
+    marked = db.session.execute(
+        update(Message).where(*conditions)
+        .values(is_read=True, read_at=datetime.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if marked:
+        # The bulk UPDATE bypasses the flush hooks, so the entry and the dashboard are updated here
+        _adjust_unread(db.session.connection(), user_id, conversation_id, -marked)
+        dashboard.mark_user_changed(db.session, user_id)
+    return marked
+
+
+class ReadReceiptBuffer(WriteBehindBuffer):
+    """Write-behind single-message reads, one ``mark_read`` per conversation per flush"""
+
+    name = 'read-receipts'
+
+    def _empty(self):
+        return defaultdict(set)
+
+    def _merge(self, pending):
+        for key, message_ids in pending.items():
+            self._pending[key].update(message_ids)
+
+    def record(self, user_id, conversation_id, message_id):
+        with self._lock:
+            self._pending[(user_id, conversation_id)].add(message_id)
+            self._queued()
+
+    def pending(self, user_id, conversation_id):
+        """Message ids read by the user in a conversation but not yet written"""
+        with self._lock:
+            return set(self._pending.get((user_id, conversation_id), ()))
+
+    def unread_pending(self, user_id):
+        """Per conversation, how many of the user's unread messages have a receipt not yet written"""
+        with self._lock:
+            message_ids = set().union(*(ids for (reader_id, _), ids in self._pending.items() if reader_id == user_id))
+        if not message_ids:
+            return {}
+        return dict(db.session.execute(
+            select(Message.conversation_id, func.count(Message.id))
+            .where(Message.id.in_(message_ids), Message.receiver_id == user_id, Message.is_read.isnot(True))
+            .group_by(Message.conversation_id)
+        ).all())
+
+    def _write(self, pending):
+        try:
+            marked = sum(
+                mark_read(user_id, conversation_id, message_ids=message_ids)
+                for (user_id, conversation_id), message_ids in pending.items()
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return marked
+
+
+def init_read_receipts(app):
+    """Create the app's read receipt buffer and its flusher"""
+    interval = app.config.get('READ_RECEIPT_FLUSH_INTERVAL', 2)
+    return register_buffer(app, 'read_receipts', ReadReceiptBuffer(flush_interval=interval))
+
+
+# ==================== RECONCILIATION ====================
+
+def reconcile_inbox():
+    """Rebuild every conversation's entries; returns the number of entries that had drifted"""
+    def snapshot():
+        return {
+            (row.user_id, row.conversation_id): tuple(row[2:])
+            for row in db.session.execute(select(
+                InboxEntry.user_id, InboxEntry.conversation_id, InboxEntry.last_message_id,
+                InboxEntry.unread_count, InboxEntry.other_user_id
+            ))
+        }
+
+    before = snapshot()
+    ids = db.session.execute(select(Conversation.id).order_by(Conversation.id)).scalars().all()
+    connection = db.session.connection()
+    for start in range(0, len(ids), REBUILD_BATCH):
+        rebuild_conversations(connection, ids[start:start + REBUILD_BATCH])
+    # Entries of conversations that no longer exist
+    connection.execute(delete(InboxEntry).where(InboxEntry.conversation_id.notin_(select(Conversation.id))))
+    after = snapshot()
+    db.session.commit()
+    return sum(1 for key in set(before) | set(after) if before.get(key) != after.get(key))
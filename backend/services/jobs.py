@@ -0,0 +1,372 @@
+# backend/services/jobs.py
+"""
+Database-backed background job queue.
+
+Request handlers call ``enqueue(name, payload)`` and return straight away.
+The job row is added to the caller's session, so it is only queued if the
+caller commits: a job never refers to rows that were rolled back. Workers
+(``run_worker.py``, or an in-process thread with JOBS_WORKER_ENABLED) claim
+the highest-priority ready job with a conditional ``UPDATE ... WHERE status
+= 'queued'``. Only one worker can win that update, so several processes can
+share the table. On PostgreSQL the candidates are also selected
+``FOR UPDATE SKIP LOCKED``.
+
+A task that raises is retried with exponential backoff (JOB_RETRY_BACKOFF
+seconds, doubling) until ``max_attempts``. ``PermanentJobError`` fails it
+straight away. While a task runs, a heartbeat thread refreshes its lock every
+JOB_HEARTBEAT_INTERVAL seconds, so a running job whose lock is older than
+JOB_LOCK_TIMEOUT has lost its worker and is requeued. Long tasks are not run
+twice.
+
+``acquire_lease`` lets one process at a time run something every process
+schedules, such as the weather prefetcher.
+
+Tasks are plain functions registered with ``@task('name')`` in
+``services/tasks.py``. They receive the payload as keyword arguments inside
+an app context and return a JSON-serialisable result.
+"""
+import datetime
+import json
+import os
+import socket
+import threading
+import time
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from flask import current_app
+from extensions import db
+from models.job import Job, Lease
+from services.counters import is_in_memory_sqlite
+
+STATUSES = ('queued', 'running', 'succeeded', 'failed')
+MAX_BACKOFF = 3600
+
+_TASKS = {}
+_tasks_loaded = False
+
+
+class PermanentJobError(Exception):
+    """Raised by a task to fail its job without retrying"""
+
+
+class _Task:
+    def __init__(self, fn, priority, max_attempts):
+        self.fn = fn
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+
+def task(name, priority=0, max_attempts=None):
+    """Register ``fn`` as the task ``name``; the defaults apply to jobs enqueued without overrides"""
+    def register(fn):
+        _TASKS[name] = _Task(fn, priority, max_attempts)
+        return fn
+    return register
+
+
+def _load_tasks():
+    global _tasks_loaded
+    if not _tasks_loaded:
+        import services.tasks  # noqa: F401  (registers the built-in tasks)
+        _tasks_loaded = True
+
+
+def registered():
+    _load_tasks()
+    return sorted(_TASKS)
+
+
+def _utcnow():
+    return datetime.datetime.utcnow()
+
+
+def enqueue(name, payload=None, priority=None, max_attempts=None, delay=0, owner=None):
+    """
+    Queue ``name`` with ``payload`` in the current session and return the Job.
+
+    The job becomes visible to workers when the caller commits. ``owner`` is
+    the JWT identity dict of whoever asked for it, so they can poll its status.
+    """
+    _load_tasks()
+    spec = _TASKS.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown task '{name}'")
+
+    job = Job(
+        name=name,
+        payload=json.dumps(payload or {}),
+        priority=spec.priority if priority is None else priority,
+        max_attempts=max_attempts or spec.max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+        run_at=_utcnow() + datetime.timedelta(seconds=delay),
+        owner_type=owner.get('type') if owner else None,
+        owner_id=owner.get('id') if owner else None
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+# ==================== WORKER SIDE ====================
+
+def claim(worker_id, names=None):
+    """Mark the next ready job as running for ``worker_id`` and return it (None when idle)"""
+    now = _utcnow()
+    candidates = (
+        select(Job.id)
+        .where(Job.status == 'queued', Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        .limit(10)
+    )
+    if names:
+        candidates = candidates.where(Job.name.in_(names))
+    if db.engine.dialect.name == 'postgresql':
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    for job_id in db.session.execute(candidates).scalars().all():
+        won = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, locked_at=now, started_at=now,
+                    attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if won:
+            return db.session.get(Job, job_id, populate_existing=True)
+    db.session.commit()
+    return None
+
+
+def _finish(job_id, worker_id, **values):
+    """Record a job's outcome, unless a stale-lock sweep has handed it to another worker"""
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id)
+        .values(locked_by=None, locked_at=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def heartbeat(job_id, worker_id):
+    """Refresh a running job's lock in its own transaction; False once the worker no longer holds it"""
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id)
+            .values(locked_at=_utcnow())
+        ).rowcount > 0
+
+
+class _Heartbeat:
+    """Calls ``beat()`` every ``interval`` seconds from a thread until the block exits or it returns False"""
+
+    def __init__(self, beat, interval):
+        self.beat = beat
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.beat():
+                    return
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+
+    def __enter__(self):
+        if self.interval:
+            self._thread = threading.Thread(target=self._run, name='job-heartbeat', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _heartbeat_for(job_id, worker_id):
+    app = current_app._get_current_object()
+    interval = app.config.get('JOB_HEARTBEAT_INTERVAL', 60)
+    # On in-memory SQLite every thread shares one connection, so a heartbeat
+    # would commit the task's open transaction; there locks are not refreshed
+    if is_in_memory_sqlite(app):
+        interval = 0
+
+    def beat():
+        with app.app_context():
+            return heartbeat(job_id, worker_id)
+    return _Heartbeat(beat, interval)
+
+
+def run_job(job):
+    """Run a claimed job and record success, a retry or failure; returns the final status"""
+    _load_tasks()
+    job_id, worker_id, attempts, max_attempts = job.id, job.locked_by, job.attempts, job.max_attempts
+    spec = _TASKS.get(job.name)
+    try:
+        if spec is None:
+            raise PermanentJobError(f"Unknown task '{job.name}'")
+        with _heartbeat_for(job_id, worker_id):
+            result = spec.fn(**json.loads(job.payload or '{}'))
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+        if isinstance(e, PermanentJobError) or attempts >= max_attempts:
+            _finish(job_id, worker_id, status='failed', last_error=error, finished_at=_utcnow())
+            return 'failed'
+        backoff = current_app.config.get('JOB_RETRY_BACKOFF', 30) * 2 ** (attempts - 1)
+        _finish(job_id, worker_id, status='queued', last_error=error,
+                run_at=_utcnow() + datetime.timedelta(seconds=min(backoff, MAX_BACKOFF)))
+        return 'queued'
+
+    _finish(job_id, worker_id, status='succeeded', result=json.dumps(result, default=str),
+            finished_at=_utcnow())
+    return 'succeeded'
+
+
+def requeue_stale(timeout=None):
+    """Requeue (or fail, when out of attempts) jobs locked longer than JOB_LOCK_TIMEOUT; returns how many"""
+    timeout = timeout or current_app.config.get('JOB_LOCK_TIMEOUT', 600)
+    cutoff = _utcnow() - datetime.timedelta(seconds=timeout)
+    stale = (Job.status == 'running', Job.locked_at < cutoff)
+    failed = db.session.execute(
+        update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status='failed', locked_by=None, locked_at=None, finished_at=_utcnow(),
+                last_error='Worker stopped before the job finished')
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    requeued = db.session.execute(
+        update(Job).where(*stale)
+        .values(status='queued', locked_by=None, locked_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return failed + requeued
+
+
+def acquire_lease(name, holder, ttl):
+    """
+    Take or renew the lease ``name`` for ``ttl`` seconds; True while ``holder`` holds it.
+
+    The row is inserted once; a holder renews it and anyone else takes it over
+    only after it has expired, both with a conditional UPDATE only one process
+    can win.
+    """
+    now = _utcnow()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        db.session.execute(insert(Lease).values(name=name, holder=holder, expires_at=now)
+                           .on_conflict_do_nothing(index_elements=['name']))
+    elif db.session.get(Lease, name) is None:
+        db.session.add(Lease(name=name, holder=holder, expires_at=now))
+        db.session.flush()
+    held = db.session.execute(
+        update(Lease)
+        .where(Lease.name == name, or_(Lease.holder == holder, Lease.expires_at <= now))
+        .values(holder=holder, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return held > 0
+
+
+def release_lease(name, holder):
+    """Give up the lease if ``holder`` has it, so another process can take it straight away"""
+    db.session.execute(
+        update(Lease).where(Lease.name == name, Lease.holder == holder)
+        .values(expires_at=_utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def retry(job):
+    """Queue a failed job again with a fresh set of attempts"""
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_at = _utcnow()
+    job.finished_at = None
+    db.session.commit()
+    return job
+
+
+def stats():
+    """Job counts by status and the age in seconds of the oldest ready job"""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    oldest = db.session.execute(
+        select(func.min(Job.run_at)).where(Job.status == 'queued', Job.run_at <= _utcnow())
+    ).scalar()
+    return {
+        'counts': counts,
+        'oldest_ready_seconds': round((_utcnow() - oldest).total_seconds(), 1) if oldest else 0
+    }
+
+
+class JobWorker:
+    """Claims and runs jobs in a loop; ``run_pending`` drains the queue once"""
+
+    def __init__(self, app, names=None, poll_interval=None, worker_id=None):
+        self.app = app
+        self.names = names
+        self.poll_interval = poll_interval or app.config.get('JOB_POLL_INTERVAL', 1)
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_sweep = 0
+
+    def run_pending(self, limit=None):
+        """Run ready jobs until there are none (or ``limit`` ran); returns how many ran"""
+        ran = 0
+        with self.app.app_context():
+            try:
+                if time.monotonic() - self._last_sweep >= 60:
+                    requeue_stale()
+                    self._last_sweep = time.monotonic()
+                while limit is None or ran < limit:
+                    if self._stop.is_set():
+                        break
+                    job = claim(self.worker_id, self.names)
+                    if job is None:
+                        break
+                    run_job(job)
+                    ran += 1
+            finally:
+                db.session.remove()
+        return ran
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_pending()
+            except Exception as e:
+                print(f"Job worker {self.worker_id} error: {e}")
+                ran = 0
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='job-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def start_job_worker(app):
+    """Run a worker thread inside the app process when JOBS_WORKER_ENABLED is set"""
+    if not app.config.get('JOBS_WORKER_ENABLED'):
+        return None
+    worker = JobWorker(app).start()
+    app.extensions['job_worker'] = worker
+    return worker
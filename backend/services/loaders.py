@@ -0,0 +1,87 @@
+# backend/services/loaders.py
+"""
+Eager-loading profiles for the relationship-heavy models.
+
+Each profile returns the loader options a given kind of endpoint needs so that
+serializing a page of results costs a fixed number of queries instead of one
+lazy load per row and relationship. Options are built on call because backref
+attributes (e.g. ``MarketPost.user``) only exist once the mappers are configured.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from models.market import MarketPost, MarketInterest, ProductRequest, MarketNotification
+from models.order import Order, OrderItem
+from models.sacco import LoanApplication, Loan
+
+
+def _market_post_graph(path=None):
+    """Options covering everything MarketPost.to_dict() touches"""
+    if path is None:
+        return (
+            joinedload(MarketPost.user),
+            joinedload(MarketPost.accepter),
+            selectinload(MarketPost.images),
+            selectinload(MarketPost.interests).joinedload(MarketInterest.user),
+        )
+    return (
+        path.joinedload(MarketPost.user),
+        path.joinedload(MarketPost.accepter),
+        path.selectinload(MarketPost.images),
+        path.selectinload(MarketPost.interests).joinedload(MarketInterest.user),
+    )
+
+
+def market_post_listing():
+    """Pages of posts serialized with MarketPost.to_dict()"""
+    return _market_post_graph()
+
+
+def market_post_detail():
+    """A single post serialized with MarketPost.to_dict()"""
+    return _market_post_graph()
+
+
+def market_interest_listing():
+    """Interests serialized with MarketInterest.to_dict()"""
+    return (joinedload(MarketInterest.user),)
+
+
+def market_interest_with_post():
+    """Interests serialized together with their post's to_dict()"""
+    return (
+        joinedload(MarketInterest.user),
+        *_market_post_graph(joinedload(MarketInterest.market_post)),
+    )
+
+
+def market_interest_with_post_summary():
+    """Interests that only read scalar fields of their post"""
+    return (
+        joinedload(MarketInterest.user),
+        joinedload(MarketInterest.market_post),
+    )
+
+
+def product_request_listing():
+    """ProductRequest.to_dict() embeds the product graph, buyer and farmer"""
+    return (
+        joinedload(ProductRequest.buyer),
+        joinedload(ProductRequest.farmer),
+        *_market_post_graph(joinedload(ProductRequest.product)),
+    )
+
+
+def market_notification_listing():
+    return (joinedload(MarketNotification.admin),)
+
+
+def order_listing():
+    """Orders serialized with Order.to_dict(), which embeds each item's product"""
+    return (selectinload(Order.items).joinedload(OrderItem.product),)
+
+
+def loan_application_listing():
+    """LoanApplication.to_dict() reads the applicant, the loan and the loan's sacco"""
+    return (
+        joinedload(LoanApplication.user),
+        joinedload(LoanApplication.loan).joinedload(Loan.sacco),
+    )
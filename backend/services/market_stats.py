@@ -0,0 +1,222 @@
+# backend/services/market_stats.py
+"""
+Materialized market statistics.
+
+``market_stats`` holds one counter per (scope, key, metric): global totals,
+posts per category and per-user post/interest counts. A session ``after_flush``
+hook turns every inserted, updated or deleted MarketPost / MarketInterest into
+counter deltas and applies them in the same transaction with a single upsert,
+so the stats endpoints read a handful of rows instead of counting the tables.
+``reconcile_market_stats`` recomputes everything from scratch with GROUP BY
+queries and runs at startup, on a schedule and on demand to repair any drift
+(e.g. from bulk updates that bypass the session).
+"""
+import threading
+from collections import Counter
+from sqlalchemy import event, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from extensions import db
+from models.market import MarketPost, MarketInterest, MarketStat
+from services import history
+from services.counters import is_in_memory_sqlite
+
+GLOBAL = 'global'
+CATEGORY = 'category'
+USER = 'user'
+
+POST_FIELDS = ['user_id', 'category', 'status', 'approved']
+INTEREST_FIELDS = ['user_id', 'status']
+
+
+def post_contribution(user_id, category, status, approved):
+    """The counters a post with these values adds 1 to"""
+    keys = [
+        (GLOBAL, '', 'posts'),
+        (CATEGORY, category or '', 'posts'),
+        (USER, str(user_id), 'posts'),
+    ]
+    if approved is False:
+        keys.append((GLOBAL, '', 'posts_unapproved'))
+    if status == 'active':
+        keys.append((GLOBAL, '', 'posts_active'))
+        keys.append((USER, str(user_id), 'posts_active'))
+    return keys
+
+
+def interest_contribution(user_id, status):
+    """The counters an interest with these values adds 1 to"""
+    keys = [
+        (GLOBAL, '', 'interests'),
+        (USER, str(user_id), 'interests'),
+    ]
+    if status == 'pending':
+        keys.append((GLOBAL, '', 'interests_pending'))
+        keys.append((USER, str(user_id), 'interests_pending'))
+    elif status == 'accepted':
+        keys.append((USER, str(user_id), 'interests_accepted'))
+    return keys
+
+
+_TRACKED = {
+    MarketPost: (POST_FIELDS, post_contribution),
+    MarketInterest: (INTEREST_FIELDS, interest_contribution),
+}
+history.track(MarketPost, POST_FIELDS)
+history.track(MarketInterest, INTEREST_FIELDS)
+
+
+def flush_deltas(session):
+    """Counter deltas implied by the pending changes in ``session``"""
+    deltas = Counter()
+    for obj in session.new:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            fields, contribution = tracked
+            deltas.update(contribution(*history.column_values(obj, fields, before=False)))
+    for obj in session.deleted:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            fields, contribution = tracked
+            deltas.subtract(contribution(*history.column_values(obj, fields, before=True)))
+    for obj in session.dirty:
+        tracked = _TRACKED.get(type(obj))
+        if tracked and session.is_modified(obj, include_collections=False):
+            fields, contribution = tracked
+            deltas.subtract(contribution(*history.column_values(obj, fields, before=True)))
+            deltas.update(contribution(*history.column_values(obj, fields, before=False)))
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_deltas(connection, deltas):
+    """Add ``deltas`` to the stored counters with one upsert"""
+    if not deltas:
+        return
+    rows = [{'scope': scope, 'scope_key': key, 'metric': metric, 'value': delta}
+            for (scope, key, metric), delta in deltas.items()]
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        stmt = insert(MarketStat).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['scope', 'scope_key', 'metric'],
+            set_={'value': MarketStat.value + stmt.excluded.value}
+        )
+        connection.execute(stmt)
+        return
+
+    for row in rows:
+        result = connection.execute(
+            update(MarketStat)
+            .where(MarketStat.scope == row['scope'], MarketStat.scope_key == row['scope_key'],
+                   MarketStat.metric == row['metric'])
+            .values(value=MarketStat.value + row['value'])
+        )
+        if result.rowcount == 0:
+            connection.execute(MarketStat.__table__.insert().values(**row))
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_market_stats(session, flush_context):
+    deltas = flush_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# ==================== READS ====================
+
+def get_stats(scope, scope_key=''):
+    """All metrics for one scope key as a dict"""
+    rows = db.session.query(MarketStat.metric, MarketStat.value).filter_by(
+        scope=scope, scope_key=str(scope_key)
+    ).all()
+    return {metric: value for metric, value in rows}
+
+
+def category_counts(metric='posts'):
+    """``(category, value)`` pairs, largest first, for categories with a non-zero count"""
+    return db.session.query(MarketStat.scope_key, MarketStat.value).filter(
+        MarketStat.scope == CATEGORY,
+        MarketStat.metric == metric,
+        MarketStat.value > 0
+    ).order_by(MarketStat.value.desc(), MarketStat.scope_key).all()
+
+
+# ==================== RECONCILIATION ====================
+
+def compute_market_stats():
+    """Every counter computed from the base tables"""
+    counts = Counter()
+
+    post_groups = db.session.query(
+        MarketPost.user_id, MarketPost.category, MarketPost.status, MarketPost.approved,
+        func.count(MarketPost.id)
+    ).group_by(MarketPost.user_id, MarketPost.category, MarketPost.status, MarketPost.approved)
+    for user_id, category, status, approved, count in post_groups:
+        for key in post_contribution(user_id, category, status, approved):
+            counts[key] += count
+
+    interest_groups = db.session.query(
+        MarketInterest.user_id, MarketInterest.status, func.count(MarketInterest.id)
+    ).group_by(MarketInterest.user_id, MarketInterest.status)
+    for user_id, status, count in interest_groups:
+        for key in interest_contribution(user_id, status):
+            counts[key] += count
+
+    return counts
+
+
+def reconcile_market_stats():
+    """Rewrite market_stats from the base tables; returns the number of counters that had drifted"""
+    expected = compute_market_stats()
+    stored = {(row.scope, row.scope_key, row.metric): row.value for row in MarketStat.query.all()}
+    drifted = sum(1 for key in set(expected) | set(stored) if expected.get(key, 0) != stored.get(key, 0))
+
+    if drifted:
+        MarketStat.query.delete()
+        db.session.bulk_insert_mappings(MarketStat, [
+            {'scope': scope, 'scope_key': key, 'metric': metric, 'value': value}
+            for (scope, key, metric), value in expected.items() if value
+        ])
+    db.session.commit()
+    return drifted
+
+
+class StatsReconciler:
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    drifted = reconcile_market_stats()
+                    if drifted:
+                        print(f"Market stats reconciled: {drifted} counters corrected")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Market stats reconciliation failed: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='market-stats-reconciler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_market_stats(app):
+    """Build the counters if they are missing and schedule reconciliation"""
+    with app.app_context():
+        if not MarketStat.query.first() and MarketPost.query.first():
+            reconcile_market_stats()
+
+    interval = app.config.get('MARKET_STATS_RECONCILE_INTERVAL', 3600)
+    # Skipped on in-memory SQLite, whose single shared connection a thread would interleave with
+    if interval and not is_in_memory_sqlite(app):
+        app.extensions['market_stats_reconciler'] = StatsReconciler(app, interval).start()
@@ -0,0 +1,86 @@
+# backend/services/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by an opaque cursor holding the ``(timestamp, id)`` of the
+last row returned, so fetching page N is a range scan on an index instead of an
+OFFSET that grows with N. Totals are optional because they need a COUNT(*).
+"""
+import base64
+import binascii
+import datetime
+import json
+from sqlalchemy import Date, tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, row_id):
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid pagination cursor') from e
+
+
+def cursor_requested(args):
+    """Cursor mode is opted into with ?cursor=... or ?pagination=cursor"""
+    return 'cursor' in args or args.get('pagination') == 'cursor'
+
+
+def include_total(args, default=True):
+    value = args.get('include_total')
+    if value is None:
+        return default
+    return value.lower() in ['true', '1', 'yes']
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_more = next_cursor is not None
+        self.total = total
+
+    def meta(self):
+        """Pagination fields for the JSON response"""
+        meta = {'next_cursor': self.next_cursor, 'has_more': self.has_more}
+        if self.total is not None:
+            meta['total'] = self.total
+        return meta
+
+
+def keyset_page(query, timestamp_column, id_column, cursor=None, limit=20, descending=True, with_total=False):
+    """Return one page of ``query`` ordered by (timestamp_column, id_column)"""
+    limit = max(1, min(limit, 100))
+    total = query.order_by(None).count() if with_total else None
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if isinstance(timestamp_column.type, Date):
+            # Date columns compare against dates, not midnight datetimes
+            position = (position[0].date(), position[1])
+        key = tuple_(timestamp_column, id_column)
+        query = query.filter(key < position if descending else key > position)
+
+    if descending:
+        query = query.order_by(None).order_by(timestamp_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(None).order_by(timestamp_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
+
+    return KeysetPage(rows, next_cursor, total)
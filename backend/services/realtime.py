@@ -0,0 +1,249 @@
+# backend/services/realtime.py
+"""
+Push delivery of new messages over Server-Sent Events.
+
+Each process has one ``Hub``. It fans events out to the open streams of each
+user, each stream getting its own bounded queue. ``send_message`` publishes
+the new Message to the receiver after its commit. A stream opened with
+``since_id`` (or the ``Last-Event-ID`` an EventSource sends when it
+reconnects) first replays the receiver's messages after that id from the
+database. Delivery is therefore at-least-once across reconnects, and each
+stream drops the duplicates.
+
+A hub only sees what its own process publishes. With several workers, a
+broker carries events between them:
+
+* ``LocalBroker`` (REALTIME_BROKER=local) does nothing extra. Use it with a
+  single worker process.
+* ``DatabaseBroker`` (REALTIME_BROKER=database) stands in for a shared broker.
+  While any stream is open, each process polls ``messages`` for ids above the
+  last it saw, once per REALTIME_POLL_INTERVAL, and hands them to its hub. That
+  is one indexed query per process however many users are connected. A real
+  pub/sub broker only needs the same ``start``/``publish``/``stop`` methods.
+
+Streams end after REALTIME_STREAM_TIMEOUT, and the client reconnects with
+Last-Event-ID. Long-lived connections therefore do not pin worker threads
+forever, and a stream that fell behind (full queue) recovers by replaying
+from the database.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from flask import current_app
+from extensions import db
+from models.message import Message
+
+RETRY_MS = 3000  # EventSource reconnect delay
+QUEUE_SIZE = 200
+REPLAY_PAGE = 200
+POLL_OVERLAP = 100  # ids re-read by the database broker, for rows that commit out of id order
+
+
+def format_event(event, name='message'):
+    return f"id: {event['id']}\nevent: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+class Subscription:
+    """One open stream: a bounded queue plus the ids it has already sent"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+        self._sent = set()
+        self._order = deque()
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True  # the stream ends and the client replays from the database
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def mark(self, event_id):
+        """True the first time ``event_id`` is seen by this stream"""
+        if event_id in self._sent:
+            return False
+        self._sent.add(event_id)
+        self._order.append(event_id)
+        if len(self._order) > QUEUE_SIZE * 5:
+            self._sent.discard(self._order.popleft())
+        return True
+
+
+class Hub:
+    def __init__(self, broker=None):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.broker = broker or LocalBroker()
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        self.broker.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def deliver(self, user_id, event):
+        """Hand ``event`` to this process's streams for ``user_id``"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+        self.broker.publish(user_id, event)
+
+
+class LocalBroker:
+    """Single process: the hub's own delivery is all there is"""
+
+    def start(self, hub):
+        pass
+
+    def publish(self, user_id, event):
+        pass
+
+    def stop(self):
+        pass
+
+
+class DatabaseBroker:
+    """Cross-process delivery by polling the messages table while streams are open"""
+
+    def __init__(self, app, interval=None):
+        self.app = app
+        self.interval = interval or app.config.get('REALTIME_POLL_INTERVAL', 1.0)
+        self.last_id = None
+        self._seen = deque(maxlen=POLL_OVERLAP * 2)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        pass  # the committed row is the event; every process's poll picks it up
+
+    def poll_once(self, hub):
+        """Deliver messages committed since the last poll; returns how many"""
+        with self.app.app_context():
+            try:
+                if self.last_id is None:
+                    # Start from now: what is already in the window counts as seen
+                    self.last_id = db.session.query(db.func.max(Message.id)).scalar() or 0
+                    self._seen.extend(db.session.execute(
+                        db.select(Message.id).where(Message.id > self.last_id - POLL_OVERLAP)
+                    ).scalars())
+                    return 0
+                rows = Message.query.filter(Message.id > self.last_id - POLL_OVERLAP) \
+                    .order_by(Message.id).limit(QUEUE_SIZE * 5).all()
+                delivered = 0
+                for message in rows:
+                    if message.id in self._seen:
+                        continue
+                    self._seen.append(message.id)
+                    if message.id > self.last_id:
+                        self.last_id = message.id
+                    hub.deliver(message.receiver_id, message.to_dict())
+                    delivered += 1
+                return delivered
+            finally:
+                db.session.remove()
+
+    def _loop(self, hub):
+        while not self._stop.wait(self.interval):
+            if not hub.has_subscribers():
+                continue
+            try:
+                self.poll_once(hub)
+            except Exception as e:
+                print(f"Realtime poll failed: {e}")
+
+    def start(self, hub):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                if self.last_id is None:
+                    self.poll_once(hub)  # starting point: the newest message now
+                self._thread = threading.Thread(target=self._loop, args=(hub,),
+                                                name='realtime-poller', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def get_hub():
+    return current_app.extensions['realtime']
+
+
+def publish_message(message):
+    """Push a committed Message to its receiver's open streams"""
+    get_hub().publish(message.receiver_id, message.to_dict())
+
+
+def missed_messages(user_id, since_id):
+    """The receiver's messages after ``since_id``, oldest first, a page at a time"""
+    while True:
+        page = Message.query.filter(Message.receiver_id == user_id, Message.id > since_id) \
+            .order_by(Message.id).limit(REPLAY_PAGE).all()
+        for message in page:
+            yield message.to_dict()
+        if len(page) < REPLAY_PAGE:
+            return
+        since_id = page[-1].id
+
+
+def stream(user_id, since_id=None):
+    """SSE lines for ``user_id``: replay after ``since_id``, then live messages until the timeout"""
+    config = current_app.config
+    keepalive = config.get('REALTIME_KEEPALIVE', 15)
+    deadline = time.monotonic() + config.get('REALTIME_STREAM_TIMEOUT', 300)
+    hub = get_hub()
+    # Subscribe before replaying so nothing committed in between is lost
+    subscription = hub.subscribe(user_id)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if since_id is not None:
+            for event in missed_messages(user_id, since_id):
+                subscription.mark(event['id'])
+                yield format_event(event)
+        db.session.remove()  # no connection held while idle
+
+        while time.monotonic() < deadline and not subscription.overflowed:
+            event = subscription.get(min(keepalive, max(0, deadline - time.monotonic())))
+            if event is None:
+                yield ': keepalive\n\n'
+            elif subscription.mark(event['id']):
+                yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def init_realtime(app):
+    """The process's hub, with the broker named by REALTIME_BROKER"""
+    name = app.config.get('REALTIME_BROKER', 'local')
+    broker = DatabaseBroker(app) if name == 'database' else LocalBroker()
+    hub = Hub(broker)
+    app.extensions['realtime'] = hub
+    return hub
@@ -0,0 +1,116 @@
+# backend/services/response_cache.py
+"""
+Cached responses for public catalog reads.
+
+``@cached_response(namespace, depends_on=(Model, ...))`` stores a view's
+successful JSON body in the app cache (``services/cache.py``), keyed by
+namespace version, path and query string. Every namespace has a version; a
+commit that inserts, updates or deletes one of its ``depends_on`` models bumps
+the version, orphaning all of the namespace's entries at once without
+scanning for keys. Responses carry a strong ETag (a hash of the body) and are
+made conditional, so a client that revalidates with ``If-None-Match`` gets a
+304 without a body.
+"""
+import hashlib
+import time
+from functools import wraps
+from flask import current_app, has_app_context, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from services.cache import get_cache
+
+# Model class -> namespaces whose responses embed it
+_DEPENDENTS = {}
+
+
+def _version_key(namespace):
+    return f'response-version:{namespace}'
+
+
+def namespace_version(namespace):
+    cache = get_cache()
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        # A missing (never set or evicted) version must not revive older entries
+        version = invalidate(namespace)
+    return version
+
+
+def invalidate(*namespaces):
+    """Start a new version of each namespace; returns the last version set"""
+    cache = get_cache()
+    version = None
+    for namespace in namespaces:
+        version = str(time.time_ns())
+        cache.set(_version_key(namespace), version)
+    return version
+
+
+def _cache_key(namespace):
+    args = sorted(request.args.items(multi=True))
+    query = '&'.join(f'{name}={value}' for name, value in args)
+    digest = hashlib.sha1(f'{request.path}?{query}'.encode('utf-8')).hexdigest()
+    return f'response:{namespace}:{namespace_version(namespace)}:{digest}'
+
+
+def _conditional(body, status, mimetype, etag, cache_state):
+    response = current_app.response_class(body, status=status, mimetype=mimetype)
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate, which costs a 304 when unchanged
+    response.headers['Cache-Control'] = 'public, no-cache'
+    response.headers['X-Cache'] = cache_state
+    return response.make_conditional(request)
+
+
+def cached_response(namespace, depends_on=(), ttl=None):
+    """Cache a public GET view's 200 responses in ``namespace``"""
+    for model in depends_on:
+        _DEPENDENTS.setdefault(model, set()).add(namespace)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('RESPONSE_CACHE_ENABLED', True):
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = _cache_key(namespace)
+            entry = cache.get(key)
+            if entry is not None:
+                return _conditional(entry['body'], 200, entry['mimetype'], entry['etag'], 'HIT')
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data(as_text=True)
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.sha256(body.encode('utf-8')).hexdigest(),
+            }
+            cache.set(key, entry, ttl or current_app.config.get('RESPONSE_CACHE_TTL', 300))
+            return _conditional(entry['body'], 200, entry['mimetype'], entry['etag'], 'MISS')
+        return wrapper
+    return decorator
+
+
+# ==================== INVALIDATION ====================
+
+@event.listens_for(Session, 'after_flush')
+def _collect_namespaces(session, flush_context):
+    namespaces = session.info.setdefault('response_namespaces', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        namespaces.update(_DEPENDENTS.get(type(obj), ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_namespaces(session):
+    namespaces = session.info.pop('response_namespaces', None)
+    if namespaces and has_app_context():
+        invalidate(*namespaces)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_namespaces(session, previous_transaction):
+    session.info.pop('response_namespaces', None)
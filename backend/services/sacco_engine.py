@@ -0,0 +1,339 @@
+# backend/services/sacco_engine.py
+"""
+Batch SACCO statements, interest accrual and loan amortization.
+
+``run_statements`` builds the monthly statement of every member of a SACCO in
+one pass. A fixed handful of set-based queries fetch the members, each
+member's last balance snapshot before the month, the month's ledger rows
+(sorted by member) and the SACCO's active loans. A single linear sweep then
+computes opening/closing balances, the time-weighted average balance, the accrued
+savings interest and each loan's amortization position. The query count does
+not grow with the number of members. All money is ``Decimal``, rounded to
+cents half-even only where a value is reported or posted.
+
+``post_interest`` credits a statement run's accrued interest with one
+``executemany`` UPDATE plus ledger rows keyed ``interest:<sacco>:<month>:<member>``.
+Re-running a month posts nothing twice.
+"""
+import calendar
+import datetime
+import time
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_EVEN, localcontext
+from flask import current_app
+from sqlalchemy import func, select, update, bindparam
+from extensions import db
+from models.sacco import Sacco, SaccoMember, Loan, LoanApplication, SavingsTransaction
+from services.response_cache import invalidate
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+ACTIVE_LOAN_STATUSES = ('approved', 'disbursed')
+
+# Ledger types that reduce the balance; everything else adds to it
+DEBITS = ('withdrawal',)
+
+
+def cents(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_EVEN)
+
+
+def parse_month(value):
+    """``YYYY-MM`` as the (first day, first day of next month) datetimes; ValueError otherwise"""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        start = datetime.datetime(year, month, 1)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid month '{value}'; expected YYYY-MM")
+    days = calendar.monthrange(year, month)[1]
+    return start, start + datetime.timedelta(days=days)
+
+
+def closed_month(value):
+    """``value`` as canonical ``YYYY-MM``, for a month that has already ended; ValueError otherwise.
+
+    Interest is only posted for closed months: a month still in progress has a
+    balance that keeps changing, and its idempotency keys would block posting
+    the corrected amount later.
+    """
+    start, end = parse_month(value)
+    if end > datetime.datetime.utcnow():
+        raise ValueError(f"Month '{value}' has not ended yet")
+    return f'{start:%Y-%m}'
+
+
+def _add_months(day, months):
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return datetime.date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+# ==================== AMORTIZATION ====================
+
+def amortization_schedule(principal, annual_rate_percent, months, first_due_date):
+    """
+    Equal-installment (annuity) schedule as a list of dicts.
+
+    Installments are rounded to cents and the last one absorbs the rounding
+    residue, so the principal repaid sums exactly to ``principal``.
+    """
+    principal = cents(Decimal(principal))
+    months = int(months or 0)
+    if months <= 0 or principal <= 0:
+        return []
+
+    with localcontext() as context:
+        context.prec = 34
+        rate = Decimal(str(annual_rate_percent or 0)) / Decimal(1200)
+        if rate:
+            payment = cents(principal * rate / (1 - (1 + rate) ** -months))
+        else:
+            payment = cents(principal / months)
+
+        schedule = []
+        balance = principal
+        for number in range(1, months + 1):
+            interest = cents(balance * rate)
+            repaid = balance if number == months else min(payment - interest, balance)
+            balance -= repaid
+            schedule.append({
+                'installment': number,
+                'due_date': _add_months(first_due_date, number - 1).isoformat(),
+                'payment': repaid + interest,
+                'principal': repaid,
+                'interest': interest,
+                'balance': balance,
+            })
+    return schedule
+
+
+def first_due(application):
+    """The first installment's due date: repayment start, else a month after disbursement"""
+    if application.repayment_start_date:
+        return application.repayment_start_date
+    started = application.disbursement_date or application.approval_date or application.application_date
+    return _add_months(started or datetime.date.today(), 1)
+
+
+def loan_position(schedule, period_start, period_end):
+    """What falls due within the period and the balance left once it is paid"""
+    due = [row for row in schedule if period_start <= row['due_date'] < period_end]
+    paid_by_end = [row for row in schedule if row['due_date'] < period_end]
+    principal = schedule[0]['balance'] + schedule[0]['principal'] if schedule else ZERO
+    return {
+        'installments_due': len(due),
+        'amount_due': sum((row['payment'] for row in due), ZERO),
+        'interest_due': sum((row['interest'] for row in due), ZERO),
+        'outstanding_balance': paid_by_end[-1]['balance'] if paid_by_end else principal,
+    }
+
+
+# ==================== STATEMENTS ====================
+
+def _signed(transaction_type, amount):
+    return -amount if transaction_type in DEBITS else amount
+
+
+def run_statements(sacco_id, month, annual_rate=None):
+    """
+    Statement of every member of ``sacco_id`` for ``month`` (``YYYY-MM``).
+
+    ``annual_rate`` is the savings interest rate in percent per year, accrued on
+    the time-weighted average balance; it defaults to SAVINGS_INTEREST_RATE.
+    """
+    started = time.perf_counter()
+    start, end = parse_month(month)
+    days_in_month = (end - start).days
+    rate = Decimal(str(annual_rate if annual_rate is not None
+                       else current_app.config.get('SAVINGS_INTEREST_RATE', 0)))
+    monthly_rate = rate / Decimal(1200)
+
+    members = db.session.execute(
+        select(SaccoMember.id, SaccoMember.user_id, SaccoMember.membership_id, SaccoMember.savings,
+               SaccoMember.is_active)
+        .where(SaccoMember.sacco_id == sacco_id).order_by(SaccoMember.id)
+    ).all()
+
+    # Members with any ledger history; the rest predate the ledger and hold their savings column
+    with_ledger = set(db.session.execute(
+        select(SavingsTransaction.member_id).where(SavingsTransaction.sacco_id == sacco_id).distinct()
+    ).scalars())
+
+    last_before = (
+        select(func.max(SavingsTransaction.id))
+        .where(SavingsTransaction.sacco_id == sacco_id, SavingsTransaction.created_at < start)
+        .group_by(SavingsTransaction.member_id)
+    )
+    openings = dict(db.session.execute(
+        select(SavingsTransaction.member_id, SavingsTransaction.balance_after)
+        .where(SavingsTransaction.id.in_(last_before))
+    ).all())
+
+    movements = defaultdict(list)
+    for member_id, transaction_type, amount, created_at in db.session.execute(
+        select(SavingsTransaction.member_id, SavingsTransaction.transaction_type,
+               SavingsTransaction.amount, SavingsTransaction.created_at)
+        .where(SavingsTransaction.sacco_id == sacco_id,
+               SavingsTransaction.created_at >= start, SavingsTransaction.created_at < end)
+        .order_by(SavingsTransaction.member_id, SavingsTransaction.created_at, SavingsTransaction.id)
+    ):
+        movements[member_id].append((transaction_type, amount, created_at))
+
+    # Plain column rows rather than LoanApplication entities; first_due() only needs the dates
+    loans = defaultdict(list)
+    for application in db.session.execute(
+        select(LoanApplication.id, LoanApplication.user_id, LoanApplication.amount,
+               LoanApplication.application_date, LoanApplication.approval_date,
+               LoanApplication.disbursement_date, LoanApplication.repayment_start_date,
+               Loan.interest_rate, Loan.repayment_period, Loan.name.label('loan_name'))
+        .join(Loan, LoanApplication.loan_id == Loan.id)
+        .where(Loan.sacco_id == sacco_id, LoanApplication.status.in_(ACTIVE_LOAN_STATUSES))
+    ):
+        loans[application.user_id].append(application)
+
+    period_start, period_end = start.date().isoformat(), end.date().isoformat()
+    seconds_in_month = Decimal(days_in_month * 86400)
+    statements = []
+    totals = defaultdict(lambda: ZERO)
+
+    for member_id, user_id, membership_id, savings, is_active in members:
+        if member_id in with_ledger:
+            opening = openings.get(member_id, ZERO)
+        else:
+            opening = savings or ZERO
+
+        # Average balance: each balance weighted by how long it was held
+        balance, weighted, cursor = opening, ZERO, start
+        deposits = withdrawals = credited = ZERO
+        for transaction_type, amount, created_at in movements.get(member_id, ()):
+            weighted += balance * Decimal((created_at - cursor).total_seconds())
+            cursor = created_at
+            balance += _signed(transaction_type, amount)
+            if transaction_type in DEBITS:
+                withdrawals += amount
+            elif transaction_type == 'interest':
+                credited += amount
+            else:
+                deposits += amount
+        weighted += balance * Decimal((end - cursor).total_seconds())
+        average = weighted / seconds_in_month
+        interest = cents(average * monthly_rate) if is_active else ZERO
+
+        member_loans = []
+        for application in loans.get(user_id, ()):
+            schedule = amortization_schedule(application.amount, application.interest_rate,
+                                             application.repayment_period, first_due(application))
+            position = loan_position(schedule, period_start, period_end)
+            member_loans.append({'application_id': application.id, 'loan_name': application.loan_name,
+                                 **position})
+            totals['loan_amount_due'] += position['amount_due']
+            totals['loan_outstanding'] += position['outstanding_balance']
+
+        statement = {
+            'member_id': member_id,
+            'user_id': user_id,
+            'membership_id': membership_id,
+            'opening_balance': cents(opening),
+            'deposits': deposits,
+            'withdrawals': withdrawals,
+            'interest_credited': credited,
+            'closing_balance': cents(balance),
+            'average_balance': cents(average),
+            'interest_accrued': interest,
+            'loans': member_loans,
+        }
+        statements.append(statement)
+        for key in ('opening_balance', 'deposits', 'withdrawals', 'closing_balance', 'interest_accrued'):
+            totals[key] += statement[key]
+
+    return {
+        'sacco_id': sacco_id,
+        'month': f'{start:%Y-%m}',  # canonical, so every spelling of a month shares its idempotency keys
+        'period_start': period_start,
+        'period_end': period_end,
+        'annual_rate': rate,
+        'member_count': len(statements),
+        'totals': dict(totals),
+        'statements': statements,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+STATEMENT_FIELDS = ['member_id', 'user_id', 'membership_id', 'opening_balance', 'deposits', 'withdrawals',
+                    'interest_credited', 'closing_balance', 'average_balance', 'interest_accrued',
+                    'loan_count', 'loan_amount_due', 'loan_outstanding']
+
+
+def statement_row(statement):
+    """A statement flattened to STATEMENT_FIELDS, loans summed, for CSV/NDJSON exports"""
+    loans = statement['loans']
+    flat = dict(statement,
+                loan_count=len(loans),
+                loan_amount_due=sum((loan['amount_due'] for loan in loans), ZERO),
+                loan_outstanding=sum((loan['outstanding_balance'] for loan in loans), ZERO))
+    return tuple(flat[field] for field in STATEMENT_FIELDS)
+
+
+def to_json(value):
+    """Decimals (at any depth) as floats, the JSON convention of the models' to_dict()"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    return value
+
+
+def post_interest(run):
+    """Credit a statement run's accrued interest; returns (members credited, total amount)"""
+    sacco_id, month = run['sacco_id'], run['month']
+    keys = {statement['member_id']: f"interest:{sacco_id}:{month}:{statement['member_id']}"
+            for statement in run['statements'] if statement['interest_accrued'] > 0}
+    if not keys:
+        return 0, ZERO
+
+    # A key range rather than LIKE, so the unique index on idempotency_key is used
+    prefix = f'interest:{sacco_id}:{month}:'
+    posted = set(db.session.execute(
+        select(SavingsTransaction.idempotency_key).where(
+            SavingsTransaction.idempotency_key >= prefix,
+            SavingsTransaction.idempotency_key < prefix[:-1] + ';'
+        )
+    ).scalars())
+    credits = {statement['member_id']: statement['interest_accrued'] for statement in run['statements']
+               if statement['member_id'] in keys and keys[statement['member_id']] not in posted}
+    if not credits:
+        return 0, ZERO
+
+    # One executemany UPDATE; the balances are then read back under the same locks
+    db.session.execute(
+        update(SaccoMember.__table__)
+        .where(SaccoMember.__table__.c.id == bindparam('member_id'))
+        .values(savings=func.coalesce(SaccoMember.__table__.c.savings, 0) + bindparam('amount')),
+        [{'member_id': member_id, 'amount': amount} for member_id, amount in credits.items()]
+    )
+    total = sum(credits.values(), ZERO)
+    db.session.execute(
+        update(Sacco).where(Sacco.id == sacco_id)
+        .values(total_assets=func.coalesce(Sacco.total_assets, 0) + total)
+        .execution_options(synchronize_session=False)
+    )
+
+    balances = {}
+    member_ids = list(credits)
+    for offset in range(0, len(member_ids), 500):
+        balances.update(db.session.execute(
+            select(SaccoMember.id, SaccoMember.savings).where(SaccoMember.id.in_(member_ids[offset:offset + 500]))
+        ).all())
+
+    posted_at = datetime.datetime.utcnow()
+    db.session.execute(SavingsTransaction.__table__.insert(), [
+        {'member_id': member_id, 'sacco_id': sacco_id, 'transaction_type': 'interest', 'amount': amount,
+         'balance_after': balances[member_id], 'idempotency_key': keys[member_id],
+         'description': f'Savings interest for {month}', 'created_at': posted_at}
+        for member_id, amount in credits.items()
+    ])
+    db.session.commit()
+    invalidate('sacco.saccos')
+    return len(credits), total
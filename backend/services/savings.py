@@ -0,0 +1,151 @@
+# backend/services/savings.py
+"""
+SACCO savings ledger.
+
+``post_transaction`` moves a member's savings with a single conditional SQL
+``UPDATE`` (``savings = savings + n``, and for withdrawals only ``WHERE
+savings >= n``). The lock that UPDATE takes (the row on PostgreSQL, the
+database on SQLite) serializes concurrent postings, so no update is lost and a
+balance can never go negative. Every posting appends a ``SavingsTransaction`` that carries the
+balance after it. Statements read that snapshot instead of replaying the
+history. A client-supplied idempotency key makes a retried request return the
+original transaction instead of posting twice.
+"""
+import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.sacco import Sacco, SaccoMember, SavingsTransaction
+from services.response_cache import invalidate
+
+TRANSACTION_TYPES = ('deposit', 'withdrawal')
+CENT = Decimal('0.01')
+
+
+class SavingsError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def parse_amount(value):
+    """A positive amount rounded to cents; SavingsError otherwise"""
+    try:
+        amount = Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise SavingsError('Invalid amount format')
+    if not amount.is_finite() or amount <= 0:
+        raise SavingsError('Invalid amount')
+    return amount
+
+
+def _replay(transaction, member_id, transaction_type, amount):
+    if (transaction.member_id, transaction.transaction_type, transaction.amount) != (member_id, transaction_type, amount):
+        raise SavingsError('Idempotency key was already used for a different transaction', 409)
+    return transaction, True
+
+
+def post_transaction(member_id, transaction_type, amount, idempotency_key=None, description=None,
+                     created_by_admin_id=None):
+    """
+    Post a deposit or withdrawal and commit it.
+
+    Returns ``(transaction, replayed)``; ``replayed`` is True when
+    ``idempotency_key`` had already been used and the original is returned.
+    """
+    if transaction_type not in TRANSACTION_TYPES:
+        raise SavingsError('Invalid transaction type. Must be deposit or withdrawal')
+    amount = parse_amount(amount)
+
+    if idempotency_key:
+        existing = SavingsTransaction.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return _replay(existing, member_id, transaction_type, amount)
+
+    delta = amount if transaction_type == 'deposit' else -amount
+    balance = func.coalesce(SaccoMember.savings, 0)
+    conditions = [SaccoMember.id == member_id, SaccoMember.is_active == True]
+    if transaction_type == 'withdrawal':
+        conditions.append(balance >= amount)
+
+    result = db.session.execute(
+        update(SaccoMember).where(*conditions).values(savings=balance + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.session.rollback()
+        member = db.session.get(SaccoMember, member_id)
+        if member is None or not member.is_active:
+            raise SavingsError('Active SACCO membership not found', 404)
+        raise SavingsError(f'Insufficient balance. Available: KSh {float(member.savings or 0):,.2f}')
+
+    # Read inside the same transaction, while the UPDATE's lock is held
+    sacco_id, balance_after = db.session.execute(
+        select(SaccoMember.sacco_id, SaccoMember.savings).where(SaccoMember.id == member_id)
+    ).one()
+    db.session.execute(
+        update(Sacco).where(Sacco.id == sacco_id)
+        .values(total_assets=func.coalesce(Sacco.total_assets, 0) + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+    transaction = SavingsTransaction(
+        member_id=member_id, sacco_id=sacco_id, transaction_type=transaction_type, amount=amount,
+        balance_after=balance_after, idempotency_key=idempotency_key or None, description=description,
+        created_by_admin_id=created_by_admin_id
+    )
+    db.session.add(transaction)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request with the same key won; ours is rolled back whole
+        db.session.rollback()
+        existing = SavingsTransaction.query.filter_by(idempotency_key=idempotency_key).first() if idempotency_key else None
+        if existing is None:
+            raise
+        return _replay(existing, member_id, transaction_type, amount)
+
+    # Sacco.total_assets was changed with SQL, which the response cache hooks do not see
+    invalidate('sacco.saccos')
+    return transaction, False
+
+
+def balance_at(member_id, moment):
+    """The member's balance at ``moment`` from the latest snapshot before it"""
+    snapshot = db.session.query(SavingsTransaction.balance_after).filter(
+        SavingsTransaction.member_id == member_id,
+        SavingsTransaction.created_at < moment
+    ).order_by(SavingsTransaction.created_at.desc(), SavingsTransaction.id.desc()).limit(1).scalar()
+    return snapshot if snapshot is not None else Decimal('0.00')
+
+
+def statement(member_id, start=None, end=None):
+    """
+    Opening balance, closing balance and the ledger query for ``[start, end)``.
+
+    The transactions are returned as an unordered, unexecuted query so the
+    caller can page through it (e.g. with keyset_page, ascending).
+    """
+    query = SavingsTransaction.query.filter(SavingsTransaction.member_id == member_id)
+    if start is not None:
+        query = query.filter(SavingsTransaction.created_at >= start)
+    if end is not None:
+        query = query.filter(SavingsTransaction.created_at < end)
+
+    opening = balance_at(member_id, start) if start is not None else Decimal('0.00')
+    if end is not None:
+        closing = balance_at(member_id, end)
+    else:
+        closing = db.session.query(SaccoMember.savings).filter(SaccoMember.id == member_id).scalar()
+        closing = closing if closing is not None else Decimal('0.00')
+    return opening, closing, query
+
+
+def parse_statement_date(value, name):
+    """A YYYY-MM-DD query value as the datetime at the start of that day"""
+    try:
+        return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time())
+    except ValueError:
+        raise SavingsError(f"Invalid {name} '{value}'; expected YYYY-MM-DD")
@@ -0,0 +1,165 @@
+# backend/services/search.py
+"""
+Full-text search over market posts.
+
+On SQLite an FTS5 external-content table (``market_posts_fts``) indexes
+title, description and tags and is kept in sync with ``market_posts`` by
+triggers; results are ranked with bm25, every term is prefix-matched and terms
+that do not occur in the index are widened to their closest indexed spellings.
+On PostgreSQL a GIN-indexed tsvector expression is used instead. It ranks and
+prefix-matches too, but has no typo tolerance: a misspelt term matches
+nothing. Any other backend falls back to the original ILIKE filter.
+"""
+import difflib
+import re
+from flask import current_app
+from sqlalchemy import Float, Integer, func, literal_column, text
+from extensions import db
+from models.market import MarketPost
+
+FTS_TABLE = 'market_posts_fts'
+VOCAB_TABLE = 'market_posts_fts_vocab'
+PG_DOCUMENT = ("to_tsvector('simple', coalesce(title, '') || ' ' || "
+               "coalesce(description, '') || ' ' || coalesce(tags, ''))")
+
+# bm25 column weights: title, description, tags
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def setup_search(app):
+    """Create the search index for the app's database; call after db.create_all()"""
+    engine = db.engine
+    backend = 'like'
+    try:
+        if engine.dialect.name == 'sqlite':
+            _setup_fts5(engine)
+            backend = 'fts5'
+        elif engine.dialect.name == 'postgresql':
+            _setup_tsvector(engine)
+            backend = 'tsvector'
+    except Exception as e:
+        print(f"Full-text search unavailable, using LIKE search: {str(e)}")
+    app.extensions['market_search'] = backend
+    return backend
+
+
+def _setup_fts5(engine):
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        if exists:
+            return
+
+        conn.execute(text(f"""
+            CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                title, description, tags,
+                content='market_posts', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """))
+        conn.execute(text(f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')"))
+
+        conn.execute(text(f"""
+            CREATE TRIGGER market_posts_fts_ai AFTER INSERT ON market_posts BEGIN
+                INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+                VALUES (new.id, new.title, new.description, new.tags);
+            END
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER market_posts_fts_ad AFTER DELETE ON market_posts BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+                VALUES ('delete', old.id, old.title, old.description, old.tags);
+            END
+        """))
+        # Only text edits touch the index; counter updates leave it alone
+        conn.execute(text(f"""
+            CREATE TRIGGER market_posts_fts_au AFTER UPDATE OF title, description, tags ON market_posts BEGIN
+                INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+                VALUES ('delete', old.id, old.title, old.description, old.tags);
+                INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+                VALUES (new.id, new.title, new.description, new.tags);
+            END
+        """))
+
+        # Index the posts that existed before the table was created
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _setup_tsvector(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_market_posts_search ON market_posts USING GIN ({PG_DOCUMENT})"
+        ))
+
+
+def search_terms(search):
+    return [term.lower() for term in _TERM.findall(search or '')]
+
+
+def _close_terms(term, limit=3):
+    """Indexed terms within a small edit distance of a term that has no matches"""
+    candidates = db.session.execute(
+        text(f"SELECT term FROM {VOCAB_TABLE} WHERE term >= :low AND term < :high"),
+        {'low': term[0], 'high': term[0] + '\U0010ffff'}
+    ).scalars().all()
+    return difflib.get_close_matches(term, candidates, n=limit, cutoff=0.75)
+
+
+def _has_prefix(term):
+    return db.session.execute(
+        text(f"SELECT 1 FROM {VOCAB_TABLE} WHERE term >= :low AND term < :high LIMIT 1"),
+        {'low': term, 'high': term + '\U0010ffff'}
+    ).first() is not None
+
+
+def fts5_match_expression(terms):
+    """Build an FTS5 MATCH string: every term prefix-matched, typos widened with OR"""
+    clauses = []
+    for term in terms:
+        options = [f'"{term}"*']
+        if len(term) >= 4 and not _has_prefix(term):
+            options.extend(f'"{close}"' for close in _close_terms(term))
+        clauses.append(options[0] if len(options) == 1 else '(' + ' OR '.join(options) + ')')
+    return ' AND '.join(clauses)
+
+
+def apply_search(query, search):
+    """
+    Filter a MarketPost query by ``search``.
+
+    Returns ``(query, rank_order)`` where ``rank_order`` is an ORDER BY clause
+    putting the best matches first, or None when the backend cannot rank.
+    """
+    terms = search_terms(search)
+    if not terms:
+        return query, None
+
+    backend = current_app.extensions.get('market_search', 'like')
+
+    if backend == 'fts5':
+        matches = text(
+            f"SELECT rowid AS post_id, bm25({FTS_TABLE}, {', '.join(map(str, BM25_WEIGHTS))}) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        ).bindparams(match=fts5_match_expression(terms)).columns(post_id=Integer, rank=Float).subquery()
+        query = query.join(matches, MarketPost.id == matches.c.post_id)
+        return query, matches.c.rank.asc()
+
+    if backend == 'tsvector':
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        document = literal_column(PG_DOCUMENT)
+        query = query.filter(document.op('@@')(tsquery))
+        return query, func.ts_rank_cd(document, tsquery).desc()
+
+    search_term = f"%{search}%"
+    query = query.filter(
+        db.or_(
+            MarketPost.title.ilike(search_term),
+            MarketPost.description.ilike(search_term),
+            MarketPost.tags.ilike(search_term)
+        )
+    )
+    return query, None
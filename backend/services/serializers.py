@@ -0,0 +1,249 @@
+# backend/services/serializers.py
+"""
+Projection-based serializers for list endpoints.
+
+Every model keeps its ``to_dict()`` as the full ("detail") shape. On top of that a
+``ModelSerializer`` describes which columns and relationships each output field
+needs, so a request can ask for ``?shape=summary`` or ``?fields=id,title,price``
+and get a sparse payload where only the required columns are SELECTed and
+relationships that were not asked for are never traversed.
+"""
+import datetime
+import enum
+from decimal import Decimal
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from models.market import MarketPost, MarketInterest
+from models.order import Order, OrderItem
+from models.ecommerce import Cart, CartItem
+from models.skill import Skill
+from models.message import Conversation
+from models.sacco import LoanApplication, Loan
+
+
+def _plain(value):
+    """Convert a column value to its JSON form, matching the to_dict() conventions"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+class Field:
+    """One output field: how to read it and what it needs loaded"""
+
+    def __init__(self, getter, columns=(), loaders=()):
+        self.getter = getter
+        self.columns = tuple(columns)
+        # Callables returning loader options; called lazily because backref
+        # attributes only exist once the mappers are configured
+        self.loaders = tuple(loaders)
+
+
+class ModelSerializer:
+    def __init__(self, model, computed=None, summary=(), exclude=()):
+        self.model = model
+        self.computed = computed or {}
+        self.summary = tuple(summary)
+        self.exclude = set(exclude)
+        self._fields = None
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            fields = {}
+            for column in sa_inspect(self.model).column_attrs:
+                if column.key in self.exclude:
+                    continue
+                fields[column.key] = Field(
+                    lambda obj, key=column.key: _plain(getattr(obj, key)),
+                    columns=(column.key,)
+                )
+            fields.update(self.computed)
+            self._fields = fields
+        return self._fields
+
+    def select(self, args):
+        """Build a Selection from request args (``fields`` and ``shape``)"""
+        requested = args.get('fields')
+        shape = args.get('shape', 'detail')
+
+        if requested:
+            names = [name.strip() for name in requested.split(',') if name.strip()]
+        elif shape == 'summary':
+            names = list(self.summary)
+        else:
+            return Selection(self, None)
+
+        # Unknown names are dropped; the primary key is always returned
+        names = [name for name in dict.fromkeys(names) if name in self.fields]
+        if 'id' not in names:
+            names.insert(0, 'id')
+        return Selection(self, names)
+
+
+class Selection:
+    """The fields chosen for one request"""
+
+    def __init__(self, serializer, fields):
+        self.serializer = serializer
+        self.fields = fields
+
+    @property
+    def sparse(self):
+        return self.fields is not None
+
+    def options(self, default=()):
+        """Loader options for the query; ``default`` is used for the full shape"""
+        if not self.sparse:
+            return tuple(default)
+
+        model = self.serializer.model
+        columns = {key.key: None for key in sa_inspect(model).primary_key}
+        loaders = []
+        for name in self.fields:
+            field = self.serializer.fields[name]
+            columns.update(dict.fromkeys(field.columns))
+            loaders.extend(loader() for loader in field.loaders)
+
+        return (load_only(*[getattr(model, key) for key in columns]), *loaders)
+
+    def dump(self, obj):
+        if not self.sparse:
+            return obj.to_dict()
+        fields = self.serializer.fields
+        return {name: fields[name].getter(obj) for name in self.fields}
+
+
+# ==================== MODEL SERIALIZERS ====================
+
+def _user_summary(user):
+    return user.to_dict() if user else None
+
+
+MARKET_POST = ModelSerializer(
+    MarketPost,
+    computed={
+        'name': Field(lambda p: p.title, columns=('title',)),
+        'qualityGrade': Field(lambda p: p.quality_grade, columns=('quality_grade',)),
+        'harvestDate': Field(lambda p: _plain(p.harvest_date), columns=('harvest_date',)),
+        'user': Field(lambda p: _user_summary(p.user), columns=('user_id',),
+                      loaders=(lambda: joinedload(MarketPost.user),)),
+        'accepter': Field(lambda p: _user_summary(p.accepter), columns=('accepted_by',),
+                          loaders=(lambda: joinedload(MarketPost.accepter),)),
+        'images': Field(lambda p: [img.to_dict()['image_url'] for img in p.images if img.image_url],
+                        loaders=(lambda: selectinload(MarketPost.images),)),
+        'thumbnails': Field(lambda p: [img.to_dict()['thumbnail_url'] for img in p.images if img.image_url],
+                            loaders=(lambda: selectinload(MarketPost.images),)),
+        'interests': Field(lambda p: [interest.to_dict() for interest in p.interests],
+                           loaders=(lambda: selectinload(MarketPost.interests).joinedload(MarketInterest.user),)),
+    },
+    summary=('id', 'user_id', 'title', 'price', 'quantity', 'unit', 'category', 'region',
+             'type', 'status', 'approved', 'is_available', 'quality_grade', 'view_count',
+             'interest_count', 'created_at', 'thumbnails'),
+)
+
+MARKET_INTEREST = ModelSerializer(
+    MarketInterest,
+    computed={
+        'user': Field(lambda i: _user_summary(i.user), columns=('user_id',),
+                      loaders=(lambda: joinedload(MarketInterest.user),)),
+    },
+    summary=('id', 'market_post_id', 'user_id', 'offer_price', 'offer_quantity', 'status', 'created_at'),
+)
+
+ORDER = ModelSerializer(
+    Order,
+    computed={
+        'items': Field(lambda o: [item.to_dict() for item in o.items],
+                       loaders=(lambda: selectinload(Order.items).joinedload(OrderItem.product),)),
+        'item_count': Field(lambda o: len(o.items),
+                            loaders=(lambda: selectinload(Order.items),)),
+    },
+    summary=('id', 'order_number', 'total_amount', 'status', 'payment_status', 'item_count', 'created_at'),
+)
+
+CART = ModelSerializer(
+    Cart,
+    computed={
+        'items': Field(lambda c: [item.to_dict() for item in c.items],
+                       loaders=(lambda: selectinload(Cart.items).joinedload(CartItem.product),)),
+        'item_count': Field(lambda c: sum(item.quantity or 0 for item in c.items),
+                            loaders=(lambda: selectinload(Cart.items),)),
+        'total': Field(lambda c: sum(item.subtotal for item in c.items),
+                       loaders=(lambda: selectinload(Cart.items).joinedload(CartItem.product),)),
+    },
+    summary=('id', 'user_id', 'item_count', 'total', 'updated_at'),
+)
+
+SKILL = ModelSerializer(
+    Skill,
+    computed={
+        'category_name': Field(lambda s: s.category.name if s.category else None, columns=('category_id',),
+                               loaders=(lambda: joinedload(Skill.category),)),
+        'videos': Field(lambda s: [video.to_dict() for video in s.videos],
+                        loaders=(lambda: selectinload(Skill.videos),)),
+    },
+    summary=('id', 'category_id', 'category_name', 'title', 'description', 'estimated_time',
+             'is_active', 'created_at'),
+)
+
+CONVERSATION = ModelSerializer(
+    Conversation,
+    computed={
+        'participant1_id': Field(lambda c: c.user1_id, columns=('user1_id',)),
+        'participant2_id': Field(lambda c: c.user2_id, columns=('user2_id',)),
+        'participant1': Field(lambda c: _user_summary(c.participant1), columns=('user1_id',),
+                              loaders=(lambda: joinedload(Conversation.participant1),)),
+        'participant2': Field(lambda c: _user_summary(c.participant2), columns=('user2_id',),
+                              loaders=(lambda: joinedload(Conversation.participant2),)),
+    },
+    summary=('id', 'participant1_id', 'participant2_id', 'created_at', 'updated_at', 'message_count'),
+    exclude=('user1_id', 'user2_id'),
+)
+
+
+def _days_since_application(application):
+    if not application.application_date:
+        return None
+    return (datetime.date.today() - application.application_date).days
+
+
+def _processing_days(application):
+    if not (application.approval_date and application.application_date):
+        return None
+    return (application.approval_date - application.application_date).days
+
+
+def _loan_field(getter):
+    return Field(lambda a: getter(a.loan) if a.loan else None, columns=('loan_id',),
+                 loaders=(lambda: joinedload(LoanApplication.loan),))
+
+
+def _applicant_field(getter):
+    return Field(lambda a: getter(a.user) if a.user else None, columns=('user_id',),
+                 loaders=(lambda: joinedload(LoanApplication.user),))
+
+
+LOAN_APPLICATION = ModelSerializer(
+    LoanApplication,
+    computed={
+        'days_since_application': Field(_days_since_application, columns=('application_date',)),
+        'processing_days': Field(_processing_days, columns=('application_date', 'approval_date')),
+        'loan_name': _loan_field(lambda loan: loan.name),
+        'interest_rate': _loan_field(lambda loan: float(loan.interest_rate) if loan.interest_rate else 0.0),
+        'max_amount': _loan_field(lambda loan: float(loan.max_amount) if loan.max_amount else 0.0),
+        'repayment_period_months': _loan_field(lambda loan: loan.repayment_period),
+        'sacco_id': _loan_field(lambda loan: loan.sacco_id),
+        'sacco_name': Field(lambda a: a.loan.sacco.name if a.loan and a.loan.sacco else None, columns=('loan_id',),
+                            loaders=(lambda: joinedload(LoanApplication.loan).joinedload(Loan.sacco),)),
+        'username': _applicant_field(lambda user: user.username),
+        'email': _applicant_field(lambda user: user.email),
+        'user_type': _applicant_field(lambda user: user.user_type),
+    },
+    summary=('id', 'user_id', 'username', 'loan_id', 'loan_name', 'sacco_name', 'amount', 'status',
+             'application_date'),
+)
@@ -0,0 +1,81 @@
+# backend/services/tasks.py
+"""
+Background tasks run by the job queue (see services/jobs.py).
+
+Each task receives its job payload as keyword arguments inside an app
+context. Upstream failures raise so the job is retried with backoff, and
+conditions a retry cannot fix raise ``PermanentJobError``.
+"""
+from flask import current_app
+from flask_mail import Message
+from extensions import db, mail
+from models.agroclimate import Region
+from services import images, sacco_engine
+from services.jobs import task, PermanentJobError
+from services.weather import get_weather_service, api_key_configured, ingest_forecast
+from services.weather_prefetch import prefetch_all_regions
+
+
+@task('email.send', priority=5, max_attempts=5)
+def send_email(to, subject, body, html=None):
+    """Send one email through Flask-Mail"""
+    if not current_app.config.get('MAIL_USERNAME'):
+        raise PermanentJobError('Mail is not configured (MAIL_USERNAME)')
+    recipients = [to] if isinstance(to, str) else list(to)
+    mail.send(Message(subject=subject, recipients=recipients, body=body, html=html))
+    return {'sent_to': recipients}
+
+
+@task('weather.forecast', priority=1)
+def refresh_forecast(region_id):
+    """Store a region's hourly forecast"""
+    region = db.session.get(Region, region_id)
+    if region is None:
+        raise PermanentJobError(f'Region {region_id} not found')
+    service = get_weather_service()
+    if not api_key_configured(service.client.api_key):
+        raise PermanentJobError('Weather API key not configured')
+    return {'region_id': region_id, 'hours': ingest_forecast(service.client, region_id, region.latitude, region.longitude)}
+
+
+@task('weather.prefetch', priority=-1, max_attempts=1)
+def prefetch_weather(forecast=None):
+    """Refresh every region's weather once; the periodic prefetcher covers the next pass"""
+    app = current_app._get_current_object()
+    return prefetch_all_regions(app, app.config.get('WEATHER_PREFETCH_WORKERS', 4), forecast=forecast)
+
+
+@task('images.market_post_image', priority=3)
+def market_post_image_variants(image_id):
+    """Resized WebP/JPEG variants of a market post image"""
+    try:
+        return images.process_market_post_image(image_id)
+    except (images.ImageRejected, FileNotFoundError) as e:
+        raise PermanentJobError(f'Image {image_id} cannot be processed: {e}')
+
+
+@task('images.profile_picture', priority=3)
+def profile_picture_variants(profile_id, picture):
+    """Resized WebP/JPEG variants of a profile picture"""
+    try:
+        return images.process_profile_picture(profile_id, picture)
+    except (images.ImageRejected, FileNotFoundError) as e:
+        raise PermanentJobError(f'Profile picture {picture} cannot be processed: {e}')
+
+
+@task('sacco.post_interest', priority=-5, max_attempts=3)
+def post_sacco_interest(sacco_id, month, rate=None):
+    """Build a SACCO's statements for ``month`` and credit the interest; safe to repeat"""
+    try:
+        month = sacco_engine.closed_month(month)
+        run = sacco_engine.run_statements(sacco_id, month, rate)
+    except ValueError as e:
+        raise PermanentJobError(str(e))
+    credited, total = sacco_engine.post_interest(run)
+    return {
+        'sacco_id': sacco_id,
+        'month': month,
+        'annual_rate': float(run['annual_rate']),
+        'members_credited': credited,
+        'total_interest': float(total)
+    }
@@ -0,0 +1,203 @@
+# backend/services/uploads.py
+"""
+Resumable uploads, following the tus 1.0 core protocol with its creation,
+termination and expiration extensions.
+
+A client creates a session by POSTing ``Upload-Length`` (and optionally
+``Upload-Metadata`` carrying the filename). It then PATCHes the bytes in as
+many requests as it likes, each starting at the offset the server has
+acknowledged. After a dropped connection it HEADs the session for that offset
+and continues from there, so a flaky link never costs more than the chunk in
+flight. Bytes are written straight to ``UPLOAD_FOLDER/chunks/<id>.part``, and
+whatever arrived before a disconnect is kept.
+
+Once the last byte is in, the file is moved into the blob store. The session
+holds a reference to the blob (it is listed in ``blobstore.REFERENCES``)
+until a route takes the path over with ``take`` and deletes the session.
+Sessions that are not finished and taken within UPLOAD_SESSION_TTL of their
+last chunk are removed by ``expire_sessions``, which gc_blobs.py runs.
+"""
+import base64
+import binascii
+import datetime
+import os
+from email.utils import format_datetime
+from flask import current_app
+from sqlalchemy import select, update
+from werkzeug.exceptions import ClientDisconnected
+from extensions import db, allowed_file
+from models.upload import UploadSession
+from services import blobstore
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,termination,expiration'
+CHUNKS_DIR = 'chunks'
+CONTENT_TYPE = 'application/offset+octet-stream'
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def chunk_path(upload):
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], CHUNKS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{upload.id}.part')
+
+
+def parse_metadata(header):
+    """``Upload-Metadata`` as a dict: comma-separated ``key base64(value)`` pairs"""
+    metadata = {}
+    for pair in (header or '').split(','):
+        parts = pair.strip().split(' ')
+        if not parts[0]:
+            continue
+        try:
+            value = base64.b64decode(parts[1], validate=True).decode('utf-8') if len(parts) > 1 else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError(f'Invalid Upload-Metadata value for {parts[0]}')
+        metadata[parts[0]] = value
+    return metadata
+
+
+def parse_length(value, name):
+    try:
+        length = int(value)
+    except (TypeError, ValueError):
+        raise UploadError(f'{name} header is required and must be an integer')
+    if length < 0:
+        raise UploadError(f'{name} must not be negative')
+    return length
+
+
+def protocol_headers(upload=None):
+    """tus response headers, with the session's progress when given"""
+    headers = {'Tus-Resumable': TUS_VERSION, 'Cache-Control': 'no-store'}
+    if upload is not None:
+        headers['Upload-Offset'] = str(upload.offset)
+        headers['Upload-Length'] = str(upload.length)
+        headers['Upload-Expires'] = format_datetime(
+            upload.expires_at.replace(tzinfo=datetime.timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def _expiry(now):
+    return now + datetime.timedelta(seconds=current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+
+
+def create(length, metadata, owner, allowed=None):
+    """A new session for ``length`` bytes; added to the session, the caller commits"""
+    filename = metadata.get('filename') or metadata.get('name') or ''
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if not filename or not allowed_file(filename) or (allowed and extension not in allowed):
+        raise UploadError('Upload-Metadata must carry a filename with an allowed extension', 415)
+    if length <= 0:
+        raise UploadError('Upload-Length must be positive')
+    if length > current_app.config.get('UPLOAD_MAX_SIZE', 0):
+        raise UploadError('Upload-Length exceeds the maximum upload size', 413)
+
+    now = datetime.datetime.utcnow()
+    upload = UploadSession(
+        filename=filename[:255], extension=extension[:10], length=length, offset=0,
+        owner_type=owner['type'], owner_id=owner['id'],
+        created_at=now, updated_at=now, expires_at=_expiry(now)
+    )
+    db.session.add(upload)
+    db.session.flush()
+    return upload
+
+
+def get(upload_id, owner):
+    """The owner's unexpired session, or None"""
+    return UploadSession.query.filter(
+        UploadSession.id == upload_id,
+        UploadSession.owner_type == owner['type'],
+        UploadSession.owner_id == owner['id'],
+        UploadSession.expires_at > datetime.datetime.utcnow(),
+    ).first()
+
+
+def write(upload, offset, stream, content_length=None):
+    """Append the bytes read from ``stream`` at ``offset`` and commit the new offset.
+
+    Bytes received before a client disconnect are kept. If another request moved
+    the offset meanwhile, nothing is acknowledged and UploadError(409) is raised.
+    The last chunk moves the file into the blob store and completes the session.
+    """
+    if upload.status == 'complete':
+        raise UploadError('Upload is already complete', 409)
+    if offset != upload.offset:
+        raise UploadError(f'Upload-Offset {offset} does not match the current offset {upload.offset}', 409)
+    remaining = upload.length - offset
+    if content_length is not None and content_length > remaining:
+        raise UploadError('Chunk runs past Upload-Length', 413)
+
+    written = 0
+    path = chunk_path(upload)
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as out:
+        out.seek(offset)
+        try:
+            for chunk in iter(lambda: stream.read(min(blobstore.CHUNK_SIZE, remaining - written + 1)), b''):
+                if written + len(chunk) > remaining:
+                    raise UploadError('Chunk runs past Upload-Length', 413)
+                out.write(chunk)
+                written += len(chunk)
+        except ClientDisconnected:
+            pass  # keep what arrived; the client resumes from the acknowledged offset
+
+    # Conditional on the offset this write started from, so a concurrent PATCH
+    # of the same range is acknowledged once
+    now = datetime.datetime.utcnow()
+    moved = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.offset == offset, UploadSession.status == 'active')
+        .values(offset=offset + written, updated_at=now, expires_at=_expiry(now))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not moved:
+        db.session.rollback()
+        raise UploadError('Upload offset changed while writing; HEAD for the current offset', 409)
+    db.session.expire(upload)
+
+    if upload.offset == upload.length:
+        with open(path, 'r+b') as out:
+            out.truncate(upload.length)
+        upload.blob_path = blobstore.adopt(path, upload.extension)
+        upload.status = 'complete'
+    db.session.commit()
+    return upload
+
+
+def terminate(upload):
+    """Delete the session and its partial file; the caller commits"""
+    path = chunk_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.delete(upload)
+
+
+def take(upload_id, owner):
+    """Blob path of the owner's completed upload, deleting the session; the caller commits"""
+    upload = get(upload_id, owner)
+    if upload is None:
+        raise UploadError('Upload not found', 404)
+    if upload.status != 'complete':
+        raise UploadError(f'Upload is incomplete ({upload.offset} of {upload.length} bytes)', 409)
+    path = upload.blob_path
+    db.session.delete(upload)
+    return path
+
+
+def expire_sessions():
+    """Remove sessions past their expiry with their partial files; returns how many"""
+    expired = db.session.execute(
+        select(UploadSession).where(UploadSession.expires_at <= datetime.datetime.utcnow())
+    ).scalars().all()
+    for upload in expired:
+        terminate(upload)
+    db.session.commit()
+    return len(expired)
@@ -0,0 +1,418 @@
+# backend/services/weather.py
+"""
+Tomorrow.io client and the cache in front of it.
+
+``WeatherService.get`` serves a cached value while it is fresh, serves it
+stale while a single background refresh runs once the TTL has passed, and
+coalesces concurrent misses for the same key into one upstream call.
+``get_region`` answers a miss from today's stored WeatherData first, aged by
+when it was fetched, so the upstream is only called when there is no stored
+reading or it is too old to serve. A circuit
+breaker stops calling Tomorrow.io for a cool-down period after repeated
+failures so an outage fails fast instead of holding request threads for the
+full timeout.
+"""
+import threading
+import time
+from datetime import date, datetime, timezone
+import requests
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models.agroclimate import WeatherData, WeatherObservation
+from services.cache import get_cache
+
+REALTIME_URL = "https://api.tomorrow.io/v4/weather/realtime"
+FORECAST_URL = "https://api.tomorrow.io/v4/weather/forecast"
+
+PLACEHOLDER_API_KEYS = {
+    "your-weatherapi-key-here",
+    "your-actual-api-key-here",
+    "your-tomorrow-io-api-key-here",
+    "your-weather-api-key-if-available",
+}
+
+WEATHER_CODES = {
+    0: 'Unknown',
+    1000: 'Clear',
+    1001: 'Cloudy',
+    1100: 'Mostly Clear',
+    1101: 'Partly Cloudy',
+    1102: 'Mostly Cloudy',
+    2000: 'Fog',
+    2100: 'Light Fog',
+    3000: 'Light Wind',
+    3001: 'Wind',
+    3002: 'Strong Wind',
+    4000: 'Drizzle',
+    4001: 'Rain',
+    4200: 'Light Rain',
+    4201: 'Heavy Rain',
+    5000: 'Snow',
+    5001: 'Flurries',
+    5100: 'Light Snow',
+    5101: 'Heavy Snow',
+    6000: 'Freezing Drizzle',
+    6001: 'Freezing Rain',
+    6200: 'Light Freezing Rain',
+    6201: 'Heavy Freezing Rain',
+    7000: 'Ice Pellets',
+    7101: 'Heavy Ice Pellets',
+    7102: 'Light Ice Pellets',
+    8000: 'Thunderstorm'
+}
+
+
+class WeatherUnavailable(Exception):
+    """Upstream failure, carrying the response the API should return"""
+
+    def __init__(self, message, error, status_code=503):
+        super().__init__(message)
+        self.message = message
+        self.error = error
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {'message': self.message, 'error': self.error}
+
+
+def api_key_configured(api_key):
+    return bool(api_key) and api_key not in PLACEHOLDER_API_KEYS
+
+
+def weather_condition(weather_code):
+    """Convert Tomorrow.io weather code to readable condition"""
+    return WEATHER_CODES.get(weather_code, 'Unknown')
+
+
+def parse_values(values):
+    """Map a Tomorrow.io ``values`` object onto WeatherData columns"""
+    return {
+        'temperature': values.get('temperature', 0),
+        'humidity': values.get('humidity', 0),
+        'rainfall': values.get('precipitationIntensity', 0.0),
+        'wind_speed': values.get('windSpeed', 0),
+        'wind_direction': values.get('windDirection', 0),
+        'weather_condition': weather_condition(values.get('weatherCode', 0))
+    }
+
+
+def todays_weather(region_id):
+    return WeatherData.query.filter(
+        WeatherData.region_id == region_id,
+        WeatherData.date == date.today()
+    ).first()
+
+
+def save_todays_weather(region_id, values):
+    """Insert or update today's WeatherData row for a region and log the hourly observation"""
+    weather = todays_weather(region_id)
+    if weather is None:
+        weather = WeatherData(region_id=region_id, date=date.today())
+        db.session.add(weather)
+    for field, value in values.items():
+        setattr(weather, field, value)
+    record_observations(region_id, [(datetime.utcnow(), values)], 'observed', commit=False)
+    db.session.commit()
+    return weather.to_dict()
+
+
+def stored_reading(region_id):
+    """
+    Today's stored reading for a region as ``(value, fetched_at)``, or None.
+
+    ``fetched_at`` (epoch seconds) is when today's latest observed hour was
+    fetched. A row written without one is dated now, as it was always served.
+    """
+    weather = todays_weather(region_id)
+    if weather is None:
+        return None
+    fetched = db.session.query(func.max(WeatherObservation.fetched_at)).filter(
+        WeatherObservation.region_id == region_id,
+        WeatherObservation.kind == 'observed',
+        WeatherObservation.fetched_at >= datetime.combine(date.today(), datetime.min.time())
+    ).scalar()
+    fetched_at = fetched.replace(tzinfo=timezone.utc).timestamp() if fetched else time.time()
+    return weather.to_dict(), fetched_at
+
+
+OBSERVATION_FIELDS = ['temperature', 'humidity', 'rainfall', 'wind_speed', 'weather_condition']
+
+
+def _hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_observations(region_id, readings, kind, commit=True):
+    """
+    Upsert ``(datetime, values)`` readings into the hourly time series.
+
+    Uses INSERT ... ON CONFLICT on SQLite and PostgreSQL so a whole forecast is
+    written in a few statements; other backends update row by row.
+    """
+    fetched_at = datetime.utcnow()
+    rows = {}
+    for moment, values in readings:
+        row = {'region_id': region_id, 'observed_at': _hour(moment), 'kind': kind, 'fetched_at': fetched_at}
+        row.update({field: values.get(field) for field in OBSERVATION_FIELDS})
+        rows[row['observed_at']] = row
+    rows = list(rows.values())
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        for start in range(0, len(rows), 500):
+            stmt = insert(WeatherObservation).values(rows[start:start + 500])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['region_id', 'observed_at', 'kind'],
+                set_={field: stmt.excluded[field] for field in OBSERVATION_FIELDS + ['fetched_at']}
+            )
+            db.session.execute(stmt)
+    else:
+        for row in rows:
+            observation = WeatherObservation.query.filter_by(
+                region_id=region_id, observed_at=row['observed_at'], kind=kind
+            ).first() or WeatherObservation()
+            for field, value in row.items():
+                setattr(observation, field, value)
+            db.session.add(observation)
+
+    if commit:
+        db.session.commit()
+    return len(rows)
+
+
+def ingest_forecast(client, region_id, latitude, longitude):
+    """Store the hourly forecast for a region; returns the number of hours written"""
+    return record_observations(region_id, client.hourly_forecast(latitude, longitude), 'forecast')
+
+
+class TomorrowClient:
+    def __init__(self, api_key, timeout=5, http_get=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.http_get = http_get or requests.get
+
+    def _get(self, url, params):
+        try:
+            response = self.http_get(url, params={**params, 'apikey': self.api_key}, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            raise WeatherUnavailable('Weather service request timed out',
+                                     'Tomorrow.io weather service is currently unavailable', 504)
+        except requests.exceptions.ConnectionError:
+            raise WeatherUnavailable('Unable to connect to weather service',
+                                     'Tomorrow.io weather service is currently unavailable', 503)
+
+        if response.status_code == 429:
+            raise WeatherUnavailable('Weather service rate limit reached',
+                                     'Tomorrow.io rate limit exceeded', 429)
+        if response.status_code != 200:
+            raise WeatherUnavailable('Failed to fetch weather data from Tomorrow.io', response.text, 502)
+        return response.json()
+
+    def realtime(self, latitude, longitude):
+        payload = self._get(REALTIME_URL, {'location': f"{latitude},{longitude}", 'units': 'metric'})
+        return parse_values(payload.get('data', {}).get('values', {}))
+
+    def hourly_forecast(self, latitude, longitude):
+        """List of ``(datetime, values)`` for the hourly forecast timeline (UTC)"""
+        payload = self._get(FORECAST_URL, {'location': f"{latitude},{longitude}", 'units': 'metric',
+                                           'timesteps': '1h'})
+        readings = []
+        for step in payload.get('timelines', {}).get('hourly', []):
+            moment = datetime.fromisoformat(step['time'].replace('Z', '+00:00'))
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            readings.append((moment, parse_values(step.get('values', {}))))
+        return readings
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures; one trial call after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers share its result"""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class WeatherService:
+    def __init__(self, cache, client, breaker=None, fresh_ttl=600, stale_ttl=3600):
+        self.cache = cache
+        self.client = client
+        self.breaker = breaker or CircuitBreaker()
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.flight = SingleFlight()
+
+    @staticmethod
+    def region_key(latitude, longitude):
+        if latitude is None or longitude is None:
+            raise WeatherUnavailable('Region has no coordinates',
+                                     'A latitude and longitude are needed to fetch weather', 400)
+        return f"weather:realtime:{latitude:.3f},{longitude:.3f}"
+
+    def get_region(self, region_id, latitude, longitude):
+        """``get`` for a region's realtime reading; a miss is answered from the stored reading while it can be"""
+        key = self.region_key(latitude, longitude)
+        entry = self.cache.get(key)
+        if entry is None or time.time() - entry['fetched_at'] >= entry.get('fresh_for', self.fresh_ttl):
+            # Another process (the prefetcher, another web worker) may have stored a newer reading
+            stored = stored_reading(region_id)
+            if stored is not None and (entry is None or stored[1] > entry['fetched_at']):
+                self._store(key, *stored)
+        return self.get(key, self.region_loader(region_id, latitude, longitude))
+
+    def region_loader(self, region_id, latitude, longitude):
+        """Loader that fetches a region's realtime reading and stores it as today's WeatherData"""
+        return lambda: save_todays_weather(region_id, self.client.realtime(latitude, longitude))
+
+    def get(self, key, loader):
+        """
+        Return ``(value, state)`` for ``key``, calling ``loader()`` on a miss.
+
+        ``state`` is ``'hit'``, ``'stale'`` (served while a refresh runs) or
+        ``'miss'``. Raises WeatherUnavailable when there is nothing cached and
+        the upstream call fails or the breaker is open.
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            if age < entry.get('fresh_for', self.fresh_ttl):
+                return entry['value'], 'hit'
+            self.refresh_in_background(key, loader)
+            return entry['value'], 'stale'
+
+        return self.flight.do(key, lambda: self._load(key, loader)), 'miss'
+
+    def refresh(self, key, loader, fresh_ttl=None):
+        """Fetch and cache ``key`` now, sharing any refresh already running"""
+        return self.flight.do(key, lambda: self._load(key, loader, fresh_ttl))
+
+    def refresh_in_background(self, key, loader):
+        if self.flight.in_flight(key):
+            return
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    self.refresh(key, loader)
+                except Exception as e:
+                    print(f"Background weather refresh failed for {key}: {e}")
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _load(self, key, loader, fresh_ttl=None):
+        if not self.breaker.allow():
+            raise WeatherUnavailable('Weather service temporarily unavailable',
+                                     'Tomorrow.io calls are paused after repeated failures', 503)
+        try:
+            value = loader()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self._store(key, value, time.time(), fresh_ttl)
+        return value
+
+    def _store(self, key, value, fetched_at, fresh_ttl=None):
+        """Cache a value fetched at ``fetched_at`` until it is too old to serve stale"""
+        fresh_ttl = fresh_ttl or self.fresh_ttl
+        remaining = fresh_ttl + self.stale_ttl - (time.time() - fetched_at)
+        if remaining > 0:
+            self.cache.set(key, {'value': value, 'fetched_at': fetched_at, 'fresh_for': fresh_ttl}, remaining)
+
+
+_init_lock = threading.Lock()
+
+
+def get_weather_service(app=None):
+    """The app-wide WeatherService, configured from WEATHER_* settings"""
+    app = app or current_app._get_current_object()
+    with _init_lock:
+        if 'weather' not in app.extensions:
+            config = app.config
+            app.extensions['weather'] = WeatherService(
+                get_cache(app),
+                TomorrowClient(config.get('WEATHER_API_KEY'), timeout=config.get('WEATHER_TIMEOUT', 5)),
+                CircuitBreaker(config.get('WEATHER_BREAKER_THRESHOLD', 3), config.get('WEATHER_BREAKER_RESET', 60)),
+                fresh_ttl=config.get('WEATHER_CACHE_TTL', 600),
+                stale_ttl=config.get('WEATHER_STALE_TTL', 3600),
+            )
+    return app.extensions['weather']
@@ -0,0 +1,93 @@
+# backend/services/weather_history.py
+"""
+Downsampled weather history over the hourly ``weather_observations`` series.
+
+Buckets are computed by the database with a single GROUP BY (min/max/avg/sum
+per bucket), so a year of hourly rows is reduced to a few hundred result rows
+without loading the individual observations into Python.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from extensions import db
+from models.agroclimate import WeatherObservation
+
+INTERVALS = ['hour', 'day', 'week', 'month']
+KINDS = ['observed', 'forecast']
+MAX_RANGE_DAYS = 366
+
+_SQLITE_FORMATS = {'hour': '%Y-%m-%dT%H:00', 'day': '%Y-%m-%d', 'month': '%Y-%m'}
+_POSTGRES_FORMATS = {'hour': 'YYYY-MM-DD"T"HH24:00', 'day': 'YYYY-MM-DD', 'week': 'IYYY-"W"IW', 'month': 'YYYY-MM'}
+
+
+def _sqlite_iso_week(column):
+    """``IYYY-"W"IW`` on SQLite, which has no ISO week format: the ISO year and week are those of the week's Thursday"""
+    thursday = func.date(column, '-3 days', 'weekday 4')
+    week = (func.strftime('%j', thursday) - 1) / 7 + 1
+    return func.printf('%s-W%02d', func.strftime('%Y', thursday), week)
+
+
+def _bucket(column, interval, dialect):
+    if dialect == 'sqlite':
+        if interval == 'week':
+            return _sqlite_iso_week(column)
+        return func.strftime(_SQLITE_FORMATS[interval], column)
+    if dialect == 'postgresql':
+        return func.to_char(func.date_trunc(interval, column), _POSTGRES_FORMATS[interval])
+    if interval != 'day':
+        raise ValueError(f"Interval '{interval}' is not supported on this database")
+    return func.date(column)
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def aggregate_history(region_id, start, end, interval='day', kind='observed'):
+    """
+    Aggregate a region's observations between ``start`` and ``end`` (dates, inclusive).
+
+    Returns one dict per bucket with temperature min/max/mean, mean humidity,
+    total and peak rainfall, peak wind speed and the number of hourly samples.
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(KINDS)}")
+    if end < start:
+        raise ValueError('end must not be before start')
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f'Date range cannot exceed {MAX_RANGE_DAYS} days')
+
+    dialect = db.session.get_bind().dialect.name
+    period = _bucket(WeatherObservation.observed_at, interval, dialect).label('period')
+    range_start = datetime.combine(start, datetime.min.time())
+    range_end = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+    rows = db.session.query(
+        period,
+        func.min(WeatherObservation.temperature),
+        func.max(WeatherObservation.temperature),
+        func.avg(WeatherObservation.temperature),
+        func.avg(WeatherObservation.humidity),
+        func.sum(WeatherObservation.rainfall),
+        func.max(WeatherObservation.rainfall),
+        func.max(WeatherObservation.wind_speed),
+        func.count(WeatherObservation.id),
+    ).filter(
+        WeatherObservation.region_id == region_id,
+        WeatherObservation.kind == kind,
+        WeatherObservation.observed_at >= range_start,
+        WeatherObservation.observed_at < range_end,
+    ).group_by(period).order_by(period).all()
+
+    return [{
+        'period': str(row[0]),
+        'temperature_min': _round(row[1]),
+        'temperature_max': _round(row[2]),
+        'temperature_mean': _round(row[3]),
+        'humidity_mean': _round(row[4]),
+        'rainfall_total': _round(row[5]),
+        'rainfall_max': _round(row[6]),
+        'wind_speed_max': _round(row[7]),
+        'samples': row[8],
+    } for row in rows]
@@ -0,0 +1,182 @@
+# backend/services/weather_prefetch.py
+"""
+Background refresh of the realtime weather for every Region.
+
+``prefetch_all_regions`` refreshes each region through the WeatherService with
+a bounded worker pool and a token bucket so a pass never exceeds the
+Tomorrow.io rate limit. A pass stops early when the upstream answers 429 or the
+circuit breaker opens. ``WeatherPrefetcher`` repeats passes on a fixed cadence
+in a daemon thread, so the weather endpoint reads from the cache and today's
+WeatherData rows instead of waiting on the upstream.
+
+Every process answers from the readings a pass stores, so the prefetch can run
+in one process (``prefetch_weather.py``, the ``weather.prefetch`` job or one
+web worker) without a shared cache. Keep WEATHER_CACHE_TTL at least
+WEATHER_PREFETCH_INTERVAL so other processes do not refresh those readings
+upstream between passes. Each process that starts a ``WeatherPrefetcher``
+(WEATHER_PREFETCH_ENABLED in every gunicorn worker, for instance) competes for
+the ``weather.prefetch`` lease before each pass, so only one of them calls the
+upstream.
+"""
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from extensions import db
+from models.agroclimate import Region
+from services import jobs
+from services.weather import (get_weather_service, api_key_configured, save_todays_weather,
+                              record_observations, WeatherUnavailable)
+
+
+class TokenBucket:
+    """Allow ``rate_per_minute`` acquisitions per minute with bursts of up to ``burst``"""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.interval = 60.0 / rate_per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        """Block until a token is available; False if ``stop_event`` is set while waiting"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) / self.interval)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) * self.interval
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
+
+
+def prefetch_all_regions(app, max_workers=4, bucket=None, fresh_ttl=None, forecast=None):
+    """
+    Refresh every region once; returns counts of refreshed, failed and skipped regions.
+
+    With ``forecast`` (default WEATHER_PREFETCH_FORECAST) the hourly forecast is
+    stored as well, at the cost of a second rate-limited call per region.
+    """
+    with app.app_context():
+        service = get_weather_service(app)
+        if not api_key_configured(service.client.api_key):
+            return {'refreshed': 0, 'failed': 0, 'skipped': 0, 'error': 'Weather API key not configured'}
+        # Regions without coordinates cannot be fetched
+        regions = [(region.id, region.latitude, region.longitude) for region in Region.query.filter(
+            Region.latitude.isnot(None), Region.longitude.isnot(None))]
+
+    bucket = bucket or TokenBucket(app.config.get('WEATHER_RATE_PER_MINUTE', 20))
+    if forecast is None:
+        forecast = app.config.get('WEATHER_PREFETCH_FORECAST', False)
+    halt = threading.Event()
+    results = {'refreshed': 0, 'failed': 0, 'skipped': 0}
+    lock = threading.Lock()
+    # Upstream calls run in parallel; the database writes are serialized
+    write_lock = threading.Lock()
+
+    def refresh(region):
+        region_id, latitude, longitude = region
+
+        def loader():
+            values = service.client.realtime(latitude, longitude)
+            with write_lock, app.app_context():
+                return save_todays_weather(region_id, values)
+
+        if halt.is_set() or not bucket.acquire(halt):
+            outcome = 'skipped'
+        else:
+            try:
+                service.refresh(service.region_key(latitude, longitude), loader, fresh_ttl=fresh_ttl)
+                if forecast and bucket.acquire(halt):
+                    readings = service.client.hourly_forecast(latitude, longitude)
+                    with write_lock, app.app_context():
+                        record_observations(region_id, readings, 'forecast')
+                outcome = 'refreshed'
+            except WeatherUnavailable as e:
+                # Rate limited or breaker open: leave the rest for the next pass
+                if e.status_code == 429 or service.breaker.state != 'closed':
+                    halt.set()
+                print(f"Weather prefetch failed for region {region_id}: {e.message}")
+                outcome = 'failed'
+            except Exception as e:
+                print(f"Weather prefetch failed for region {region_id}: {e}")
+                outcome = 'failed'
+        with lock:
+            results[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather-prefetch') as executor:
+        list(executor.map(refresh, regions))
+
+    return results
+
+
+LEASE = 'weather.prefetch'
+
+
+class WeatherPrefetcher:
+    def __init__(self, app, interval=None, max_workers=None, holder=None):
+        config = app.config
+        self.app = app
+        self.interval = interval or config.get('WEATHER_PREFETCH_INTERVAL', 3600)
+        self.max_workers = max_workers or config.get('WEATHER_PREFETCH_WORKERS', 4)
+        self.bucket = TokenBucket(config.get('WEATHER_RATE_PER_MINUTE', 20))
+        self.holder = holder or f'{socket.gethostname()}:{os.getpid()}'
+        self._stop = threading.Event()
+        self._thread = None
+
+    def lead(self):
+        """Take or renew the prefetch lease; True if this process runs the next pass"""
+        with self.app.app_context():
+            try:
+                # Renewed every pass, so it only lapses when the leader stops
+                return jobs.acquire_lease(LEASE, self.holder, self.interval + 60)
+            finally:
+                db.session.remove()
+
+    def run_once(self):
+        # Keep prefetched readings fresh until the next pass is due
+        return prefetch_all_regions(self.app, self.max_workers, self.bucket,
+                                    fresh_ttl=self.interval + 60)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                if self.lead():
+                    print(f"Weather prefetch: {self.run_once()}")
+            except Exception as e:
+                print(f"Weather prefetch pass failed: {e}")
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='weather-prefetcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self.app.app_context():
+            try:
+                jobs.release_lease(LEASE, self.holder)
+            finally:
+                db.session.remove()
+
+
+def start_weather_prefetcher(app):
+    """Start the scheduler when WEATHER_PREFETCH_ENABLED is set; one process at a time runs its passes"""
+    if not app.config.get('WEATHER_PREFETCH_ENABLED'):
+        return None
+    prefetcher = WeatherPrefetcher(app).start()
+    app.extensions['weather_prefetcher'] = prefetcher
+    return prefetcher
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Content-addressed upload store check.
+
+Identical uploads are stored once, ref_count follows the rows pointing at a
+blob, and garbage collection removes only blobs nothing references any more
+plus files whose upload never got a row.
+"""
+import os
+import sys
+import io
+import tempfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import update
+
+from app import app
+from extensions import db
+from models.blob import Blob
+from models.user import User
+from models.market import MarketPost, MarketPostImage
+from models.profile import UserProfile
+from services import blobstore
+
+
+def test_uploads_are_deduplicated_and_collected():
+    original_folder = app.config['UPLOAD_FOLDER']
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='blobs-')
+    try:
+        with app.app_context():
+            check_store(app.config['UPLOAD_FOLDER'])
+    finally:
+        app.config['UPLOAD_FOLDER'] = original_folder
+
+
+def check_store(upload_folder):
+    seller = User(username='blob_seller', email='blob_seller@example.com', user_type='farmer')
+    seller.set_password('secret')
+    db.session.add(seller)
+    db.session.flush()
+    post = MarketPost(user_id=seller.id, title='Beans', price=10)
+    db.session.add(post)
+    db.session.flush()
+
+    first = blobstore.put(io.BytesIO(b'same bytes'), 'JPG')
+    second = blobstore.put(io.BytesIO(b'same bytes'), '.jpg')
+    other = blobstore.put(io.BytesIO(b'other bytes'), 'png')
+    assert first == second
+    digest = next(iter(blobstore.digests(first)))
+    assert first == f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+    assert os.path.isfile(os.path.join(upload_folder, first))
+
+    kept = MarketPostImage(market_post_id=post.id, image_url=first)
+    dropped = MarketPostImage(market_post_id=post.id, image_url=second)
+    db.session.add_all([kept, dropped])
+    db.session.commit()
+    blob = Blob.query.filter_by(sha256=digest).one()
+    assert blob.ref_count == 2
+    assert Blob.query.count() == 2
+
+    db.session.delete(dropped)
+    db.session.commit()
+    db.session.refresh(blob)
+    assert blob.ref_count == 1
+
+    # A file whose request rolled back, and a count that drifted
+    stray = blobstore.blob_path('f' * 64, 'jpg')
+    os.makedirs(os.path.dirname(os.path.join(upload_folder, stray)), exist_ok=True)
+    open(os.path.join(upload_folder, stray), 'wb').close()
+    db.session.execute(update(Blob).where(Blob.sha256 == digest).values(ref_count=5))
+    db.session.commit()
+
+    results = blobstore.collect_garbage(grace=0)
+    assert results['drifted'] == 1
+    assert results['blobs_deleted'] == 1
+    assert results['files_swept'] == 1
+    assert not os.path.exists(os.path.join(upload_folder, other))
+    assert not os.path.exists(os.path.join(upload_folder, stray))
+    assert os.path.isfile(os.path.join(upload_folder, first))
+    assert Blob.query.filter_by(sha256=digest).one().ref_count == 1
+
+    # Repointing a row expired by a commit moves its reference from the old blob to the new one
+    profile = UserProfile(user_id=seller.id, first_name='Blob', last_name='Seller',
+                          profile_picture=f'/static/uploads/{first}')
+    db.session.add(profile)
+    db.session.commit()
+    picture = blobstore.put(io.BytesIO(b'new picture'), 'jpg')
+    db.session.commit()
+    profile.profile_picture = f'/static/uploads/{picture}'
+    db.session.commit()
+    counts = dict(db.session.query(Blob.sha256, Blob.ref_count))
+    assert counts[digest] == 1
+    assert counts[next(iter(blobstore.digests(picture)))] == 1
+    assert blobstore.reconcile_ref_counts() == 0
+
+    # Setting a column that was inserted NULL adds a reference
+    db.session.delete(profile)
+    db.session.flush()
+    profile = UserProfile(user_id=seller.id, first_name='Blob', last_name='Seller')
+    db.session.add(profile)
+    db.session.flush()
+    profile.profile_picture = f'/static/uploads/{picture}'
+    db.session.commit()
+    assert db.session.query(Blob.ref_count).filter_by(sha256=next(iter(blobstore.digests(picture)))).scalar() == 1
+    assert blobstore.reconcile_ref_counts() == 0
+
+
+if __name__ == "__main__":
+    test_uploads_are_deduplicated_and_collected()
+    print("✅ Uploads are deduplicated and unreferenced blobs are collected")
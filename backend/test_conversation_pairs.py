@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Canonical conversation pair check.
+
+Whichever participant opens it, a pair of users has exactly one
+conversation: it is stored lowest user id first, a second row for the pair
+is rejected by the unique index, and get-or-create finds the existing row
+through that index.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy.exc import IntegrityError
+
+from app import app
+from extensions import db
+from models.user import User
+from models.message import Conversation, InboxEntry
+from services import inbox
+
+
+def test_one_conversation_per_pair():
+    with app.app_context():
+        users = [User(username=f'pair_{name}', email=f'pair_{name}@example.com', user_type='farmer')
+                 for name in ('wanjiru', 'otieno')]
+        for user in users:
+            user.set_password('secret')
+        db.session.add_all(users)
+        db.session.commit()
+        low, high = sorted(user.id for user in users)
+        tokens = {user_id: {'Authorization': 'Bearer ' + create_access_token(
+            identity=json.dumps({'id': user_id, 'type': 'user'}))} for user_id in (low, high)}
+
+    client = app.test_client()
+    opened = client.post('/api/message/conversations', headers=tokens[high], json={'receiver_id': low}).get_json()
+    again = client.post('/api/message/conversations', headers=tokens[low], json={'receiver_id': str(high)}).get_json()
+    assert opened['id'] == again['id']
+    assert (opened['participant1_id'], opened['participant2_id']) == (low, high)
+    assert client.post('/api/message/conversations', headers=tokens[low],
+                       json={'receiver_id': 999999}).status_code == 404
+
+    with app.app_context():
+        assert InboxEntry.query.filter_by(conversation_id=opened['id']).count() == 2
+        conversation, created = inbox.get_or_create_conversation(low, high)
+        assert conversation.id == opened['id'] and not created
+
+        # The ORM path is canonicalized too, so the index catches a reversed duplicate
+        db.session.add(Conversation(user1_id=high, user2_id=low))
+        try:
+            db.session.commit()
+            raise AssertionError('duplicate conversation was stored')
+        except IntegrityError:
+            db.session.rollback()
+
+        plan = ' '.join(row[-1] for row in db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT id FROM conversations WHERE user1_id = :a AND user2_id = :b'
+        ), {'a': low, 'b': high}))
+        assert 'uq_conversations_pair' in plan or 'sqlite_autoindex_conversations' in plan
+
+
+if __name__ == "__main__":
+    test_one_conversation_per_pair()
+    print("✅ Each pair of users has one conversation")
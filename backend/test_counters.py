@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Counter write check.
+
+A ``CounterBuffer`` writes its increments with one UPDATE per distinct
+amount, keeps them when a flush fails so the next one retries, and writes
+what is left when the app shuts down. Expressing interest increments
+``interest_count`` in SQL, so a stale copy of the post cannot overwrite
+concurrent increments.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, update
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost
+from services import counters
+from services.counters import CounterBuffer
+
+
+def capture_updates(engine, fail=False):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE market_posts'):
+            statements.append(statement)
+            if fail:
+                raise RuntimeError('database unavailable')
+
+    event.listen(engine, 'before_cursor_execute', record)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_counter_buffer_batches_retries_and_flushes_at_exit():
+    with app.app_context():
+        owner = User(username='counter_owner', email='counter_owner@example.com', user_type='farmer')
+        owner.set_password('secret')
+        db.session.add(owner)
+        db.session.flush()
+        posts = [MarketPost(user_id=owner.id, title=f'Beans {i}', view_count=None if i == 0 else 10)
+                 for i in range(3)]
+        db.session.add_all(posts)
+        db.session.commit()
+        ids = [post.id for post in posts]
+        stamps = [post.updated_at for post in posts]
+
+        views = CounterBuffer(MarketPost, 'view_count', flush_interval=0, max_pending=3)
+        for row_id, amount in zip(ids, (2, 2, 1)):
+            views.incr(row_id, amount)
+        assert (views.pending(ids[0]), views.pending(ids[2])) == (2, 1)
+        assert views._wake.is_set()  # max_pending distinct rows wake the flusher
+
+        # A failed flush keeps every increment for the next one
+        statements, stop = capture_updates(db.engine, fail=True)
+        failed = False
+        try:
+            views.flush()
+        except Exception:
+            failed = True
+        finally:
+            stop()
+        assert failed
+        views.incr(ids[2])
+        assert [views.pending(row_id) for row_id in ids] == [2, 2, 2]
+
+        statements, stop = capture_updates(db.engine)
+        try:
+            assert views.flush() == 3
+        finally:
+            stop()
+        assert len(statements) == 1  # every row got the same amount
+        assert views.pending(ids[0]) == 0 and views.flush() == 0
+        db.session.expire_all()
+        assert [db.session.get(MarketPost, row_id).view_count for row_id in ids] == [2, 12, 12]
+        # Counter writes leave updated_at alone
+        assert [db.session.get(MarketPost, row_id).updated_at for row_id in ids] == stamps
+
+        # Increments still buffered when the app stops are written at exit
+        app_views = app.extensions['view_counter']
+        app_views.incr(ids[1], 3)
+        counters.flush_all(app)
+        assert app_views.pending(ids[1]) == 0
+        db.session.expire_all()
+        assert db.session.get(MarketPost, ids[1]).view_count == 15
+
+
+def test_interest_count_is_incremented_atomically():
+    with app.app_context():
+        seller = User(username='counter_seller', email='counter_seller@example.com', user_type='farmer')
+        buyers = [User(username=f'counter_buyer{i}', email=f'counter_buyer{i}@example.com', user_type='farmer')
+                  for i in range(2)]
+        for user in (seller, *buyers):
+            user.set_password('secret')
+        db.session.add_all([seller, *buyers])
+        db.session.flush()
+        post = MarketPost(user_id=seller.id, title='Groundnuts', status='active', is_available=True)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        headers = [{'Authorization': 'Bearer ' + create_access_token(
+            identity=json.dumps({'id': buyer.id, 'type': 'user'}))} for buyer in buyers]
+        engine = db.engine
+
+    client = app.test_client()
+    statements, stop = capture_updates(engine)
+    try:
+        assert client.post(f'/api/market/posts/{post_id}/interest', headers=headers[0], json={}).status_code == 201
+        # Increments committed by other requests meanwhile are kept
+        with app.app_context():
+            db.session.execute(update(MarketPost).where(MarketPost.id == post_id).values(interest_count=10))
+            db.session.commit()
+        assert client.post(f'/api/market/posts/{post_id}/interest', headers=headers[1], json={}).status_code == 201
+    finally:
+        stop()
+
+    assert sum('interest_count=(coalesce(market_posts.interest_count' in s for s in statements) == 2
+    with app.app_context():
+        assert db.session.get(MarketPost, post_id).interest_count == 11
+
+
+if __name__ == "__main__":
+    test_counter_buffer_batches_retries_and_flushes_at_exit()
+    test_interest_count_is_incremented_atomically()
+    print("✅ Counters are batched, retried, flushed at exit and incremented atomically")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Dashboard aggregation check.
+
+The user dashboard's counters must come from a single query, be served from
+the cache on the next request and be invalidated by a commit that touches one
+of the user's rows. The admin dashboard describes the calling Admin, not a
+user that happens to share its id.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models.admin import Admin
+from models.user import User
+from models.market import MarketPost
+from services import dashboard as dashboard_service
+
+
+def test_user_counts_single_query_and_invalidation():
+    with app.app_context():
+        owner = User(username='dash_owner', email='dash_owner@example.com', user_type='farmer')
+        owner.set_password('secret')
+        db.session.add(owner)
+        db.session.flush()
+        for i in range(3):
+            db.session.add(MarketPost(user_id=owner.id, title=f'Dash Maize {i}', category='dash-grains',
+                                      type='product', status='active', approved=True))
+        db.session.commit()
+        user_id = owner.id
+
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            counts, cached = dashboard_service.user_counts(user_id)
+            assert not cached
+            assert len(statements) == 1, statements
+            assert counts['market_posts'] == 3
+            assert counts['market_posts_recent'] == 3
+
+            statements.clear()
+            counts, cached = dashboard_service.user_counts(user_id)
+            assert cached and not statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        # A new post commits and drops the cached counters
+        db.session.add(MarketPost(user_id=user_id, title='Dash Maize 3', category='dash-grains',
+                                  type='product', status='active', approved=True))
+        db.session.commit()
+        counts, cached = dashboard_service.user_counts(user_id)
+        assert not cached
+        assert counts['market_posts'] == 4
+
+        token = create_access_token(identity=json.dumps({'id': user_id, 'type': 'user'}))
+
+    response = app.test_client().get('/api/dashboard/user/overview',
+                                     headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert data['activities'][0]['count'] == 4
+    assert 'counts' in data['timings']
+    assert 'counts;dur=' in response.headers['Server-Timing']
+
+
+def test_admin_dashboard_uses_the_admin_row():
+    with app.app_context():
+        admin = Admin(username='dash_admin', email='dash_admin@example.com', role='superadmin')
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+        # Make sure a user shares the admin's id
+        while db.session.get(User, admin.id) is None:
+            user = User(username=f'dash_filler{User.query.count()}',
+                        email=f'dash_filler{User.query.count()}@example.com', user_type='farmer')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+        token = create_access_token(identity=json.dumps({'id': admin.id, 'type': 'admin'}))
+
+    response = app.test_client().get('/api/dashboard/admin/overview',
+                                     headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200, response.get_json()
+    profile = response.get_json()['admin']
+    assert (profile['username'], profile['email'], profile['role']) == (
+        'dash_admin', 'dash_admin@example.com', 'superadmin')
+
+
+if __name__ == "__main__":
+    test_user_counts_single_query_and_invalidation()
+    test_admin_dashboard_uses_the_admin_row()
+    print("✅ Dashboard counters use one query and are invalidated on writes; admins see their own profile")
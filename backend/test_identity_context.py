@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Request-scoped identity check.
+
+The token's identity is decoded once per request and the caller's row is
+loaded once, however many times the decorator and handler ask for it. The
+shared decorators keep each blueprint's error body, and user summaries are
+served from the cache until a commit changes the user.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models.user import User
+from models.admin import Admin
+from services.identity import user_summary
+
+
+def _bearer(account_id, account_type):
+    return {'Authorization': 'Bearer ' + create_access_token(
+        identity=json.dumps({'id': account_id, 'type': account_type}))}
+
+
+def test_identity_is_decoded_and_loaded_once_per_request():
+    with app.app_context():
+        user = User(username='ctx_akinyi', email='ctx_akinyi@example.com', user_type='farmer')
+        user.set_password('secret')
+        admin = Admin(username='ctx_admin', email='ctx_admin@example.com', is_active=False)
+        admin.set_password('secret')
+        db.session.add_all([user, admin])
+        db.session.commit()
+        user_id, admin_id = user.id, admin.id
+        user_headers, admin_headers = _bearer(user_id, 'user'), _bearer(admin_id, 'admin')
+        engine = db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/user/me', headers=user_headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()['user']['id'] == user_id
+    assert sum(1 for s in statements if s.lstrip().upper().startswith('SELECT') and 'FROM users' in s) == 1
+
+    # Shared decorators answer with the blueprint's own error body
+    denied = client.get('/api/user/me', headers=admin_headers)
+    assert (denied.status_code, denied.get_json()) == (403, {'message': 'User access required'})
+    denied = client.get('/api/market/admin/user-products', headers=user_headers)
+    assert (denied.status_code, denied.get_json()) == (403, {'error': 'Admin access required'})
+    denied = client.get('/api/dashboard/admin/overview', headers=user_headers)
+    assert (denied.status_code, denied.get_json()) == (403, {'error': 'Admin access required'})
+    # The admin blueprint also requires the account to be active
+    inactive = client.get('/api/admin/profile', headers=admin_headers)
+    assert (inactive.status_code, inactive.get_json()) == (401, {'message': 'Admin account inactive or not found'})
+    assert client.get('/api/user/me').status_code == 401
+
+    with app.app_context():
+        assert user_summary(user_id)['username'] == 'ctx_akinyi'
+        statements.clear()
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            db.session.remove()
+            assert user_summary(user_id)['username'] == 'ctx_akinyi'
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        assert statements == []  # served from the cache
+
+        db.session.get(User, user_id).username = 'ctx_akinyi_w'
+        db.session.commit()
+        assert user_summary(user_id)['username'] == 'ctx_akinyi_w'
+
+
+if __name__ == "__main__":
+    test_identity_is_decoded_and_loaded_once_per_request()
+    print("✅ Identity is decoded and loaded once per request")
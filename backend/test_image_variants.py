@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Image variant pipeline check.
+
+Uploading market post images and profile pictures returns straight away; a
+job worker then writes thumb/medium/full WebP and JPEG variants without EXIF,
+rotated upright, and the API serves the variant URLs.
+"""
+import os
+import sys
+import io
+import json
+import tempfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from PIL import Image
+from sqlalchemy import update
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPostImage
+from models.profile import UserProfile
+from services import blobstore, images
+from services.jobs import JobWorker
+
+
+def photo(size=(3000, 2000)):
+    """A JPEG shot sideways (EXIF orientation 6) with a GPS position"""
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x8825] = {1: 'S', 2: (1.0, 17.0, 0.0)}
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (40, 120, 40)).save(buffer, 'JPEG', exif=exif)
+    buffer.seek(0)
+    return buffer
+
+
+def test_uploads_get_resized_variants_without_exif():
+    original_folder = app.config['UPLOAD_FOLDER']
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='variants-')
+    try:
+        check_pipeline(app.config['UPLOAD_FOLDER'])
+    finally:
+        app.config['UPLOAD_FOLDER'] = original_folder
+
+
+def check_pipeline(upload_folder):
+    with app.app_context():
+        blobstore.reconcile_ref_counts()  # start from counts that match the tables
+        seller = User(username='variant_seller', email='variant_seller@example.com', user_type='farmer')
+        seller.set_password('secret')
+        db.session.add(seller)
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=json.dumps({'id': seller.id, 'type': 'user'}))}
+        seller_id = seller.id
+
+    client = app.test_client()
+    created = client.post('/api/market/posts', headers=headers, content_type='multipart/form-data', data={
+        'title': 'Maize', 'price': '30', 'type': 'product', 'images': (photo(), 'maize.jpg')
+    })
+    assert created.status_code == 201, created.get_json()
+    post = created.get_json()['post']
+    assert post['thumbnails'] == post['images']  # the original until the worker has run
+
+    assert JobWorker(app, names=['images.market_post_image']).run_pending() == 1
+
+    with app.app_context():
+        image = MarketPostImage.query.filter_by(market_post_id=post['id']).one()
+        assert image.processing_status == 'ready'
+        variants = json.loads(image.variants)
+        # The original (with its EXIF) is no longer referenced once the variants exist
+        assert image.image_url == variants['full']['jpeg']
+        # Rotated upright by the EXIF orientation, then bounded per variant
+        assert (variants['full']['width'], variants['full']['height']) == (1280, 1920)
+        assert max(variants['thumb']['width'], variants['thumb']['height']) == 320
+        for entry in variants.values():
+            for extension in ('webp', 'jpeg'):
+                with Image.open(os.path.join(upload_folder, entry[extension])) as rendered:
+                    assert not rendered.getexif()
+        urls = image.to_dict()
+
+    assert urls['thumbnail_url'].endswith(variants['thumb']['webp'])
+    assert urls['image_url'].endswith(variants['full']['jpeg'])
+    listed = client.get(f"/api/market/posts/{post['id']}").get_json()
+    listed = listed.get('post', listed)
+    assert listed['thumbnails'] == [urls['thumbnail_url']]
+
+    # Profile pictures go through the same pipeline
+    uploaded = client.post('/api/profile/picture', headers=headers, content_type='multipart/form-data',
+                           data={'profile_picture': (photo((800, 600)), 'me.jpg')})
+    assert uploaded.status_code == 200, uploaded.get_json()
+    assert JobWorker(app, names=['images.profile_picture']).run_pending() == 1
+    with app.app_context():
+        profile = UserProfile.query.filter_by(user_id=seller_id).one()
+        assert profile.profile_picture.endswith('.jpeg')
+        assert profile.to_dict()['profile_picture_variants']['thumb']['webp'].startswith('/static/uploads/blobs/')
+        assert blobstore.reconcile_ref_counts() == 0
+
+    # A picture replaced while its predecessor is being rendered is kept
+    uploaded = client.post('/api/profile/picture', headers=headers, content_type='multipart/form-data',
+                           data={'profile_picture': (photo((640, 480)), 'again.jpg')})
+    assert uploaded.status_code == 200, uploaded.get_json()
+    render = images.render_variants
+
+    def render_then_replace(source):
+        # Another upload lands while the worker is rendering
+        db.session.execute(update(UserProfile).where(UserProfile.user_id == seller_id)
+                           .values(profile_picture='/static/uploads/replaced.jpg'))
+        return render(source)
+
+    images.render_variants = render_then_replace
+    try:
+        assert JobWorker(app, names=['images.profile_picture']).run_pending() == 1
+    finally:
+        images.render_variants = render
+    with app.app_context():
+        profile = UserProfile.query.filter_by(user_id=seller_id).one()
+        assert (profile.profile_picture, profile.profile_picture_variants) == ('/static/uploads/replaced.jpg', None)
+
+
+if __name__ == "__main__":
+    test_uploads_get_resized_variants_without_exif()
+    print("✅ Uploads get resized, EXIF-free variants off the request thread")
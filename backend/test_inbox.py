@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Inbox read model check.
+
+Sending and reading messages keep each participant's inbox entry (last
+message preview, unread count, ordering) and the conversation's
+message_count current without loading any thread, and reconciliation
+repairs entries that drifted.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.message import Conversation, InboxEntry, Message
+from services import inbox
+
+
+def test_inbox_tracks_messages():
+    with app.app_context():
+        users = [User(username=f'inbox_{name}', email=f'inbox_{name}@example.com', user_type='farmer')
+                 for name in ('amina', 'baraka', 'chege')]
+        for user in users:
+            user.set_password('secret')
+        db.session.add_all(users)
+        db.session.commit()
+        amina, baraka, chege = [
+            ({'Authorization': 'Bearer ' + create_access_token(identity=json.dumps({'id': u.id, 'type': 'user'}))}, u.id)
+            for u in users
+        ]
+
+    client = app.test_client()
+
+    def open_conversation(headers, receiver_id):
+        return client.post('/api/message/conversations', headers=headers, json={'receiver_id': receiver_id}).get_json()['id']
+
+    def send(headers, conversation_id, content):
+        response = client.post(f'/api/message/conversations/{conversation_id}/messages',
+                               headers=headers, json={'content': content})
+        return response.get_json()['message_data']
+
+    with_baraka = open_conversation(amina[0], baraka[1])
+    with_chege = open_conversation(amina[0], chege[1])
+    first = send(amina[0], with_baraka, 'Beans available?')
+    send(amina[0], with_baraka, 'Need 3 bags')
+    send(baraka[0], with_baraka, 'Yes, ' + 'x' * 300)
+    send(amina[0], with_chege, 'Hello Chege')
+
+    box = client.get('/api/message/inbox', headers=amina[0]).get_json()
+    assert [entry['conversation_id'] for entry in box['inbox']] == [with_chege, with_baraka]
+    assert box['inbox'][1]['unread_count'] == 1 and box['unread_total'] == 1
+    assert len(box['inbox'][1]['last_message']['preview']) == inbox.PREVIEW_LENGTH
+    assert box['inbox'][1]['other_user']['id'] == baraka[1]
+
+    box = client.get('/api/message/inbox', headers=baraka[0]).get_json()
+    assert box['unread_total'] == 2 and box['inbox'][0]['last_message']['sender_id'] == baraka[1]
+
+    assert client.put(f"/api/message/messages/{first['id']}/read", headers=baraka[0]).status_code == 200
+    with app.app_context():
+        app.extensions['read_receipts'].flush()  # receipts are written behind
+    assert client.get('/api/message/inbox', headers=baraka[0]).get_json()['unread_total'] == 1
+
+    page = client.get('/api/message/inbox?limit=1', headers=amina[0]).get_json()
+    assert page['has_more'] and len(page['inbox']) == 1
+    rest = client.get(f"/api/message/inbox?limit=1&cursor={page['next_cursor']}", headers=amina[0]).get_json()
+    assert rest['inbox'][0]['conversation_id'] == with_baraka and not rest['has_more']
+
+    listed = client.get('/api/message/conversations?shape=summary', headers=amina[0]).get_json()
+    assert {c['id']: c['message_count'] for c in listed['conversations']} == {with_baraka: 3, with_chege: 1}
+
+    with app.app_context():
+        # Deleting the last message rewinds the preview
+        db.session.delete(Message.query.filter_by(conversation_id=with_chege).one())
+        db.session.commit()
+        entry = InboxEntry.query.filter_by(user_id=amina[1], conversation_id=with_chege).one()
+        assert entry.last_message_id is None and db.session.get(Conversation, with_chege).message_count == 0
+
+        InboxEntry.query.filter_by(user_id=baraka[1]).update({'unread_count': 9})
+        db.session.commit()
+        assert inbox.reconcile_inbox() == 1
+        assert inbox.unread_total(baraka[1]) == 1
+
+        # Toggling is_read on a row expired by a commit counts against its stored value
+        unread = Message.query.filter_by(receiver_id=baraka[1], is_read=False).one()
+        db.session.commit()
+        unread.is_read = True
+        db.session.commit()
+        assert inbox.unread_total(baraka[1]) == 0
+        unread.is_read = False
+        db.session.commit()
+        assert inbox.unread_total(baraka[1]) == 1
+        assert inbox.reconcile_inbox() == 0
+
+
+if __name__ == "__main__":
+    test_inbox_tracks_messages()
+    print("✅ Inbox entries follow messages and reads")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN-based check that the listing endpoints are served from indexes.
+
+Records every SELECT the endpoints issue against an in-memory SQLite database,
+runs EXPLAIN QUERY PLAN on each one and fails if any of the hot tables is read
+with a full table scan.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost, MarketPostImage, MarketInterest
+from models.message import Conversation, Message
+from models.order import Order
+
+HOT_TABLES = ['market_posts', 'market_post_images', 'market_interests', 'messages', 'orders', 'order_items',
+              'conversations', 'inbox_entries']
+
+
+class StatementRecorder:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def seed():
+    seller = User(username='ix_seller', email='ix_seller@example.com', user_type='farmer')
+    buyer = User(username='ix_buyer', email='ix_buyer@example.com', user_type='farmer')
+    seller.set_password('secret')
+    buyer.set_password('secret')
+    db.session.add_all([seller, buyer])
+    db.session.flush()
+
+    for i in range(5):
+        post = MarketPost(user_id=seller.id, title=f'IX Sorghum {i}', category='ix-cereals', region='Coast',
+                          type='product', status='active', approved=True, price=20 + i)
+        db.session.add(post)
+        db.session.flush()
+        db.session.add(MarketPostImage(market_post_id=post.id, image_url=f'ix_{i}.jpg'))
+        db.session.add(MarketInterest(market_post_id=post.id, user_id=buyer.id, message='Interested'))
+
+    conversation = Conversation(user1_id=seller.id, user2_id=buyer.id)
+    db.session.add(conversation)
+    db.session.flush()
+    db.session.add(Message(conversation_id=conversation.id, sender_id=seller.id,
+                           receiver_id=buyer.id, content='Hello'))
+    db.session.add(Order(user_id=buyer.id, order_number='IX-0001', total_amount=20,
+                         shipping_address='Mombasa'))
+    db.session.commit()
+    return seller.id, buyer.id, conversation.id
+
+
+def full_scans(statements):
+    """Plan lines that scan a hot table without an index"""
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            for row in plan:
+                detail = row[-1]
+                words = detail.split()
+                if words[:1] == ['SCAN'] and words[1] in HOT_TABLES and 'INDEX' not in detail:
+                    scans.append((detail, statement))
+    return scans
+
+
+def test_listing_endpoints_use_indexes():
+    with app.app_context():
+        seller_id, buyer_id, conversation_id = seed()
+        buyer_token = create_access_token(identity=json.dumps({'id': buyer_id, 'type': 'user'}))
+        seller_token = create_access_token(identity=json.dumps({'id': seller_id, 'type': 'user'}))
+
+        client = app.test_client()
+        requests = [
+            ('/api/market/posts', None),
+            ('/api/market/posts?category=ix-cereals', None),
+            ('/api/market/posts?region=Coast&sort_by=price', None),
+            ('/api/market/posts?type=product&status=active', None),
+            (f'/api/market/posts?user_id={seller_id}', None),
+            ('/api/market/posts?pagination=cursor', None),
+            ('/api/market/my/interests', buyer_token),
+            ('/api/order/orders', buyer_token),
+            (f'/api/message/conversations/{conversation_id}/messages?limit=20', seller_token),
+            ('/api/message/conversations', buyer_token),
+            ('/api/message/inbox', buyer_token),
+        ]
+
+        with StatementRecorder(db.engine) as recorder:
+            for url, token in requests:
+                headers = {'Authorization': f'Bearer {token}'} if token else {}
+                response = client.get(url, headers=headers)
+                assert response.status_code == 200, (url, response.get_json())
+
+        scans = full_scans(recorder.statements)
+        for detail, statement in scans:
+            print(f"   {detail}\n      {statement}")
+        assert not scans
+
+
+if __name__ == "__main__":
+    test_listing_endpoints_use_indexes()
+    print("✅ Listing endpoints are served from indexes")
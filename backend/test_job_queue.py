@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Background job queue check.
+
+Jobs are only queued when the enqueuing transaction commits, run highest
+priority first, are retried with backoff until they run out of attempts, can
+be claimed by only one worker, and their status is visible to whoever queued
+them (and to admins) but nobody else.
+"""
+import os
+import sys
+import json
+import datetime
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import update
+
+from app import app
+from extensions import db
+from models.job import Job
+from services import jobs
+
+calls = []
+
+
+@jobs.task('test.record')
+def record(label):
+    calls.append(label)
+    return {'label': label}
+
+
+@jobs.task('test.flaky', max_attempts=2)
+def flaky():
+    raise RuntimeError('upstream down')
+
+
+@jobs.task('test.broken')
+def broken():
+    raise jobs.PermanentJobError('bad payload')
+
+
+def test_jobs_run_by_priority_and_retry_with_backoff():
+    worker = jobs.JobWorker(app, names=['test.record', 'test.flaky', 'test.broken'])
+    with app.app_context():
+        jobs.enqueue('test.record', {'label': 'discarded'})
+        db.session.rollback()
+
+        owner = {'id': 42, 'type': 'user'}
+        low = jobs.enqueue('test.record', {'label': 'low'}, owner=owner)
+        high = jobs.enqueue('test.record', {'label': 'high'}, priority=10)
+        flaky_job = jobs.enqueue('test.flaky')
+        broken_job = jobs.enqueue('test.broken')
+        db.session.commit()
+        low_id, high_id, flaky_id, broken_id = low.id, high.id, flaky_job.id, broken_job.id
+
+        # A claimed job is not handed to a second worker
+        claimed = jobs.claim('worker-a', ['test.record'])
+        assert claimed.id == high_id
+        assert jobs.claim('worker-b', ['test.record']).id == low_id
+        assert jobs.claim('worker-c', ['test.record']) is None
+        Job.query.filter(Job.id.in_([low_id, high_id])).update({'status': 'queued', 'attempts': 0})
+        db.session.commit()
+
+    assert worker.run_pending() == 4
+    assert calls == ['high', 'low']
+
+    with app.app_context():
+        flaky_job = db.session.get(Job, flaky_id)
+        assert flaky_job.status == 'queued' and flaky_job.attempts == 1
+        assert flaky_job.run_at > datetime.datetime.utcnow() + datetime.timedelta(seconds=20)
+        assert 'upstream down' in flaky_job.last_error
+        assert db.session.get(Job, broken_id).status == 'failed'
+        assert db.session.get(Job, broken_id).attempts == 1
+
+        # Out of attempts after the backoff has passed
+        flaky_job.run_at = datetime.datetime.utcnow()
+        db.session.commit()
+    assert worker.run_pending() == 1
+
+    with app.app_context():
+        assert db.session.get(Job, flaky_id).status == 'failed'
+        assert json.loads(db.session.get(Job, low_id).result) == {'label': 'low'}
+        user_token = create_access_token(identity=json.dumps({'id': 42, 'type': 'user'}))
+        other_token = create_access_token(identity=json.dumps({'id': 43, 'type': 'user'}))
+        admin_token = create_access_token(identity=json.dumps({'id': 1, 'type': 'admin'}))
+
+    client = app.test_client()
+    status = client.get(f'/api/jobs/{low_id}', headers={'Authorization': f'Bearer {user_token}'})
+    assert status.get_json()['job']['status'] == 'succeeded'
+    assert client.get(f'/api/jobs/{low_id}', headers={'Authorization': f'Bearer {other_token}'}).status_code == 404
+    mine = client.get('/api/jobs', headers={'Authorization': f'Bearer {user_token}'}).get_json()['jobs']
+    assert [job['id'] for job in mine] == [low_id]
+
+    admin = {'Authorization': f'Bearer {admin_token}'}
+    assert client.get('/api/jobs/stats', headers=admin).get_json()['counts']['failed'] >= 2
+    assert client.post(f'/api/jobs/{low_id}/retry', headers=admin).status_code == 409
+    assert client.post(f'/api/jobs/{broken_id}/retry', headers=admin).status_code == 202
+    with app.app_context():
+        assert db.session.get(Job, broken_id).status == 'queued'
+
+
+def test_stale_running_jobs_are_requeued():
+    with app.app_context():
+        job_id = jobs.enqueue('test.record', {'label': 'orphaned'}).id
+        db.session.commit()
+        assert jobs.claim('dead-worker', ['test.record']).id == job_id
+        job = db.session.get(Job, job_id)
+        job.locked_at = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        db.session.commit()
+        assert jobs.requeue_stale(timeout=60) == 1
+        assert db.session.get(Job, job_id).status == 'queued'
+        db.session.delete(db.session.get(Job, job_id))
+        db.session.commit()
+
+
+def test_heartbeat_keeps_long_jobs_locked():
+    with app.app_context():
+        jobs.enqueue('test.record', {'label': 'long'})
+        db.session.commit()
+        job_id = jobs.claim('busy-worker', ['test.record']).id
+        db.session.execute(update(Job).where(Job.id == job_id)
+                           .values(locked_at=datetime.datetime.utcnow() - datetime.timedelta(hours=1)))
+        db.session.commit()
+
+        # A refreshed lock is not stale, and only the worker holding it can refresh it
+        assert jobs.heartbeat(job_id, 'busy-worker') is True
+        assert jobs.heartbeat(job_id, 'other-worker') is False
+        assert jobs.requeue_stale(timeout=60) == 0
+        assert db.session.get(Job, job_id, populate_existing=True).status == 'running'
+        db.session.delete(db.session.get(Job, job_id))
+        db.session.commit()
+
+    # The heartbeat beats while the block runs and stops once the lock is lost
+    beats = []
+    with jobs._Heartbeat(lambda: beats.append(1) or len(beats) < 3, interval=0.01):
+        time.sleep(0.2)
+    assert len(beats) == 3
+
+
+if __name__ == "__main__":
+    test_jobs_run_by_priority_and_retry_with_backoff()
+    test_stale_running_jobs_are_requeued()
+    test_heartbeat_keeps_long_jobs_locked()
+    print("✅ Jobs run by priority, retry with backoff and are claimed once")
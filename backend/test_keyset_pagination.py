@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cursor pagination check for the market listing and conversation messages.
+
+Walks every page through ``next_cursor`` and asserts the pages cover the whole
+result set exactly once, in order, including rows that share a timestamp.
+"""
+import os
+import sys
+import json
+import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost
+from models.message import Conversation, Message
+
+
+def seed(post_count=23, message_count=17):
+    seller = User(username='kp_seller', email='kp_seller@example.com', user_type='farmer')
+    buyer = User(username='kp_buyer', email='kp_buyer@example.com', user_type='farmer')
+    seller.set_password('secret')
+    buyer.set_password('secret')
+    db.session.add_all([seller, buyer])
+    db.session.flush()
+
+    # Pairs of posts share a timestamp so the id tie-breaker is exercised
+    base = datetime.datetime(2024, 1, 1)
+    for i in range(post_count):
+        db.session.add(MarketPost(user_id=seller.id, title=f'KP Beans {i}', category='kp-legumes',
+                                  type='product', status='active', approved=True,
+                                  created_at=base + datetime.timedelta(hours=i // 2)))
+
+    conversation = Conversation(user1_id=seller.id, user2_id=buyer.id)
+    db.session.add(conversation)
+    db.session.flush()
+    for i in range(message_count):
+        db.session.add(Message(conversation_id=conversation.id, sender_id=seller.id, receiver_id=buyer.id,
+                               content=f'Message {i}', sent_at=base + datetime.timedelta(minutes=i // 3)))
+    db.session.commit()
+    return seller.id, conversation.id
+
+
+def walk(client, url, key, headers=None):
+    seen, cursor = [], None
+    while True:
+        page_url = f'{url}&cursor={cursor}' if cursor else url
+        response = client.get(page_url, headers=headers or {})
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        seen.extend(item['id'] for item in data[key])
+        cursor = data['next_cursor']
+        assert data['has_more'] == (cursor is not None)
+        if not cursor:
+            return seen
+
+
+def test_market_posts_cursor_walk():
+    with app.app_context():
+        if not MarketPost.query.filter_by(category='kp-legumes').count():
+            seed()
+        expected = [post.id for post in MarketPost.query.filter_by(category='kp-legumes')
+                    .order_by(MarketPost.created_at.desc(), MarketPost.id.desc())]
+
+    client = app.test_client()
+    seen = walk(client, '/api/market/posts?category=kp-legumes&per_page=5&pagination=cursor', 'posts')
+    assert seen == expected
+
+    response = client.get('/api/market/posts?category=kp-legumes&per_page=5&pagination=cursor&include_total=true')
+    assert response.get_json()['total'] == len(expected)
+
+    response = client.get('/api/market/posts?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_conversation_messages_cursor_walk():
+    with app.app_context():
+        if not MarketPost.query.filter_by(category='kp-legumes').count():
+            seed()
+        seller = User.query.filter_by(username='kp_seller').first()
+        conversation = Conversation.query.filter_by(user1_id=seller.id).first()
+        expected = [message.id for message in Message.query.filter_by(conversation_id=conversation.id)
+                    .order_by(Message.sent_at.asc(), Message.id.asc())]
+        token = create_access_token(identity=json.dumps({'id': seller.id, 'type': 'user'}))
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    url = f'/api/message/conversations/{conversation.id}/messages'
+    assert walk(client, f'{url}?limit=4', 'messages', headers) == expected
+    assert walk(client, f'{url}?limit=4&order=desc', 'messages', headers) == expected[::-1]
+
+    # Without paging parameters the full history is still returned
+    response = client.get(url, headers=headers)
+    assert [message['id'] for message in response.get_json()['messages']] == expected
+
+
+if __name__ == "__main__":
+    test_market_posts_cursor_walk()
+    test_conversation_messages_cursor_walk()
+    print("✅ Cursor pagination walks every row exactly once")
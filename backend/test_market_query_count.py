@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Query-count check for the market listing endpoints.
+
+Runs the app against an in-memory SQLite database, seeds posts with images and
+interests, and asserts that a listing page costs the same small number of
+queries whatever the page size.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost, MarketPostImage, MarketInterest
+
+
+def seed_market(post_count=30):
+    owner = User(username='qc_owner', email='qc_owner@example.com', user_type='farmer')
+    owner.set_password('secret')
+    buyers = []
+    for i in range(3):
+        buyer = User(username=f'qc_buyer{i}', email=f'qc_buyer{i}@example.com', user_type='farmer')
+        buyer.set_password('secret')
+        buyers.append(buyer)
+    db.session.add_all([owner, *buyers])
+    db.session.flush()
+
+    for i in range(post_count):
+        post = MarketPost(user_id=owner.id, title=f'QC Maize {i}', category='qc-grains',
+                          type='product', status='active', approved=True, price=10 + i)
+        db.session.add(post)
+        db.session.flush()
+        db.session.add(MarketPostImage(market_post_id=post.id, image_url=f'qc_{i}.jpg'))
+        for buyer in buyers:
+            db.session.add(MarketInterest(market_post_id=post.id, user_id=buyer.id, message='Interested'))
+    db.session.commit()
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def count_listing_queries(client, per_page):
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(f'/api/market/posts?category=qc-grains&per_page={per_page}')
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert len(data['posts']) == per_page
+    assert all(len(post['interests']) == 3 for post in data['posts'])
+    assert all(post['user']['username'] == 'qc_owner' for post in data['posts'])
+    return counter.count
+
+
+def test_market_listing_query_count_is_constant():
+    with app.app_context():
+        if not MarketPost.query.filter_by(category='qc-grains').count():
+            seed_market()
+        # Views buffered by earlier requests would otherwise be flushed inside a counted request
+        app.extensions['view_counter'].flush()
+
+    client = app.test_client()
+    small_page = count_listing_queries(client, 5)
+    large_page = count_listing_queries(client, 25)
+
+    print(f"   5 posts: {small_page} queries, 25 posts: {large_page} queries")
+    assert small_page == large_page
+    assert large_page <= 6
+
+
+if __name__ == "__main__":
+    test_market_listing_query_count_is_constant()
+    print("✅ Market listing query count is constant")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Market statistics maintenance check.
+
+The flush hook keeps ``market_stats`` equal to what reconciliation computes
+from the base tables when rows are changed or deleted after a commit has
+expired them, which is when the ORM no longer holds their old values.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost, MarketInterest
+from services import market_stats
+from services.market_stats import CATEGORY, GLOBAL, USER
+
+
+def _counter(scope, key, metric):
+    return market_stats.get_stats(scope, key).get(metric, 0)
+
+
+def test_counters_follow_changes_to_expired_rows():
+    with app.app_context():
+        market_stats.reconcile_market_stats()  # start from counters that match the tables
+        owner = User(username='stats_owner', email='stats_owner@example.com', user_type='farmer')
+        buyer = User(username='stats_buyer', email='stats_buyer@example.com', user_type='farmer')
+        for user in (owner, buyer):
+            user.set_password('secret')
+        db.session.add_all([owner, buyer])
+        db.session.commit()
+
+        post = MarketPost(user_id=owner.id, title='Maize', category='stats-c1', status='active', approved=False)
+        db.session.add(post)
+        db.session.flush()
+        interest = MarketInterest(market_post_id=post.id, user_id=buyer.id, status='pending')
+        db.session.add(interest)
+        db.session.commit()  # expires both rows
+
+        unapproved = _counter(GLOBAL, '', 'posts_unapproved')
+        pending = _counter(GLOBAL, '', 'interests_pending')
+        assert _counter(CATEGORY, 'stats-c1', 'posts') == 1
+
+        post.approved = True
+        post.category = 'stats-c2'
+        interest.status = 'accepted'
+        db.session.commit()
+
+        assert _counter(GLOBAL, '', 'posts_unapproved') == unapproved - 1
+        assert _counter(GLOBAL, '', 'interests_pending') == pending - 1
+        assert _counter(USER, str(buyer.id), 'interests_accepted') == 1
+        assert _counter(CATEGORY, 'stats-c1', 'posts') == 0
+        assert _counter(CATEGORY, 'stats-c2', 'posts') == 1
+
+        # Deleting expired rows subtracts what the database held
+        db.session.delete(interest)
+        db.session.delete(post)
+        db.session.commit()
+        assert _counter(CATEGORY, 'stats-c2', 'posts') == 0
+        assert _counter(USER, str(owner.id), 'posts') == 0
+        assert _counter(USER, str(buyer.id), 'interests') == 0
+        assert market_stats.reconcile_market_stats() == 0
+
+
+if __name__ == "__main__":
+    test_counters_follow_changes_to_expired_rows()
+    print("✅ Market stats follow changes to expired rows")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Bulk read check.
+
+Opening a thread marks everything up to a message id read with one UPDATE,
+single-message receipts are coalesced into one write per conversation (and
+shown as read by the message and inbox routes until then), and the
+dashboard's unread count follows both.
+"""
+import os
+import sys
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models.user import User
+from models.message import Conversation, Message
+
+
+def test_bulk_and_coalesced_reads():
+    with app.app_context():
+        sender = User(username='receipt_sender', email='receipt_sender@example.com', user_type='farmer')
+        reader = User(username='receipt_reader', email='receipt_reader@example.com', user_type='farmer')
+        for user in (sender, reader):
+            user.set_password('secret')
+        db.session.add_all([sender, reader])
+        db.session.flush()
+        conversation = Conversation(user1_id=sender.id, user2_id=reader.id)
+        db.session.add(conversation)
+        db.session.flush()
+        messages = [Message(conversation_id=conversation.id, sender_id=sender.id, receiver_id=reader.id,
+                            content=f'Update {n}') for n in range(12)]
+        db.session.add_all(messages)
+        db.session.commit()
+        ids = [message.id for message in messages]
+        conversation_id = conversation.id
+        headers = {'Authorization': 'Bearer ' + create_access_token(
+            identity=json.dumps({'id': reader.id, 'type': 'user'}))}
+        # An admin whose id happens to equal the reader's
+        impostor = {'Authorization': 'Bearer ' + create_access_token(
+            identity=json.dumps({'id': reader.id, 'type': 'admin'}))}
+
+    client = app.test_client()
+
+    def unread():
+        overview = client.get('/api/dashboard/user/overview', headers=headers).get_json()
+        return next(a['count'] for a in overview['activities'] if a['title'] == 'Messages')
+
+    assert unread() == 12
+    assert client.put(f'/api/message/conversations/{conversation_id}/read', headers=impostor).status_code == 403
+    assert client.put(f'/api/message/messages/{ids[0]}/read', headers=impostor).status_code == 403
+    assert unread() == 12
+
+    updates = []
+    record = lambda conn, cursor, statement, *args: updates.append(statement) \
+        if statement.startswith('UPDATE messages') else None
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        marked = client.put(f'/api/message/conversations/{conversation_id}/read', headers=headers,
+                            json={'up_to_id': ids[7]})
+        assert marked.get_json()['marked'] == 8
+        assert len(updates) == 1
+        assert unread() == 4
+
+        updates.clear()
+        for message_id in ids[8:11]:
+            assert client.put(f'/api/message/messages/{message_id}/read', headers=headers).status_code == 200
+        assert updates == []  # nothing written per receipt
+        # Buffered receipts already count as read
+        thread = client.get(f'/api/message/conversations/{conversation_id}/messages', headers=headers).get_json()
+        assert [m['is_read'] for m in thread['messages']] == [True] * 11 + [False]
+        listing = client.get('/api/message/inbox', headers=headers).get_json()
+        assert listing['unread_total'] == 1
+        assert next(e for e in listing['inbox'] if e['conversation_id'] == conversation_id)['unread_count'] == 1
+        assert updates == []
+        with app.app_context():
+            assert app.extensions['read_receipts'].flush() == 3
+        assert len(updates) == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert unread() == 1
+    # Receipts and view counters are flushed by the same hooks
+    buffers = app.extensions['write_behind_buffers']
+    assert app.extensions['read_receipts'] in buffers and app.extensions['view_counter'] in buffers
+    assert sum(f.__name__ == 'flush_buffers' for f in app.after_request_funcs[None]) == 1
+    with app.app_context():
+        assert Message.query.filter_by(conversation_id=conversation_id, is_read=False).one().id == ids[11]
+
+
+if __name__ == "__main__":
+    test_bulk_and_coalesced_reads()
+    print("✅ Reads are written in bulk and receipts are coalesced")
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Response cache check for the public catalog endpoints.
+
+A repeated GET is served from the cache with the same strong ETag, a matching
+``If-None-Match`` gets an empty 304, and committing a change to the underlying
+model invalidates the cached response.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from extensions import db
+from models.ecommerce import Category
+
+
+def test_categories_cached_conditional_and_invalidated():
+    client = app.test_client()
+
+    first = client.get('/api/ecommerce/categories?b=2&a=1')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('"')
+
+    # Argument order does not change the cache key
+    second = client.get('/api/ecommerce/categories?a=1&b=2')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.headers['ETag'] == etag
+    assert second.get_data() == first.get_data()
+
+    not_modified = client.get('/api/ecommerce/categories?a=1&b=2', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+
+    with app.app_context():
+        db.session.add(Category(name='RC Fertilizers', type='input'))
+        db.session.commit()
+
+    changed = client.get('/api/ecommerce/categories?a=1&b=2', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['X-Cache'] == 'MISS'
+    assert changed.headers['ETag'] != etag
+    assert 'RC Fertilizers' in [category['name'] for category in changed.get_json()['categories']]
+
+
+if __name__ == "__main__":
+    test_categories_cached_conditional_and_invalidated()
+    print("✅ Catalog responses are cached, conditional and invalidated on writes")
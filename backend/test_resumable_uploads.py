@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Resumable video upload and range serving check.
+
+A skill video uploaded in chunks over the tus protocol survives a rejected
+chunk, is attached to a skill by its upload id, and is then served with
+206 partial content, an immutable cache policy and a digest ETag.
+"""
+import os
+import sys
+import json
+import base64
+import tempfile
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.blob import Blob
+from models.skill import SkillCategory, Skill
+from models.upload import UploadSession
+
+VIDEO = bytes(range(256)) * 400
+
+
+def test_chunked_upload_then_range_requests():
+    original_folder = app.config['UPLOAD_FOLDER']
+    app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='tus-')
+    try:
+        check_upload()
+    finally:
+        app.config['UPLOAD_FOLDER'] = original_folder
+
+
+def check_upload():
+    with app.app_context():
+        category = SkillCategory(name='Irrigation (uploads)')
+        db.session.add(category)
+        db.session.flush()
+        skill = Skill(category_id=category.id, title='Drip lines')
+        db.session.add(skill)
+        db.session.commit()
+        skill_id = skill.id
+        token = create_access_token(identity=json.dumps({'id': 1, 'type': 'admin'}))
+    tus = {'Authorization': f'Bearer {token}', 'Tus-Resumable': '1.0.0'}
+    client = app.test_client()
+
+    assert client.options('/api/skill/uploads').headers['Tus-Version'] == '1.0.0'
+
+    created = client.post('/api/skill/uploads', headers={
+        **tus, 'Upload-Length': str(len(VIDEO)),
+        'Upload-Metadata': 'filename ' + base64.b64encode(b'lesson.mp4').decode(),
+    })
+    assert created.status_code == 201, created.get_json()
+    location = created.headers['Location']
+
+    def patch(offset, body):
+        return client.patch(location, data=body, headers={
+            **tus, 'Upload-Offset': str(offset), 'Content-Type': 'application/offset+octet-stream'})
+
+    half = len(VIDEO) // 2
+    first = patch(0, VIDEO[:half])
+    assert first.status_code == 204 and first.headers['Upload-Offset'] == str(half)
+    assert patch(0, VIDEO[:half]).status_code == 409  # a retried chunk is not appended twice
+    assert client.head(location, headers=tus).headers['Upload-Offset'] == str(half)
+    # The partial file is never served, however the path is spelled
+    upload_id = location.rsplit('/', 1)[1]
+    for path in (f'chunks/{upload_id}.part', f'./chunks/{upload_id}.part', f'x/../chunks/{upload_id}.part'):
+        assert client.get(f'/static/uploads/{path}').status_code == 404, path
+    assert patch(half, VIDEO[half:]).status_code == 204
+
+    attached = client.post('/api/skill/videos', headers=tus, json={
+        'skill_id': skill_id, 'title': 'Laying drip lines', 'upload_id': upload_id})
+    assert attached.status_code == 201, attached.get_json()
+    video_url = attached.get_json()['video']['video_url']
+    assert video_url.startswith('/static/uploads/blobs/') and video_url.endswith('.mp4')
+    with app.app_context():
+        assert db.session.get(UploadSession, upload_id) is None
+        assert Blob.query.filter(Blob.sha256 == video_url.rsplit('/', 1)[1].split('.')[0]).one().ref_count == 1
+
+    ranged = client.get(video_url, headers={'Range': 'bytes=1000-1999'})
+    assert ranged.status_code == 206
+    assert ranged.headers['Content-Range'] == f'bytes 1000-1999/{len(VIDEO)}'
+    assert ranged.data == VIDEO[1000:2000]
+    assert 'immutable' in ranged.headers['Cache-Control']
+    full = client.get(video_url)
+    assert full.headers['Accept-Ranges'] == 'bytes' and full.data == VIDEO
+    assert client.get(video_url, headers={'If-None-Match': full.headers['ETag']}).status_code == 304
+
+    assert client.get(f'/static/uploads/chunks/{upload_id}.part').status_code == 404
+
+
+if __name__ == "__main__":
+    test_chunked_upload_then_range_requests()
+    print("✅ Videos upload in resumable chunks and stream with Range requests")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+SACCO statement engine check.
+
+Amortization schedules repay exactly the principal, statements report the
+opening/closing balances and the interest accrued on the time-weighted
+average balance, crediting a month twice posts nothing the second time and
+the statements endpoint serves JSON and CSV.
+"""
+import os
+import sys
+import json
+import datetime
+from decimal import Decimal
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.sacco import Sacco, SaccoMember, SavingsTransaction
+from services import sacco_engine
+from services.jobs import JobWorker
+
+
+def test_amortization_schedule_repays_the_principal():
+    schedule = sacco_engine.amortization_schedule('10000', 12, 12, datetime.date(2025, 1, 31))
+    assert len(schedule) == 12
+    assert sum(row['principal'] for row in schedule) == Decimal('10000.00')
+    assert schedule[-1]['balance'] == Decimal('0.00')
+    assert schedule[0]['payment'] == Decimal('888.49')
+    assert [row['due_date'] for row in schedule[:2]] == ['2025-01-31', '2025-02-28']
+    assert sacco_engine.amortization_schedule('0', 12, 12, datetime.date(2025, 1, 1)) == []
+
+
+def seed():
+    with app.app_context():
+        saver = User(username='engine_saver', email='engine_saver@example.com', user_type='farmer')
+        saver.set_password('secret')
+        admin = User(username='engine_admin', email='engine_admin@example.com', user_type='admin')
+        admin.set_password('secret')
+        sacco = Sacco(name='Engine Sacco', registration_number='ENGINE-001', total_assets=Decimal('1000.00'))
+        db.session.add_all([saver, admin, sacco])
+        db.session.flush()
+        member = SaccoMember(user_id=saver.id, sacco_id=sacco.id, membership_id='ENGINE-M1',
+                             savings=Decimal('2000.00'))
+        db.session.add(member)
+        db.session.flush()
+        # 1000 held all of April, plus 1000 deposited half way through it
+        db.session.add_all([
+            SavingsTransaction(member_id=member.id, sacco_id=sacco.id, transaction_type='deposit',
+                               amount=Decimal('1000.00'), balance_after=Decimal('1000.00'),
+                               created_at=datetime.datetime(2025, 3, 20)),
+            SavingsTransaction(member_id=member.id, sacco_id=sacco.id, transaction_type='deposit',
+                               amount=Decimal('1000.00'), balance_after=Decimal('2000.00'),
+                               created_at=datetime.datetime(2025, 4, 16)),
+        ])
+        db.session.commit()
+        token = create_access_token(identity=json.dumps({'id': admin.id, 'type': 'admin'}))
+        return token, sacco.id, member.id
+
+
+def test_statements_accrue_interest_once():
+    token, sacco_id, member_id = seed()
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.app_context():
+        run = sacco_engine.run_statements(sacco_id, '2025-04', '12')
+        statement = run['statements'][0]
+        assert statement['opening_balance'] == Decimal('1000.00')
+        assert statement['closing_balance'] == Decimal('2000.00')
+        assert statement['average_balance'] == Decimal('1500.00')
+        assert statement['interest_accrued'] == Decimal('15.00')
+
+    body = client.get(f'/api/sacco/saccos/{sacco_id}/statements?month=2025-04&rate=12', headers=headers)
+    assert body.status_code == 200
+    assert body.get_json()['totals']['interest_accrued'] == 15.0
+    csv = client.get(f'/api/sacco/saccos/{sacco_id}/statements?month=2025-04&rate=12&format=csv', headers=headers)
+    assert csv.mimetype == 'text/csv'
+    assert csv.get_data(as_text=True).splitlines()[1].startswith(f'{member_id},')
+    assert client.get(f'/api/sacco/saccos/{sacco_id}/statements?month=April', headers=headers).status_code == 400
+
+    # Posting is queued; the worker credits it once however often (and however spelled) it is requested
+    worker = JobWorker(app, names=['sacco.post_interest'])
+    for month, credited in (('2025-4', 1), ('2025-04', 0), (' 2025-04 ', 0)):
+        queued = client.post(f'/api/sacco/saccos/{sacco_id}/interest', headers=headers,
+                             json={'month': month, 'rate': 12})
+        assert queued.status_code == 202
+        assert worker.run_pending() == 1
+        job = client.get(queued.headers['Location'], headers=headers).get_json()['job']
+        assert job['status'] == 'succeeded'
+        assert job['result']['members_credited'] == credited
+
+    # Months that have not ended cannot be posted
+    for month in (datetime.datetime.utcnow().strftime('%Y-%m'), '2999-01'):
+        assert client.post(f'/api/sacco/saccos/{sacco_id}/interest', headers=headers,
+                           json={'month': month}).status_code == 400
+
+    with app.app_context():
+        assert db.session.get(SaccoMember, member_id).savings == Decimal('2015.00')
+        assert db.session.get(Sacco, sacco_id).total_assets == Decimal('1015.00')
+        interest = SavingsTransaction.query.filter_by(member_id=member_id, transaction_type='interest').one()
+        assert interest.balance_after == Decimal('2015.00')
+
+
+if __name__ == "__main__":
+    test_amortization_schedule_repays_the_principal()
+    test_statements_accrue_interest_once()
+    print("✅ SACCO statements accrue interest once and schedules repay the principal")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Savings ledger check.
+
+Postings update the balance in SQL and append a ledger row with the balance
+after it, a retried request with the same idempotency key is not posted twice,
+overdrawing is refused, and statements report opening and closing balances
+from the snapshots.
+"""
+import os
+import sys
+import json
+import datetime
+from decimal import Decimal
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.sacco import Sacco, SaccoMember, SavingsTransaction
+
+
+def seed():
+    with app.app_context():
+        saver = User(username='ledger_saver', email='ledger_saver@example.com', user_type='farmer')
+        saver.set_password('secret')
+        sacco = Sacco(name='Ledger Sacco', registration_number='LEDGER-001', total_assets=Decimal('0.00'))
+        db.session.add_all([saver, sacco])
+        db.session.flush()
+        member = SaccoMember(user_id=saver.id, sacco_id=sacco.id, membership_id='LEDGER-M1')
+        db.session.add(member)
+        db.session.commit()
+        token = create_access_token(identity=json.dumps({'id': saver.id, 'type': 'user'}))
+        return token, sacco.id, member.id
+
+
+def test_savings_postings_are_atomic_idempotent_and_snapshotted():
+    token, sacco_id, member_id = seed()
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    def post(transaction_type, amount, key=None):
+        extra = {'Idempotency-Key': key} if key else {}
+        return client.post('/api/sacco/savings/transaction', headers={**headers, **extra},
+                           json={'sacco_id': sacco_id, 'transaction_type': transaction_type, 'amount': amount})
+
+    first = post('deposit', '1000.50', key='ledger-dep-1')
+    assert first.status_code == 200, first.get_json()
+    assert first.get_json()['new_balance'] == 1000.50
+
+    retried = post('deposit', '1000.50', key='ledger-dep-1')
+    assert retried.status_code == 200
+    assert retried.headers['Idempotent-Replayed'] == 'true'
+    assert retried.get_json()['transaction']['id'] == first.get_json()['transaction']['id']
+    assert post('deposit', '5', key='ledger-dep-1').status_code == 409
+
+    assert post('withdrawal', '200.25').get_json()['new_balance'] == 800.25
+    overdraw = post('withdrawal', '5000')
+    assert overdraw.status_code == 400
+    assert 'Insufficient balance' in overdraw.get_json()['message']
+    assert post('withdrawal', '-3').status_code == 400
+
+    with app.app_context():
+        assert db.session.get(SaccoMember, member_id).savings == Decimal('800.25')
+        assert db.session.get(Sacco, sacco_id).total_assets == Decimal('800.25')
+        ledger = SavingsTransaction.query.filter_by(member_id=member_id).order_by(SavingsTransaction.id).all()
+        assert [(t.transaction_type, t.balance_after) for t in ledger] == [
+            ('deposit', Decimal('1000.50')), ('withdrawal', Decimal('800.25'))
+        ]
+        # Backdate the deposit so it falls before the statement period
+        ledger[0].created_at = datetime.datetime(2024, 1, 10)
+        ledger[1].created_at = datetime.datetime(2024, 2, 5)
+        db.session.commit()
+
+    statement = client.get(f'/api/sacco/members/{member_id}/statement?from=2024-02-01&to=2024-02-29',
+                           headers=headers).get_json()
+    assert statement['opening_balance'] == 1000.50
+    assert statement['closing_balance'] == 800.25
+    assert [t['transaction_type'] for t in statement['transactions']] == ['withdrawal']
+
+
+if __name__ == "__main__":
+    test_savings_postings_are_atomic_idempotent_and_snapshotted()
+    print("✅ Savings postings are atomic, idempotent and snapshotted")
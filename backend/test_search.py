@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Market search check.
+
+On SQLite the FTS5 table follows inserts, edits and deletes of market posts
+through its triggers. Results are ranked with bm25 (title above description),
+terms are prefix-matched, misspelt terms are widened to close indexed
+spellings, and the ILIKE fallback still filters when full-text search is
+unavailable.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost
+from services import search
+
+
+def titles(text, backend=None):
+    previous = app.extensions['market_search']
+    if backend:
+        app.extensions['market_search'] = backend
+    try:
+        query, rank_order = search.apply_search(MarketPost.query.filter_by(category='search-check'), text)
+        if rank_order is not None:
+            query = query.order_by(rank_order)
+        return [post.title for post in query.all()]
+    finally:
+        app.extensions['market_search'] = previous
+
+
+def test_fts5_search():
+    with app.app_context():
+        assert app.extensions['market_search'] == 'fts5'
+        owner = User(username='search_owner', email='search_owner@example.com', user_type='farmer')
+        owner.set_password('secret')
+        db.session.add(owner)
+        db.session.flush()
+        mentioned = MarketPost(user_id=owner.id, title='Mixed grain', category='search-check',
+                               description='Some teffgrain among the millet')
+        named = MarketPost(user_id=owner.id, title='Teffgrain harvest', category='search-check',
+                           description='Clean and dry')
+        other = MarketPost(user_id=owner.id, title='Cassava tubers', category='search-check',
+                           tags='roots')
+        db.session.add_all([mentioned, named, other])
+        db.session.commit()
+
+        # A title match outranks a description match
+        assert titles('teffgrain') == ['Teffgrain harvest', 'Mixed grain']
+        # Prefixes match, and so do tags
+        assert titles('teffg') == ['Teffgrain harvest', 'Mixed grain']
+        assert titles('roots') == ['Cassava tubers']
+        # A misspelling with no indexed prefix is widened to the closest terms
+        assert search.fts5_match_expression(['casava']) == '("casava"* OR "cassava")'
+        assert titles('casava tubers') == ['Cassava tubers']
+        assert titles('zzqxv') == []
+
+        # The triggers follow edits and deletes
+        other.title = 'Yam tubers'
+        db.session.commit()
+        assert titles('cassava') == []
+        assert titles('yam') == ['Yam tubers']
+        db.session.delete(other)
+        db.session.commit()
+        assert titles('yam') == []
+
+        # Without full-text search the whole phrase is matched with ILIKE
+        assert titles('TEFFGRAIN HAR', backend='like') == ['Teffgrain harvest']
+        assert sorted(titles('teffgrain', backend='like')) == ['Mixed grain', 'Teffgrain harvest']
+
+
+if __name__ == "__main__":
+    test_fts5_search()
+    print("✅ Market search ranks, prefix-matches and widens typos")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Sparse serializer check.
+
+``?fields=`` returns only the requested fields (plus ``id``) and ignores
+unknown names, ``?shape=summary`` returns the serializer's summary fields, and
+a sparse listing SELECTs only the columns it needs and skips the relationship
+loads the full shape pays for.
+"""
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost, MarketPostImage, MarketInterest
+from services import serializers
+
+
+def seed_posts(count=6):
+    owner = User(username='ser_owner', email='ser_owner@example.com', user_type='farmer')
+    buyer = User(username='ser_buyer', email='ser_buyer@example.com', user_type='farmer')
+    for user in (owner, buyer):
+        user.set_password('secret')
+    db.session.add_all([owner, buyer])
+    db.session.flush()
+    for i in range(count):
+        post = MarketPost(user_id=owner.id, title=f'Sorghum {i}', description='Long description ' * 20,
+                          category='ser-grains', type='product', status='active', approved=True, price=20 + i)
+        db.session.add(post)
+        db.session.flush()
+        db.session.add(MarketPostImage(market_post_id=post.id, image_url=f'ser_{i}.jpg'))
+        db.session.add(MarketInterest(market_post_id=post.id, user_id=buyer.id, message='Interested'))
+    db.session.commit()
+
+
+def listing(client, query):
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(f'/api/market/posts?category=ser-grains&per_page=6&{query}')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['posts'], statements
+
+
+def test_fields_and_shapes():
+    # Selections are built from request args: duplicates and unknown names dropped, id always first
+    assert serializers.MARKET_POST.select({'fields': 'title, price,title,no_such_field'}).fields == \
+        ['id', 'title', 'price']
+    assert serializers.MARKET_POST.select({'shape': 'summary'}).fields == list(serializers.MARKET_POST.summary)
+    assert not serializers.MARKET_POST.select({}).sparse
+
+    with app.app_context():
+        if not MarketPost.query.filter_by(category='ser-grains').count():
+            seed_posts()
+
+    client = app.test_client()
+    full, full_statements = listing(client, '')
+    assert len(full) == 6
+    assert full[0]['interests'] and full[0]['description']
+    assert any('FROM market_interests' in s for s in full_statements)
+
+    sparse, sparse_statements = listing(client, 'fields=title,price,no_such_field')
+    assert [set(post) for post in sparse] == [{'id', 'title', 'price'}] * 6
+    assert {post['title'] for post in sparse} == {post['title'] for post in full}
+
+    summary, _ = listing(client, 'shape=summary')
+    assert [set(post) for post in summary] == [set(serializers.MARKET_POST.summary)] * 6
+    assert all(post['thumbnails'] for post in summary)
+
+    # Only the requested columns are read and no relationship is loaded
+    assert len(sparse_statements) < len(full_statements)
+    posts_select = next(s for s in sparse_statements if s.lstrip().startswith('SELECT market_posts.id'))
+    assert 'market_posts.description' not in posts_select
+    assert not any('FROM market_interests' in s or 'FROM market_post_images' in s for s in sparse_statements)
+
+
+if __name__ == "__main__":
+    test_fields_and_shapes()
+    print("✅ Sparse fields and shapes select only what they return")
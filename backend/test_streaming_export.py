@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Streaming export check.
+
+Exports are streamed one batch of rows per chunk, as NDJSON by default or CSV
+with a header row whose text cells cannot turn into spreadsheet formulas, and
+reject unknown formats and non-admin callers.
+"""
+import os
+import sys
+import csv
+import io
+import json
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from extensions import db
+from models.user import User
+from models.market import MarketPost
+
+ROWS = 250
+
+
+def seed():
+    with app.app_context():
+        seller = User(username='export_seller', email='export_seller@example.com', user_type='farmer')
+        seller.set_password('secret')
+        db.session.add(seller)
+        db.session.flush()
+        db.session.bulk_insert_mappings(MarketPost, [
+            {'user_id': seller.id, 'title': f'Export Sorghum {i}', 'category': 'export-grains',
+             'type': 'product', 'status': 'active', 'approved': True, 'price': i}
+            for i in range(ROWS)
+        ] + [{'user_id': seller.id, 'title': '=HYPERLINK("http://example.com")', 'category': 'export-formulas',
+              'type': 'product', 'status': 'active', 'approved': True, 'price': -1}])
+        db.session.commit()
+        admin_token = create_access_token(identity=json.dumps({'id': 1, 'type': 'admin'}))
+        user_token = create_access_token(identity=json.dumps({'id': seller.id, 'type': 'user'}))
+    return admin_token, user_token
+
+
+def test_user_products_export_streams_ndjson_and_csv():
+    admin_token, user_token = seed()
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    url = '/api/market/admin/user-products/export'
+    app.config['EXPORT_BATCH_SIZE'] = 100
+    try:
+        response = client.get(url, headers=headers, buffered=False)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        chunks = list(response.response)
+        response.close()
+        rows = [json.loads(line) for line in ''.join(
+            chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk for chunk in chunks
+        ).splitlines()]
+        exported = [row for row in rows if row['title'].startswith('Export Sorghum')]
+        assert len(exported) == ROWS
+        assert exported[0]['username'] == 'export_seller'
+        assert len(chunks) >= ROWS // 100
+
+        response = client.get(f'{url}?format=csv', headers=headers)
+        assert response.mimetype == 'text/csv'
+        assert 'filename="user-products.csv"' in response.headers['Content-Disposition']
+        reader = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert len([row for row in reader if row['category'] == 'export-grains']) == ROWS
+        formula = next(row for row in reader if row['category'] == 'export-formulas')
+        assert formula['title'] == '\'=HYPERLINK("http://example.com")'
+        assert float(formula['price']) == -1  # numbers are left alone
+    finally:
+        app.config['EXPORT_BATCH_SIZE'] = 1000
+
+    assert client.get(f'{url}?format=xml', headers=headers).status_code == 400
+    assert client.get(url, headers={'Authorization': f'Bearer {user_token}'}).status_code == 403
+
+
+if __name__ == "__main__":
+    test_user_products_export_streams_ndjson_and_csv()
+    print("✅ Admin exports stream NDJSON and CSV in batches")
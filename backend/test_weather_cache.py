@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Weather cache check.
+
+The circuit breaker opens after repeated failures and lets one trial call
+through once it has cooled down; concurrent misses for a key share one
+upstream call; an expired entry is served stale while a background refresh
+runs, also while the breaker is open.
+"""
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from services.cache import MemoryCache
+from services.weather import CircuitBreaker, WeatherService, WeatherUnavailable
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == ('closed', True)
+    breaker.record_failure()
+    assert (breaker.state, breaker.allow()) == ('open', False)
+
+    time.sleep(0.15)
+    assert breaker.state == 'half-open'
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # one trial call at a time
+    breaker.record_failure()  # a failed trial opens it again
+    assert (breaker.state, breaker.allow()) == ('open', False)
+
+    time.sleep(0.15)
+    assert breaker.allow() is True
+    breaker.record_success()
+    assert (breaker.state, breaker.failures) == ('closed', 0)
+
+
+def test_concurrent_misses_share_one_call():
+    service = WeatherService(MemoryCache(), client=None)
+    calls = []
+    release = threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return {'temperature': 21}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get('weather:test:flight', loader)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: service.flight.in_flight('weather:test:flight'))
+    time.sleep(0.05)  # let the followers queue up behind the leader
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [value for value, state in results] == [{'temperature': 21}] * 5
+    assert service.get('weather:test:flight', loader) == ({'temperature': 21}, 'hit')
+
+
+def test_stale_entries_are_served_while_refreshing():
+    service = WeatherService(MemoryCache(), client=None,
+                             breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60), fresh_ttl=0.05)
+    readings = iter([{'temperature': 18}, {'temperature': 19}])
+    with app.app_context():
+        assert service.get('weather:test:stale', lambda: next(readings)) == ({'temperature': 18}, 'miss')
+        time.sleep(0.1)
+        assert service.get('weather:test:stale', lambda: next(readings)) == ({'temperature': 18}, 'stale')
+        wait_for(lambda: service.cache.get('weather:test:stale')['value'] == {'temperature': 19})
+        assert service.get('weather:test:stale', lambda: next(readings)) == ({'temperature': 19}, 'hit')
+
+        # With the breaker open a stale entry is still served, and a miss fails fast
+        def failing():
+            raise WeatherUnavailable('Unable to connect to weather service', 'down', 503)
+
+        time.sleep(0.1)
+        assert service.get('weather:test:stale', failing)[1] == 'stale'
+        wait_for(lambda: service.breaker.state == 'open')
+        assert service.get('weather:test:stale', failing) == ({'temperature': 19}, 'stale')
+        try:
+            service.get('weather:test:other', failing)
+            assert False, 'expected WeatherUnavailable'
+        except WeatherUnavailable as e:
+            assert e.status_code == 503 and 'paused' in e.error
+
+
+def test_region_key_needs_coordinates():
+    assert WeatherService.region_key(-1.2921, 36.8219) == 'weather:realtime:-1.292,36.822'
+    try:
+        WeatherService.region_key(None, 36.8219)
+        assert False, 'expected WeatherUnavailable'
+    except WeatherUnavailable as e:
+        assert e.status_code == 400
+
+
+if __name__ == "__main__":
+    test_breaker_opens_and_half_opens()
+    test_concurrent_misses_share_one_call()
+    test_stale_entries_are_served_while_refreshing()
+    test_region_key_needs_coordinates()
+    print("✅ Weather cache coalesces misses, serves stale entries and trips its breaker")
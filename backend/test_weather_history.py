@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Weather history check.
+
+Recording an hour twice updates the stored reading instead of adding a row,
+and the history endpoint aggregates observations per hour, day, ISO week and
+month.
+"""
+import os
+import sys
+from datetime import datetime
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from extensions import db
+from models.agroclimate import Region, WeatherObservation
+from services.weather import record_observations
+from services.weather_history import aggregate_history
+
+
+def reading(temperature, rainfall=0.0, humidity=60, wind_speed=3.0):
+    return {'temperature': temperature, 'humidity': humidity, 'rainfall': rainfall,
+            'wind_speed': wind_speed, 'weather_condition': 'Clear'}
+
+
+def test_observations_are_upserted_and_aggregated():
+    with app.app_context():
+        region = Region(name='History Region', latitude=-0.4, longitude=36.9)
+        db.session.add(region)
+        db.session.commit()
+        region_id = region.id
+
+        # Minutes are truncated to the hour, so the first two readings are one row
+        written = record_observations(region_id, [
+            (datetime(2020, 12, 31, 10, 5), reading(20, rainfall=1.0)),
+            (datetime(2020, 12, 31, 10, 40), reading(22, rainfall=2.0)),
+            (datetime(2020, 12, 31, 11, 0), reading(26)),
+        ], 'observed')
+        assert written == 2
+        # Recording an hour again replaces it
+        record_observations(region_id, [(datetime(2020, 12, 31, 11, 0), reading(24, wind_speed=9.0))], 'observed')
+        record_observations(region_id, [
+            (datetime(2021, 1, 3, 9, 0), reading(18, rainfall=4.0)),
+            (datetime(2021, 1, 4, 9, 0), reading(16)),
+        ], 'observed')
+        record_observations(region_id, [(datetime(2020, 12, 31, 10, 0), reading(35))], 'forecast')
+
+        rows = WeatherObservation.query.filter_by(region_id=region_id, kind='observed').all()
+        assert len(rows) == 4
+        assert {row.observed_at.hour: row.temperature for row in rows if row.observed_at.day == 31} == {10: 22, 11: 24}
+
+        days = aggregate_history(region_id, datetime(2020, 12, 31).date(), datetime(2021, 1, 4).date())
+        assert [day['period'] for day in days] == ['2020-12-31', '2021-01-03', '2021-01-04']
+        assert days[0] == {
+            'period': '2020-12-31', 'temperature_min': 22, 'temperature_max': 24, 'temperature_mean': 23,
+            'humidity_mean': 60, 'rainfall_total': 2.0, 'rainfall_max': 2.0, 'wind_speed_max': 9.0, 'samples': 2,
+        }
+
+        # ISO weeks: 2021-01-03 is a Sunday in 2020-W53, the Monday after starts 2021-W01
+        weeks = aggregate_history(region_id, datetime(2020, 12, 31).date(), datetime(2021, 1, 4).date(),
+                                  interval='week')
+        assert [(week['period'], week['samples']) for week in weeks] == [('2020-W53', 3), ('2021-W01', 1)]
+        assert weeks[0]['rainfall_total'] == 6.0
+
+        months = aggregate_history(region_id, datetime(2020, 12, 1).date(), datetime(2021, 1, 31).date(),
+                                   interval='month')
+        assert [(month['period'], month['samples']) for month in months] == [('2020-12', 2), ('2021-01', 2)]
+        hours = aggregate_history(region_id, datetime(2020, 12, 31).date(), datetime(2020, 12, 31).date(),
+                                  interval='hour', kind='forecast')
+        assert [(hour['period'], hour['temperature_max']) for hour in hours] == [('2020-12-31T10:00', 35)]
+
+    client = app.test_client()
+    response = client.get(f'/api/agroclimate/weather/{region_id}/history?start=2020-12-28&end=2021-01-10&interval=week')
+    assert response.status_code == 200, response.get_json()
+    assert '2020-W53' in str(response.get_json())
+    assert client.get(f'/api/agroclimate/weather/{region_id}/history?interval=fortnight').status_code == 400
+    assert client.get(f'/api/agroclimate/weather/{region_id}/history?start=2021-01-10&end=2021-01-01').status_code == 400
+
+
+if __name__ == "__main__":
+    test_observations_are_upserted_and_aggregated()
+    print("✅ Weather history is upserted and aggregated per ISO week")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Weather prefetch check against a stubbed Tomorrow.io responder.
+
+Refreshes every region through the prefetcher, then asserts that concurrency
+stayed within the worker limit, every region has today's WeatherData and the
+weather endpoint is answered from the cache without another upstream call.
+Readings another process stored are served too, and only the process holding
+the prefetch lease runs scheduled passes.
+"""
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import update
+
+from app import app
+from extensions import db
+from models.agroclimate import Region, WeatherObservation
+from services.weather import get_weather_service, save_todays_weather, todays_weather, TomorrowClient
+from services.weather_prefetch import prefetch_all_regions, TokenBucket, WeatherPrefetcher
+
+
+class StubResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class StubTomorrow:
+    """Stands in for requests.get; records concurrency and can rate-limit after N calls"""
+
+    def __init__(self, latency=0.05, limit=None):
+        self.latency = latency
+        self.limit = limit
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, params, timeout):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            calls = self.calls
+        time.sleep(self.latency)
+        with self._lock:
+            self.active -= 1
+        if self.limit is not None and calls > self.limit:
+            return StubResponse(429, {'message': 'Too Many Calls'})
+        latitude = float(params['location'].split(',')[0])
+        return StubResponse(200, {'data': {'values': {'temperature': 20 + latitude, 'humidity': 55,
+                                                      'weatherCode': 1101}}})
+
+
+def use_stub(stub):
+    with app.app_context():
+        service = get_weather_service(app)
+        original = service.client
+        service.client = TomorrowClient('test-key', http_get=stub)
+        service.cache.clear()
+    return service, original
+
+
+def ensure_regions(count=12):
+    with app.app_context():
+        for i in range(count):
+            name = f'Prefetch Region {i}'
+            if not Region.query.filter_by(name=name).first():
+                db.session.add(Region(name=name, latitude=i * 0.5, longitude=36.0 + i * 0.1))
+        db.session.commit()
+        return [region.id for region in Region.query.all()]
+
+
+def test_prefetch_refreshes_every_region():
+    region_ids = ensure_regions()
+    stub = StubTomorrow()
+    service, original = use_stub(stub)
+    try:
+        results = prefetch_all_regions(app, max_workers=3, bucket=TokenBucket(6000, burst=100))
+        assert results == {'refreshed': len(region_ids), 'failed': 0, 'skipped': 0}
+        assert stub.calls == len(region_ids)
+        assert stub.max_active <= 3
+
+        with app.app_context():
+            assert all(todays_weather(region_id) for region_id in region_ids)
+
+        client = app.test_client()
+        response = client.get(f'/api/agroclimate/weather/{region_ids[0]}')
+        assert response.status_code == 200
+        assert response.headers['X-Cache'] == 'HIT'
+        assert stub.calls == len(region_ids)
+    finally:
+        service.client = original
+
+
+def test_prefetch_stops_when_rate_limited():
+    region_ids = ensure_regions()
+    stub = StubTomorrow(latency=0, limit=2)
+    service, original = use_stub(stub)
+    try:
+        results = prefetch_all_regions(app, max_workers=1, bucket=TokenBucket(6000, burst=100))
+        assert results['refreshed'] == 2
+        assert results['failed'] == 1
+        assert results['skipped'] == len(region_ids) - 3
+    finally:
+        service.client = original
+        service.breaker.record_success()
+
+
+def test_stored_readings_are_served_without_upstream_calls():
+    region_ids = ensure_regions()
+    stub = StubTomorrow(latency=0)
+    service, original = use_stub(stub)
+    client = app.test_client()
+    try:
+        with app.app_context():
+            save_todays_weather(region_ids[1], {'temperature': 24.5, 'humidity': 50})
+        response = client.get(f'/api/agroclimate/weather/{region_ids[1]}')
+        assert response.status_code == 200
+        assert (response.get_json()['temperature'], response.headers['X-Cache']) == (24.5, 'HIT')
+        assert stub.calls == 0
+
+        # A reading too old to serve stale is fetched again
+        with app.app_context():
+            db.session.execute(update(WeatherObservation).where(WeatherObservation.region_id == region_ids[1])
+                               .values(fetched_at=datetime.utcnow() - timedelta(hours=3)))
+            db.session.commit()
+        service.cache.clear()
+        response = client.get(f'/api/agroclimate/weather/{region_ids[1]}')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert stub.calls == 1
+
+        # A stale entry gives way to a newer reading another process stored
+        key = service.region_key(*region_coordinates(region_ids[1]))
+        service._store(key, {'temperature': 10.0}, time.time() - service.fresh_ttl - 1)
+        with app.app_context():
+            save_todays_weather(region_ids[1], {'temperature': 26.0, 'humidity': 50})
+        response = client.get(f'/api/agroclimate/weather/{region_ids[1]}')
+        assert (response.get_json()['temperature'], response.headers['X-Cache']) == (26.0, 'HIT')
+        assert stub.calls == 1
+    finally:
+        service.client = original
+
+
+def region_coordinates(region_id):
+    with app.app_context():
+        region = db.session.get(Region, region_id)
+        return region.latitude, region.longitude
+
+
+def test_only_the_lease_holder_prefetches():
+    first = WeatherPrefetcher(app, interval=60, holder='web-1')
+    second = WeatherPrefetcher(app, interval=60, holder='web-2')
+    assert first.lead() is True
+    assert second.lead() is False
+    assert first.lead() is True  # renewed by the holder
+
+    # Stopping hands the lease over straight away
+    first.stop()
+    assert second.lead() is True
+    assert first.lead() is False
+    second.stop()
+
+
+if __name__ == "__main__":
+    test_prefetch_refreshes_every_region()
+    test_prefetch_stops_when_rate_limited()
+    test_stored_readings_are_served_without_upstream_calls()
+    test_only_the_lease_holder_prefetches()
+    print("✅ Weather prefetch refreshes every region within its limits")
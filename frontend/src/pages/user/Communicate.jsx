@@ -83,8 +83,9 @@ function Communicate() {
           msg => !msg.is_read && msg.receiver_id === agriConnectAPI.getUserId()
         );
         
-        for (const msg of unreadMessages) {
-          await agriConnectAPI.message.markAsRead(msg.id);
+        if (unreadMessages.length > 0) {
+          const lastUnreadId = Math.max(...unreadMessages.map(msg => msg.id));
+          await agriConnectAPI.message.markConversationAsRead(conversationId, lastUnreadId);
         }
       }
     } catch (err) {
@@ -1518,6 +1518,17 @@ storage = {
             return await this.handleResponse(response);
         },
 
+        // Mark everything received in a conversation up to a message as read
+        markConversationAsRead: async (conversationId, upToId) => {
+            const response = await fetch(`${API_BASE_URL}/message/conversations/${conversationId}/read`, {
+                method: 'PUT',
+                headers: this.getHeaders(),
+                body: JSON.stringify({ up_to_id: upToId }),
+            });
+
+            return await this.handleResponse(response);
+        },
+
         // Mark message as read
         markAsRead: async (messageId) => {
             const response = await fetch(`${API_BASE_URL}/message/messages/${messageId}/read`, {